@@ -16,9 +16,11 @@ TODO:
     Switchable message settings
 """
 
-from main_file import decrypt_ds2_sl2, encrypt_modified_files
+from main_file import decrypt_ds2_sl2, encrypt_modified_files, set_crypto_workers
 from main_file_import import decrypt_ds2_sl2_import
 import json, shutil, os, struct
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, simpledialog
 from pathlib import Path
@@ -49,8 +51,12 @@ from globals import (
 
 from relic_checker import RelicChecker, InvalidReason, is_curse_invalid
 from source_data_handler import SourceDataHandler, get_system_language
-from vessel_handler import LoadoutHandler, is_vessel_available
-from inventory_handler import InventoryHandler
+from vessel_handler import LoadoutHandler, RelicRefIndex, is_vessel_available
+from inventory_handler import InventoryHandler, SlotSummary
+from save_buffer import SaveBuffer
+from edit_journal import EditJournal
+from save_schema import PRESET
+import model_cache
 from config_manager import ConfigManager
 from language_manager import lang_mgr, N_
 
@@ -326,7 +332,7 @@ def get_character_loadout(char_name):
     for idx, vessel in enumerate(loadout_handler.heroes[hero_type].vessels):
         relics = []
         has_any_relic = False
-        for ga in vessel["relics"]:
+        for ga in vessel.relics:
             if ga != 0 and (ga & 0xF0000000) == ITEM_TYPE_RELIC:
                 has_any_relic = True
                 # Find relic info
@@ -351,7 +357,7 @@ def get_character_loadout(char_name):
             else:
                 relics.append((0, None))
 
-        is_unlocked = is_vessel_available(vessel["vessel_id"])
+        is_unlocked = is_vessel_available(vessel.vessel_id)
 
         loadout[idx] = {
             "relics": relics,
@@ -383,9 +389,11 @@ def split_files(file_path, folder_name):
     # clean current dir
     if os.path.exists(split_dir):
         shutil.rmtree(split_dir)  # delete folder and everything inside
-    os.makedirs(split_dir, exist_ok=True)
+    # Freshly unpacked slots are all unchanged
+    SaveBuffer().attach(None)
 
     if file_name.lower() == "memory.dat":
+        os.makedirs(split_dir, exist_ok=True)
         with open(file_path, "rb") as f:
             header = f.read(0x80)
             with open(os.path.join(split_dir, "header"), "wb") as out:
@@ -408,7 +416,8 @@ def split_files(file_path, folder_name):
 
     elif file_path.lower().endswith(".sl2"):
         # Accept any .sl2 file (supports custom save names from ModEngine 3, etc.)
-        decrypt_ds2_sl2(file_path)
+        # Slots stay in memory, SaveBuffer loads them by name
+        SaveBuffer().attach(decrypt_ds2_sl2(file_path))
 
 
 def save_file():
@@ -422,7 +431,11 @@ def save_file():
         if not output_sl2_file:
             return
 
-        encrypt_modified_files(output_sl2_file)
+        try:
+            encrypt_modified_files(output_sl2_file)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Could not save the SL2 file:\n{e}")
+            return False
 
     if MODE == "PS4":  ### HERE
         print("data length", len(globals.data))
@@ -599,30 +612,75 @@ def save_file():
             traceback.print_exc()
 
 
+# Slot summaries keyed by a hash of the userdata file content, per file set ("save", "import").
+# Reopening the same save (or a slot that didn't change) skips the probe.
+# Only the summaries of the files probed last in each set are kept.
+_slot_summary_cache: Dict[str, Dict[bytes, SlotSummary]] = {}
+
+
+def read_slot_summary(file_path, cache=None, kept=None) -> Optional[SlotSummary]:
+    """
+    :param cache: Summaries to reuse, keyed by content hash.
+    :param kept: Receives the summary under its content hash.
+    """
+    file_data = SaveBuffer().read(file_path)
+    # Check minimum file size before parsing
+    if len(file_data) < 0x1000:  # Minimum expected size
+        print(f"Warning: {file_path} is too small ({len(file_data)} bytes), skipping")
+        return None
+    key = hashlib.blake2b(file_data, digest_size=16).digest()
+    summary = cache.get(key) if cache else None
+    if summary is None:
+        summary = InventoryHandler.probe_slot_summary(file_data)
+    if kept is not None:
+        kept[key] = summary
+    return summary
+
+
+def probe_slot_files(file_paths, file_set="save"):
+    """Probe slot files concurrently. Yields (file_path, summary or exception) in input order."""
+    cache = _slot_summary_cache.get(file_set, {})
+    kept: Dict[bytes, SlotSummary] = {}
+
+    def _probe(file_path):
+        try:
+            return read_slot_summary(file_path, cache, kept)
+        except Exception as e:
+            return e
+
+    if not file_paths:
+        _slot_summary_cache.pop(file_set, None)
+        return
+    try:
+        with ThreadPoolExecutor(max_workers=len(file_paths)) as pool:
+            yield from zip(file_paths, pool.map(_probe, file_paths))
+    finally:
+        # Replace the set's cache, summaries of files no longer open are dropped
+        _slot_summary_cache[file_set] = kept
+
+
 def name_to_path():
     global char_name_list, MODE
     char_name_list = []
     unpacked_folder = WORKING_DIR / "decrypted_output"
 
-    prefix = "userdata" if MODE == "PS4" else "USERDATA_0"
-
-    for i in range(10):
-        file_path = os.path.join(unpacked_folder, f"{prefix}{i}")
-        if not os.path.exists(file_path):
-            continue
+    if MODE == "PS4":
+        file_paths = [
+            os.path.join(unpacked_folder, f"userdata{i}")
+            for i in range(10)
+            if os.path.exists(os.path.join(unpacked_folder, f"userdata{i}"))
+        ]
+    else:
+        # PC slots are in-memory Sl2Container entries
+        store = SaveBuffer().store or ()
+        file_paths = [f"USERDATA_{i:02d}" for i in range(10) if f"USERDATA_{i:02d}" in store]
 
+    for file_path, result in probe_slot_files(file_paths):
         try:
-            with open(file_path, "rb") as f:
-                file_data = f.read()
-                # Check minimum file size before parsing
-                if len(file_data) < 0x1000:  # Minimum expected size
-                    print(
-                        f"Warning: {file_path} is too small ({len(file_data)} bytes), skipping"
-                    )
-                    continue
-                name = InventoryHandler.get_player_name_from_data(file_data)
-                if name:
-                    char_name_list.append((name, file_path))
+            if isinstance(result, Exception):
+                raise result
+            if result and result.name:
+                char_name_list.append((result.name, file_path))
         except struct.error as e:
             print(f"Error parsing save file {file_path}: Data structure error - {e}")
             print(f"  This may indicate a corrupted save file or incompatible format")
@@ -646,19 +704,17 @@ def name_to_path_import():
 
     prefix = "userdata" if IMPORT_MODE == "PS4" else "USERDATA_0"
 
-    for i in range(10):
-        file_path = os.path.join(unpacked_folder, f"{prefix}{i}")
-        if not os.path.exists(file_path):
-            continue
+    file_paths = [
+        os.path.join(unpacked_folder, f"{prefix}{i}")
+        for i in range(10)
+        if os.path.exists(os.path.join(unpacked_folder, f"{prefix}{i}"))
+    ]
 
-        try:
-            with open(file_path, "rb") as f:
-                file_data = f.read()
-                name = InventoryHandler.get_player_name_from_data(file_data)
-                if name:
-                    char_name_list_import.append((name, file_path))
-        except Exception as e:
-            print(f"Error reading {file_path}: {e}")
+    for file_path, result in probe_slot_files(file_paths, "import"):
+        if isinstance(result, Exception):
+            print(f"Error reading {file_path}: {result}")
+        elif result and result.name:
+            char_name_list_import.append((result.name, file_path))
 
 
 def split_files_import(file_path, folder_name):
@@ -771,11 +827,17 @@ def load_imported_data(path):
         imported_data[:offset] + bytes.fromhex(steam_id) + imported_data[offset + 8 :]
     )
 
+    # Edits write into globals.data in place, so it must stay a bytearray
     if len(imported_data) <= len(globals.data):
-        globals.data = imported_data + globals.data[len(imported_data) :]
+        globals.data = bytearray(imported_data) + globals.data[len(imported_data) :]
 
     else:
-        globals.data = imported_data[: len(globals.data)]
+        globals.data = bytearray(imported_data[: len(globals.data)])
+    SaveBuffer().mark_all()
+    EditJournal().clear()
+    # The handlers still describe the replaced character and view its old buffer
+    InventoryHandler().parse()
+    LoadoutHandler().parse()
 
     for name, file in char_name_list_import:
         if path == file:
@@ -830,19 +892,17 @@ def export_relics_to_excel(filepath="relics.xlsx"):
         eff = game_data.effects.get(eid, None)
         return eff.name if eff else f"UnknownEffect({eid})"
 
-    # Fill sheet
-    for relic_ga in inventory.relic_gas:
-        item_id = inventory.relics[relic_ga].state.item_id
+    # Fill sheet, reading the columnar relic table instead of each relic's state
+    table = inventory.relic_table
+    for real_id, effects in zip(table.relic_id.tolist(), table.effects.tolist()):
         # Skip invalid relics
-        if item_id in (0, -1, 0xFFFFFFFF):
+        if real_id in (0, 0x00FFFFFF):
             continue
 
-        real_id = item_id - 2147483648
         # Get relic name
         item = game_data.relics.get(real_id)
         relic_name = item.name if item else f"UnknownRelic({real_id})"
         relic_color = item.color if item else "Unknown"
-        effects = inventory.relics[relic_ga].state.effects_and_curses
         row = [
             real_id,
             relic_name,
@@ -948,16 +1008,11 @@ def delete_all_illegal_relics():
     if not inventory.illegal_gas:
         return 0, "No illegal relics found"
 
-    deleted_count = 0
-    failed_deletions = []
-
-    for ga in inventory.illegal_gas:
-        try:
-            inventory.remove_relic_from_inventory(ga)
-            save_current_data()
-            deleted_count += 1
-        except Exception as e:
-            failed_deletions.append(e)
+    # Loadout slots holding these relics are emptied as well
+    removed, failed = LoadoutHandler().remove_relics(list(inventory.illegal_gas))
+    save_current_data()
+    deleted_count = len(removed)
+    failed_deletions = list(failed.values())
 
     if failed_deletions:
         return (
@@ -971,9 +1026,8 @@ def delete_all_illegal_relics():
 def save_current_data():
     global userdata_path
     if globals.data and userdata_path:
-        with open(userdata_path, "wb") as f:
-
-            f.write(globals.data)
+        # Only the dirty ranges are patched into the file
+        SaveBuffer().flush(userdata_path)
 
 
 def aob_to_pattern(aob: str):
@@ -1692,6 +1746,9 @@ class SaveEditorGUI:
         self.relic_checker = RelicChecker()
         self.inventory_handler = InventoryHandler()
         self.loadout_handler = LoadoutHandler()
+        self.journal = EditJournal()
+        self.journal.set_max_size_mb(self.config.journal_max_mb)
+        set_crypto_workers(self.config.crypto_workers)
 
         self.fav_icon_img = ImageTk.PhotoImage(
             Image.open(ICONS_DIR / "bookmark.png").resize((16, 16))
@@ -1741,6 +1798,11 @@ class SaveEditorGUI:
             logger.warning(f"Failed to load language: {lang_code}")
         self.color_theme.apply(self.root)
 
+        # Undo / Redo
+        self.root.bind_all("<Control-z>", lambda e: self.undo_edit())
+        self.root.bind_all("<Control-y>", lambda e: self.redo_edit())
+        self.root.bind_all("<Control-Z>", lambda e: self.redo_edit())
+
         # Try to load last opened file after UI is set up
         self.root.after(100, self.try_load_last_file)
 
@@ -2103,6 +2165,26 @@ class SaveEditorGUI:
         )
         lang_mgr.register(btn_load_loadout, N_("📂 Load Loadout"))
         btn_load_loadout.pack(side="left", padx=5)
+        btn_save_all_loadouts = ttk.Button(
+            controls_frame, text="💾 Save All Loadouts", command=self.save_all_loadouts
+        )
+        lang_mgr.register(btn_save_all_loadouts, N_("💾 Save All Loadouts"))
+        btn_save_all_loadouts.pack(side="left", padx=5)
+        btn_load_all_loadouts = ttk.Button(
+            controls_frame, text="📂 Load All Loadouts", command=self.load_all_loadouts
+        )
+        lang_mgr.register(btn_load_all_loadouts, N_("📂 Load All Loadouts"))
+        btn_load_all_loadouts.pack(side="left", padx=5)
+        btn_share_loadout = ttk.Button(
+            controls_frame, text="🔗 Share Loadout", command=self.copy_loadout_share_code
+        )
+        lang_mgr.register(btn_share_loadout, N_("🔗 Share Loadout"))
+        btn_share_loadout.pack(side="left", padx=5)
+        btn_import_code = ttk.Button(
+            controls_frame, text="🔗 Import Share Code", command=self.import_share_code
+        )
+        lang_mgr.register(btn_import_code, N_("🔗 Import Share Code"))
+        btn_import_code.pack(side="left", padx=5)
 
         # Character selector
         lb_cha = ttk.Label(controls_frame, text="Character:")
@@ -2225,12 +2307,9 @@ class SaveEditorGUI:
         def on_add_to_preset(vessel_slot):
             hero_type = self.vessel_char_combo.current() + 1
             preset_name = open_new_preset_name_dialog()
-            vessel_id = self.loadout_handler.heroes[hero_type].vessels[vessel_slot][
-                "vessel_id"
-            ]
-            relics = self.loadout_handler.heroes[hero_type].vessels[vessel_slot][
-                "relics"
-            ]
+            vessel = self.loadout_handler.heroes[hero_type].vessels[vessel_slot]
+            vessel_id = vessel.vessel_id
+            relics = list(vessel.relics)
             if preset_name is None:
                 return
             try:
@@ -2267,6 +2346,13 @@ class SaveEditorGUI:
             )
             lang_mgr.register(add_to_preset_button, N_("➕ Add to Preset"))
             add_to_preset_button.pack(side="right", padx=5)
+            optimize_button = ttk.Button(
+                label_line_frame,
+                text="🎯 Optimize",
+                command=lambda v=i: self.open_optimize_vessel_dialog(v),
+            )
+            lang_mgr.register(optimize_button, N_("🎯 Optimize"))
+            optimize_button.pack(side="right", padx=5)
 
             # Treeview for relics in this vessel - 6 slots (3 normal + 3 deep relics)
             columns = (
@@ -2374,9 +2460,7 @@ class SaveEditorGUI:
             vessel_data_info = get_vessel_info(char_name, vessel_slot)
             vessel_name = vessel_data_info["name"]
             hero_type = self.vessel_char_combo.current() + 1
-            vessel_id = self.loadout_handler.heroes[hero_type].vessels[vessel_slot][
-                "vessel_id"
-            ]
+            vessel_id = self.loadout_handler.heroes[hero_type].vessels[vessel_slot].vessel_id
 
             # Update vessel frame title with actual vessel name
             if vessel_slot < len(self.vessel_frames):
@@ -2584,12 +2668,12 @@ class SaveEditorGUI:
         presets = self.loadout_handler.heroes[hero_type].presets
 
         for preset in presets:
-            vessel_id = preset.get("vessel_id", 0)
+            vessel_id = preset.vessel_id
             vessel_slot = self.loadout_handler.get_vessel_index_in_hero(
                 hero_type, vessel_id
             )
-            preset_name = preset.get("name", "Unknown")
-            ga_handles = preset.get("relics", [])
+            preset_name = preset.name
+            ga_handles = preset.relics
 
             # Collect relic info with names and effects grouped per relic
             relic_data_list = []  # For color indicators
@@ -2756,7 +2840,7 @@ class SaveEditorGUI:
             }
 
             def on_equip_preset(target_preset, target_vessel_slot):
-                cur_preset_name = target_preset.get("name", "Unknown")
+                cur_preset_name = target_preset.name
                 _vessel_info = get_vessel_info(char_name, target_vessel_slot)
                 cur_vessel_name = _vessel_info.get(
                     "name", f"Vessel {target_vessel_slot}"
@@ -2770,7 +2854,7 @@ class SaveEditorGUI:
                 ):
                     try:
                         self.loadout_handler.equip_preset(
-                            cur_preset["hero_type"], cur_preset["index"]
+                            cur_preset.hero_type, cur_preset.index
                         )
                         save_current_data()
                         msg_info(
@@ -2848,9 +2932,9 @@ class SaveEditorGUI:
         preset = preset_info["preset"]
         ga_to_relic_info = preset_info["ga_to_relic_info"]
 
-        preset_name = preset.get("name", "Unknown")
-        preset_offset = preset.get("offsets", 0)
-        ga_handles = preset.get("relics", [])
+        preset_name = preset.name
+        preset_offset = preset.offset
+        ga_handles = list(preset.relics)  # Working copy for the dialog
 
         # Build extended relic info with effects from ga_relic
         ga_to_full_info = {}
@@ -3144,7 +3228,7 @@ class SaveEditorGUI:
             ga_handles[idx] = 0
             try:
                 self.loadout_handler.replace_preset_relic(
-                    preset["hero_type"], idx, 0, preset_index=preset["index"]
+                    preset.hero_type, idx, 0, preset_index=preset.index
                 )
                 slot_relic_data[idx] = None
                 update_slot_display()
@@ -3501,7 +3585,7 @@ class SaveEditorGUI:
             # Write to file
             try:
                 self.loadout_handler.replace_preset_relic(
-                    preset["hero_type"], idx, new_ga, preset_index=preset["index"]
+                    preset.hero_type, idx, new_ga, preset_index=preset.index
                 )
                 slot_relic_data[idx] = relic_data
                 update_slot_display()
@@ -3560,12 +3644,12 @@ class SaveEditorGUI:
         if globals.data is None:
             return False
 
-        # Preset structure: [vessel_id (4 bytes)] [6 GA handles (4 bytes each)]
-        # GA handles start at offset + 4
-        relic_offset = preset_offset["relics"] + (slot_idx * 4)
+        # preset_offset is the preset record start, see PRESET
+        relic_offset = preset_offset + PRESET.offsets["relics"] + (slot_idx * 4)
 
         try:
-            struct.pack_into("<I", globals.data, relic_offset, new_ga_handle)
+            with EditJournal().transaction("Replace preset relic", loadout=True):
+                SaveBuffer().pack_into("<I", relic_offset, new_ga_handle)
             return True
         except Exception as e:
             messagebox.showerror("Error", f"Failed to write preset relic: {e}")
@@ -3814,9 +3898,7 @@ class SaveEditorGUI:
 
         def clear_relic(slot_index):
             hero_type = self.vessel_char_combo.current() + 1
-            vessel_id = self.loadout_handler.heroes[hero_type].vessels[vessel_slot][
-                "vessel_id"
-            ]
+            vessel_id = self.loadout_handler.heroes[hero_type].vessels[vessel_slot].vessel_id
             self.loadout_handler.replace_vessel_relic(
                 hero_type, vessel_id, slot_index, 0
             )
@@ -4300,6 +4382,186 @@ class SaveEditorGUI:
         # Auto-size columns after populating
         autosize_treeview_columns(tree)
 
+    def open_optimize_vessel_dialog(self, vessel_slot):
+        """Open dialog to find the best relics for a vessel from a weighted effect wish-list"""
+        hero_type = self.vessel_char_combo.current() + 1
+        try:
+            vessel_id = self.loadout_handler.get_vessel_id(hero_type, vessel_slot)
+        except (ValueError, KeyError) as e:
+            messagebox.showerror("Error", str(e))
+            return
+
+        # Offer only effects found on owned relics, anything else can't score
+        snapshot = self.inventory_handler.snapshot()
+        owned_effects = {
+            eff for relic in snapshot.relics.values() for eff in relic.effects
+            if eff not in (0, 0xFFFFFFFF)
+        }
+        effect_names = {}
+        for eff_id in owned_effects:
+            effect = self.game_data.effects.get(eff_id)
+            if effect is not None:
+                effect_names[eff_id] = effect.name
+        sorted_effects = sorted(effect_names.items(), key=lambda x: x[1])
+        wishes = {}
+
+        dialog = tk.Toplevel(self.root, bg=self.color_theme.base["card_bg"])
+        dialog.title(f"Optimize Vessel - {self.game_data.vessels[vessel_id].name}")
+        dialog.geometry("900x600")
+        dialog.minsize(700, 450)
+        dialog.transient(self.root)
+        dialog.grab_set()
+
+        # Wish-list editor
+        wish_frame = ttk.LabelFrame(dialog, text="Wanted Effects")
+        wish_frame.pack(fill="x", padx=10, pady=5)
+
+        picker_frame = ttk.Frame(wish_frame)
+        picker_frame.pack(side="left", fill="both", expand=True, padx=5, pady=5)
+        search_var = tk.StringVar()
+        ttk.Entry(picker_frame, textvariable=search_var).pack(fill="x")
+        effect_list = tk.Listbox(picker_frame, height=8, exportselection=False)
+        effect_list.pack(fill="both", expand=True, pady=(5, 0))
+        shown_effects = []
+
+        def refresh_effect_list(*args):
+            search_lower = search_var.get().lower()
+            effect_list.delete(0, tk.END)
+            shown_effects.clear()
+            for eff_id, name in sorted_effects:
+                if search_lower and search_lower not in name.lower():
+                    continue
+                shown_effects.append(eff_id)
+                effect_list.insert(tk.END, name)
+
+        search_var.trace("w", refresh_effect_list)
+        refresh_effect_list()
+
+        controls_frame = ttk.Frame(wish_frame)
+        controls_frame.pack(side="left", padx=5, pady=5)
+        ttk.Label(controls_frame, text="Weight").pack()
+        weight_var = tk.IntVar(value=1)
+        ttk.Spinbox(controls_frame, from_=-10, to=10, textvariable=weight_var, width=5).pack(pady=5)
+
+        wish_tree = ttk.Treeview(wish_frame, columns=("Effect", "Weight"), show="headings", height=8)
+        wish_tree.heading("Effect", text="Effect")
+        wish_tree.heading("Weight", text="Weight")
+        wish_tree.column("Effect", width=260)
+        wish_tree.column("Weight", width=60)
+        wish_tree.pack(side="left", fill="both", expand=True, padx=5, pady=5)
+
+        def refresh_wish_tree():
+            for item in wish_tree.get_children():
+                wish_tree.delete(item)
+            for eff_id, weight in wishes.items():
+                wish_tree.insert("", "end", text=str(eff_id), values=(effect_names[eff_id], weight))
+
+        def add_wish():
+            selection = effect_list.curselection()
+            if not selection:
+                return
+            try:
+                weight = int(weight_var.get())
+            except (tk.TclError, ValueError):
+                messagebox.showerror("Error", "Weight must be a number")
+                return
+            eff_id = shown_effects[selection[0]]
+            if weight == 0:
+                wishes.pop(eff_id, None)
+            else:
+                wishes[eff_id] = weight
+            refresh_wish_tree()
+
+        def remove_wish():
+            for item in wish_tree.selection():
+                wishes.pop(int(wish_tree.item(item, "text")), None)
+            refresh_wish_tree()
+
+        ttk.Button(controls_frame, text="Add ➡", command=add_wish).pack(fill="x", pady=2)
+        ttk.Button(controls_frame, text="Remove", command=remove_wish).pack(fill="x", pady=2)
+        effect_list.bind("<Double-1>", lambda e: add_wish())
+
+        # Search options
+        options_frame = ttk.Frame(dialog)
+        options_frame.pack(fill="x", padx=10, pady=5)
+        stacking_var = tk.BooleanVar(value=True)
+        include_illegal_var = tk.BooleanVar(value=False)
+        top_k_var = tk.IntVar(value=5)
+        ttk.Checkbutton(options_frame, text="Count repeated effects", variable=stacking_var).pack(side="left", padx=5)
+        ttk.Checkbutton(options_frame, text="Include illegal relics", variable=include_illegal_var).pack(side="left", padx=5)
+        ttk.Label(options_frame, text="Results").pack(side="left", padx=(20, 5))
+        ttk.Spinbox(options_frame, from_=1, to=20, textvariable=top_k_var, width=5).pack(side="left")
+
+        btn_frame = ttk.Frame(dialog)
+        btn_frame.pack(side="bottom", fill="x", padx=10, pady=10)
+
+        # Results
+        result_frame = ttk.LabelFrame(dialog, text="Suggestions")
+        result_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        columns = ("Score", "Slot 1", "Slot 2", "Slot 3", "Deep 1", "Deep 2", "Deep 3")
+        result_tree = ttk.Treeview(result_frame, columns=columns, show="headings", height=8)
+        for col in columns:
+            result_tree.heading(col, text=col)
+        result_tree.column("Score", width=60)
+        vsb = ttk.Scrollbar(result_frame, orient="vertical", command=result_tree.yview)
+        result_tree.configure(yscrollcommand=vsb.set)
+        result_tree.pack(side="left", fill="both", expand=True)
+        vsb.pack(side="right", fill="y")
+        status_label = ttk.Label(dialog, text="")
+        status_label.pack(side="bottom", anchor="w", padx=10)
+        suggestions = []
+
+        def relic_label(ga):
+            if ga == 0:
+                return "-"
+            relic = self.game_data.relics.get(snapshot.relics[ga].real_id)
+            return relic.name if relic else str(ga)
+
+        def do_search():
+            if not wishes:
+                messagebox.showwarning("Warning", "Add at least one wanted effect")
+                return
+            try:
+                result = self.loadout_handler.suggest_vessel_relics(
+                    hero_type, vessel_id, wishes, top_k=int(top_k_var.get()),
+                    stacking=stacking_var.get(), include_illegal=include_illegal_var.get(),
+                )
+            except Exception as e:
+                messagebox.showerror("Error", f"Search failed: {e}")
+                return
+            suggestions[:] = result.suggestions
+            for item in result_tree.get_children():
+                result_tree.delete(item)
+            for idx, suggestion in enumerate(suggestions):
+                result_tree.insert(
+                    "", "end", text=str(idx),
+                    values=(f"{suggestion.score:g}", *[relic_label(ga) for ga in suggestion.relics]),
+                )
+            autosize_treeview_columns(result_tree)
+            status = f"{len(suggestions)} suggestion(s) in {result.elapsed * 1000:.0f} ms"
+            if not result.complete:
+                status += " (time limit reached, results may not be optimal)"
+            status_label.config(text=status)
+
+        def do_apply():
+            selection = result_tree.selection()
+            if not selection:
+                messagebox.showwarning("Warning", "Please select a suggestion to apply")
+                return
+            suggestion = suggestions[int(result_tree.item(selection[0], "text"))]
+            try:
+                self.loadout_handler.apply_vessel_relics(hero_type, vessel_id, suggestion.relics)
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to apply relics: {e}")
+                return
+            dialog.destroy()
+            self.refresh_inventory_and_vessels()
+            msg_info("Success", "Relics applied successfully!")
+
+        ttk.Button(btn_frame, text="Search", command=do_search).pack(side="left", padx=5)
+        ttk.Button(btn_frame, text="Apply", command=do_apply).pack(side="left", padx=5)
+        ttk.Button(btn_frame, text="Cancel", command=dialog.destroy).pack(side="left", padx=5)
+
     def replace_vessel_relic(self, char_name, vessel_slot, slot_index, new_ga):
         """Replace a relic in a vessel slot with a new one"""
 
@@ -4497,6 +4759,94 @@ class SaveEditorGUI:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load loadout: {e}")
 
+    def save_all_loadouts(self):
+        """Save the loadouts of all characters to one JSON file"""
+        if globals.data is None:
+            msg_warning("Warning", "No character loaded")
+            return
+
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json")],
+            initialfile="all_loadouts.json",
+            title="Save All Loadouts",
+        )
+        if not file_path:
+            return
+        try:
+            self.loadout_handler.export_all_loadouts(file_path)
+            msg_info("Success", f"All loadouts saved to {file_path}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save loadouts: {e}")
+
+    def load_all_loadouts(self):
+        """Import every preset and vessel from one or more loadout files at once"""
+        if globals.data is None:
+            messagebox.showwarning("Warning", "No character loaded")
+            return
+
+        file_paths = filedialog.askopenfilenames(
+            filetypes=[("JSON files", "*.json")], title="Load All Loadouts"
+        )
+        if not file_paths:
+            return
+
+        try:
+            result_msgs = self.loadout_handler.import_all_loadouts(list(file_paths))
+            self.refresh_inventory_and_vessels()
+            messagebox.showinfo("Result", "\n".join(result_msgs))
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load loadouts: {e}")
+
+    def _copy_to_clipboard(self, text):
+        self.root.clipboard_clear()
+        self.root.clipboard_append(text)
+
+    def copy_loadout_share_code(self):
+        """Copy a compact share code of the current character's loadout to the clipboard"""
+        if globals.data is None:
+            msg_warning("Warning", "No character loaded")
+            return
+        hero_type = self.vessel_char_combo.current() + 1
+        try:
+            code = self.loadout_handler.loadout_share_code([hero_type])
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to create share code: {e}")
+            return
+        self._copy_to_clipboard(code)
+        msg_info("Success", f"Share code copied to clipboard ({len(code)} characters)")
+
+    def copy_relics_share_code(self):
+        """Copy a share code of the selected relics to the clipboard"""
+        selection = self.tree.selection()
+        if not selection:
+            messagebox.showwarning("Warning", "No relic selected")
+            return
+        ga_handles = [int(self.tree.item(item, "tags")[0]) for item in selection]
+        try:
+            code = self.loadout_handler.relic_share_code(ga_handles)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to create share code: {e}")
+            return
+        self._copy_to_clipboard(code)
+        msg_info("Success", f"Share code for {len(ga_handles)} relic(s) copied to clipboard")
+
+    def import_share_code(self):
+        """Import a loadout or relic share code"""
+        if globals.data is None:
+            messagebox.showwarning("Warning", "No character loaded")
+            return
+        code = simpledialog.askstring("Import Share Code", "Paste a loadout or relic share code:",
+                                      parent=self.root)
+        if not code:
+            return
+        try:
+            result_msgs = self.loadout_handler.import_share_code(code)
+            self.refresh_inventory_and_vessels()
+            messagebox.showinfo("Result", "\n".join(result_msgs))
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to import share code: {e}")
+
     def setup_inventory_tab(self):
 
         # Controls frame
@@ -4554,6 +4904,18 @@ class SaveEditorGUI:
         lang_mgr.register(btn_mfix, N_("🔧 Mass Fix"))
         btn_mfix.pack(side="left", padx=5)
 
+        btn_share_relics = ttk.Button(
+            controls_frame, text="🔗 Share Selected", command=self.copy_relics_share_code
+        )
+        lang_mgr.register(btn_share_relics, N_("🔗 Share Selected"))
+        btn_share_relics.pack(side="left", padx=5)
+
+        btn_import_code = ttk.Button(
+            controls_frame, text="🔗 Import Share Code", command=self.import_share_code
+        )
+        lang_mgr.register(btn_import_code, N_("🔗 Import Share Code"))
+        btn_import_code.pack(side="left", padx=5)
+
         # ====================================================
 
         legend_frame = ttk.Frame(self.inventory_tab)
@@ -5004,19 +5366,33 @@ class SaveEditorGUI:
         global userdata_path, steam_id
         userdata_path = path
 
+        self.model_cache_key = None
         try:
-            with open(path, "rb") as f:
-                globals.data = bytearray(
-                    f.read()
-                )  # Use bytearray for in-place modifications
+            SaveBuffer().load(path)
+            self.journal.clear()
+            self.inventory_handler = InventoryHandler()
+            self.loadout_handler = LoadoutHandler()
+
+            # Unchanged character: restore the parsed and validated model from disk
+            model_cache_key = model_cache.cache_key(globals.data)
+            if model_cache.load_model(
+                model_cache_key, self.inventory_handler, self.loadout_handler
+            ):
+                steam_id = find_steam_id(globals.data)
+                self.filter_relics()
+                self.refresh_inventory_ui()
+                self.refresh_stats()
+                self.refresh_vessels()
+                return
 
             # Parse items
-            self.inventory_handler = InventoryHandler()
             self.inventory_handler.parse()
 
             # Parse Vessels and Presets
-            self.loadout_handler = LoadoutHandler()
             self.loadout_handler.parse()
+            # Cached once validated, unless anything is written (edit, undo, import) before that
+            self.model_cache_key = model_cache_key
+            self.model_cache_writes = SaveBuffer().write_count
 
             # Initialize Relic Checker (set_illegal_relics will be called by reload_inventory)
             relic_checker = RelicChecker()
@@ -5105,6 +5481,29 @@ class SaveEditorGUI:
             self.refresh_stats()
             msg_info("Success", "Sigs updated successfully")
 
+    def undo_edit(self):
+        self._replay_edit(self.journal.undo)
+
+    def redo_edit(self):
+        self._replay_edit(self.journal.redo)
+
+    def _replay_edit(self, replay):
+        if globals.data is None:
+            return
+        # Leave text fields alone
+        if isinstance(self.root.focus_get(), (tk.Entry, tk.Text, ttk.Entry)):
+            return
+        # Handlers reparse themselves through the journal listeners
+        entry = replay()
+        if entry is None:
+            return
+        save_current_data()
+        self.filter_relics()
+        self.refresh_inventory_ui()
+        if entry.loadout:
+            self.refresh_vessels()
+        self.refresh_stats()
+
     def reparse(self):
         # Parse items - this updates inventory with current data
         self.inventory_handler.parse()
@@ -5129,10 +5528,13 @@ class SaveEditorGUI:
         # Forbidden relics are marked orange and shouldn't count as "illegal" - ignore
         # Unique Relic with wrong Effects should be count as "illegal"
 
+        # Read one immutable snapshot, background validation can't change it under us
+        snapshot = self.inventory_handler.snapshot()
+
         # Update illegal count label
-        if self.inventory_handler.illegal_count > 0:
+        if snapshot.illegal_gas:
             self.illegal_count_label.config(
-                text=f"⚠️ {self.inventory_handler.illegal_count} Illegal Relic(s) Found"
+                text=f"⚠️ {len(snapshot.illegal_gas)} Illegal Relic(s) Found"
             )
         else:
             self.illegal_count_label.config(text="✓ All Relics Valid")
@@ -5140,8 +5542,9 @@ class SaveEditorGUI:
         # Store all relic data for filtering
         self.all_relics = []
         # Populate treeview
-        for idx, ga in enumerate(self.inventory_handler.relic_gas):
-            real_id = self.inventory_handler.relics[ga].state.real_item_id
+        for idx, ga in enumerate(snapshot.relic_gas):
+            relic = snapshot.relics[ga]
+            real_id = relic.real_id
 
             # Get item name and color
             _item = self.game_data.relics[real_id]
@@ -5149,7 +5552,7 @@ class SaveEditorGUI:
             item_color = _item.color if _item else "Unknown"
 
             # Get effect names
-            effects = self.inventory_handler.relics[ga].state.effects_and_curses
+            effects = list(relic.effects)
             effect_names = []
 
             for eff_id in effects:
@@ -5165,19 +5568,13 @@ class SaveEditorGUI:
                     effect_names.append(f"Unknown ({eff_id})")
 
             # Check if this relic is illegal or forbidden
-            is_illegal = ga in self.inventory_handler.illegal_gas
+            is_illegal = ga in snapshot.illegal_gas
             is_forbidden = real_id in forbidden_relics
-            is_curse_illegal = (
-                self.inventory_handler
-                and ga in self.inventory_handler.curse_illegal_gas
-            )
-            is_strict_invalid = (
-                self.inventory_handler
-                and ga in self.inventory_handler.strict_invalid_gas
-            )
+            is_curse_illegal = ga in snapshot.curse_illegal_gas
+            is_strict_invalid = ga in snapshot.strict_invalid_gas
 
             # Get character assignment (which characters have this relic equipped)
-            equipped_by_hero_type = self.inventory_handler.get_relic_equipped_by(ga)
+            equipped_by_hero_type = relic.equipped_by
             equipped_by = [
                 self.game_data.character_names[h_t - 1] for h_t in equipped_by_hero_type
             ]
@@ -5187,7 +5584,7 @@ class SaveEditorGUI:
             is_deep = 2000000 <= real_id <= 2019999
 
             # Check if this is marked as favorite
-            is_favorite = self.inventory_handler.relics[ga].is_favorite
+            is_favorite = relic.is_favorite
 
             # Determine tag
             tag_list = [ga, real_id]
@@ -5206,9 +5603,7 @@ class SaveEditorGUI:
 
             # Get acquisition order from inventory section (matches in-game sorting)
             # Lower number = acquired earlier (oldest)
-            acquisition_order = self.inventory_handler.ga_to_acquisition_id.get(
-                ga, 999999
-            )
+            acquisition_order = relic.acquisition_id
 
             # Store relic data for filtering
             self.all_relics.append(
@@ -5277,15 +5672,28 @@ class SaveEditorGUI:
             return
 
         self.reparse()
+        # Validate a fixed snapshot, edits made meanwhile are reconciled on publish
+        snapshot = self.inventory_handler.snapshot()
 
         def heavy_loading():
             # Update relic checker with new ga_relic and recalculate illegal relics
             if self.inventory_handler:
-                self.inventory_handler.set_illegal_relics()
+                result = self.inventory_handler.validate_snapshot(snapshot)
+                self.inventory_handler.publish_validation(result)
 
-        self.run_task_async(
-            heavy_loading, (), "Loading...", callback=self.refresh_inventory_ui
-        )
+        def on_loaded():
+            self.refresh_inventory_ui()
+            self.store_model_cache()
+
+        self.run_task_async(heavy_loading, (), "Loading...", callback=on_loaded)
+
+    def store_model_cache(self):
+        # Only a model of the bytes as loaded is worth caching
+        key = getattr(self, "model_cache_key", None)
+        if key is None or SaveBuffer().write_count != self.model_cache_writes:
+            return
+        model_cache.save_model(key, self.inventory_handler, self.loadout_handler)
+        self.model_cache_key = None
 
     def filter_relics(self):
         """Filter relics based on search term and all filter criteria"""
@@ -5740,41 +6148,21 @@ class SaveEditorGUI:
             msg_warning("Warning", "No relic selected")
             return
 
+        ga_handles = [int(self.tree.item(item, "tags")[0]) for item in selection]
         # Check if multiple items selected
         if len(selection) > 1:
-            result = messagebox.askyesno(
-                "Confirm Delete",
-                f"Are you sure you want to delete {len(selection)} relics?",
-            )
+            confirm_msg = f"Are you sure you want to delete {len(selection)} relics?"
         else:
-            item = selection[0]
-            tags = self.tree.item(item, "tags")
+            tags = self.tree.item(selection[0], "tags")
             item_id = int(tags[1])
-            result = messagebox.askyesno(
-                "Confirm Delete",
-                f"Are you sure you want to delete this relic (ID: {item_id})?",
-            )
+            confirm_msg = f"Are you sure you want to delete this relic (ID: {item_id})?"
+        confirm_msg += self.relic_usage_warning(ga_handles)
+        result = messagebox.askyesno("Confirm Delete", confirm_msg)
 
         if result:
-            deleted_count = 0
-            failed_count = 0
-
-            for item in selection:
-                tags = self.tree.item(item, "tags")
-                ga_handle = int(tags[0])
-                item_id = int(tags[1])
-
-                try:
-                    del_result = self.inventory_handler.remove_relic_from_inventory(
-                        ga_handle
-                    )
-                except Exception as e:
-                    del_result = False
-
-                if del_result:
-                    deleted_count += 1
-                else:
-                    failed_count += 1
+            removed, failed = self.loadout_handler.remove_relics(ga_handles)
+            deleted_count = len(removed)
+            failed_count = len(failed)
 
             if deleted_count > 0:
                 messagebox.showinfo(
@@ -5787,6 +6175,18 @@ class SaveEditorGUI:
             else:
                 messagebox.showerror("Error", "Failed to delete relics")
 
+    def relic_usage_warning(self, ga_handles) -> str:
+        """Confirmation text listing the vessels/presets that still use the relics"""
+        refs = [ref for ga in ga_handles for ref in self.loadout_handler.get_relic_refs(ga)]
+        if not refs:
+            return ""
+        vessel_count = len({(r.hero_type, r.key) for r in refs if r.kind == RelicRefIndex.VESSEL})
+        preset_count = len({r.key for r in refs if r.kind == RelicRefIndex.PRESET})
+        return (
+            f"\n\nUsed in {vessel_count} vessel(s) and {preset_count} preset(s). "
+            f"Those slots will be emptied."
+        )
+
     def select_all_relics(self):
         """Select all relics in the tree"""
         all_items = self.tree.get_children()
@@ -5824,10 +6224,13 @@ class SaveEditorGUI:
             if "forbidden" in tags:
                 forbidden_count += 1
 
+        ga_handles = [int(self.tree.item(item, "tags")[0]) for item in selection]
+
         # Confirmation message
         confirm_msg = (
             f"Are you sure you want to delete {len(selection)} selected relic(s)?"
         )
+        confirm_msg += self.relic_usage_warning(ga_handles)
         if forbidden_count > 0:
             confirm_msg += (
                 f"\n\n⚠️ WARNING: {forbidden_count} of these are 'Do Not Edit' relics!"
@@ -5844,19 +6247,9 @@ class SaveEditorGUI:
             return
 
         # Delete all selected relics
-        deleted_count = 0
-        failed_count = 0
-
-        for item in selection:
-            tags = self.tree.item(item, "tags")
-            ga_handle = int(tags[0])
-            item_id = int(tags[1])
-
-            result = self.inventory_handler.remove_relic_from_inventory(ga_handle)
-            if result:
-                deleted_count += 1
-            else:
-                failed_count += 1
+        removed, failed = self.loadout_handler.remove_relics(ga_handles)
+        deleted_count = len(removed)
+        failed_count = len(failed)
 
         # Show result
         if deleted_count > 0:
@@ -5886,10 +6279,13 @@ class SaveEditorGUI:
         fixable_strict = []
         unfixable_relics = []
 
-        for ga in self.inventory_handler.relic_gas:
-            item_id = self.inventory_handler.relics[ga].state.item_id
-            real_id = self.inventory_handler.relics[ga].state.real_item_id
-            effects = self.inventory_handler.relics[ga].state.effects_and_curses
+        table = self.inventory_handler.relic_table
+        illegal_gas = set(self.inventory_handler.illegal_gas)
+        strict_invalid_gas = set(self.inventory_handler.strict_invalid_gas)
+        for ga, real_id, effects in zip(
+            table.ga_handle.tolist(), table.relic_id.tolist(), table.effects.tolist()
+        ):
+            item_id = real_id | 0x80000000
 
             # Skip unique relics
             if real_id in UNIQUENESS_IDS:
@@ -5897,8 +6293,8 @@ class SaveEditorGUI:
 
             _relic = self.game_data.relics.get(real_id)
             item_name = _relic.name if _relic else f"Unknown ({real_id})"
-            is_illegal = ga in self.inventory_handler.illegal_gas
-            is_strict_invalid = ga in self.inventory_handler.strict_invalid_gas
+            is_illegal = ga in illegal_gas
+            is_strict_invalid = ga in strict_invalid_gas
 
             if not is_illegal and not is_strict_invalid:
                 continue
@@ -6121,9 +6517,8 @@ class SaveEditorGUI:
 
         # Reload data
         if userdata_path:
-            with open(userdata_path, "rb") as f:
-                globals.data = bytearray(f.read())
-                self.inventory_handler.parse()
+            SaveBuffer().load(userdata_path)
+            self.inventory_handler.parse()
 
         # Show result
         message = f"Fixed {fixed_count} relic(s)"
@@ -6405,7 +6800,8 @@ class SaveEditorGUI:
 
     def save_changes(self):
         if globals.data and userdata_path:
-            save_file()
+            if save_file() is False:
+                return
             messagebox.showinfo("Success", "Changes saved to file")
         else:
             messagebox.showwarning("Warning", "No character loaded")
@@ -8578,23 +8974,29 @@ class LoadoutSelector(tk.Toplevel):
             relic_list_frame = tk.Frame(frame, bg=self.bg_color)
             relic_list_frame.pack(fill=tk.X, padx=25, pady=(0, 10))
 
-            for ga_handle in item.get("relics", []):
-                self._draw_relic_row(relic_list_frame, ga_handle)
+            for relic in item.get("relics", []):
+                self._draw_relic_row(relic_list_frame, relic)
 
-    def _draw_relic_row(self, parent: tk.Frame, ga_handle: int):
+    def _draw_relic_row(self, parent: tk.Frame, relic):
         """Processes relic ID list: [E1, E2, E3, C1, C2, C3] and draws it."""
-        relic_obj = self.inventory.relics.get(ga_handle)
-        if not relic_obj:
-            return
-
-        state = relic_obj.state
-        static_data = self.game_data.relics[state.real_item_id]
+        if isinstance(relic, dict):
+            # Not owned yet, added by the import: exported relic info
+            real_item_id = relic["relic_id"]
+            ids = [relic["effect_1"], relic["effect_2"], relic["effect_3"],
+                   relic["curse_1"], relic["curse_2"], relic["curse_3"]]
+        else:
+            relic_obj = self.inventory.relics.get(relic)
+            if not relic_obj:
+                return
+            real_item_id = relic_obj.state.real_item_id
+            ids = relic_obj.state.effects_and_curses
+        static_data = self.game_data.relics[real_item_id]
 
         # Color Selection
         color_info = self.color_palette.get(
             static_data.color, self.color_palette["White"]
         )
-        is_deep = self.game_data.relics[state.real_item_id].is_deep()
+        is_deep = static_data.is_deep()
         text_color = color_info["deep"] if is_deep else color_info["normal"]
         base_clr = self.color_theme.base
         action_clr = self.color_theme.action
@@ -8609,7 +9011,6 @@ class LoadoutSelector(tk.Toplevel):
         ).pack(anchor="w")
 
         # Slicing Logic: [0:3] are effects, [3:6] are curses
-        ids = state.effects_and_curses
         effects_ids = ids[0:3]
         curses_ids = ids[3:6]
 
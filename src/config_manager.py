@@ -46,7 +46,9 @@ class ConfigManager:
             "theme": "dark",
             "auto_backup": True,
             "max_backups": 5,
-            "reduce_message_pop": True
+            "reduce_message_pop": True,
+            "journal_max_mb": 16,
+            "crypto_workers": 0
         }
         try:
             if os.path.exists(CONFIG_FILE):
@@ -139,6 +141,26 @@ class ConfigManager:
             self._config["reduce_message_pop"] = value
             self.save()
 
+    @property
+    def journal_max_mb(self):
+        return self._config["journal_max_mb"]
+
+    @journal_max_mb.setter
+    def journal_max_mb(self, value):
+        with self._lock:
+            self._config["journal_max_mb"] = value
+            self.save()
+
+    @property
+    def crypto_workers(self):
+        return self._config["crypto_workers"]
+
+    @crypto_workers.setter
+    def crypto_workers(self, value):
+        with self._lock:
+            self._config["crypto_workers"] = value
+            self.save()
+
     @property
     def last_mode(self):
         return self._config["last_mode"]
@@ -0,0 +1,224 @@
+import threading
+import logging
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+from save_buffer import SaveBuffer
+
+
+logger = logging.getLogger(__name__)
+
+# Rough per-patch bookkeeping cost, counted against the journal size limit
+PATCH_OVERHEAD = 64
+
+
+class JournalEntry:
+    """
+    One undoable edit.
+        patches: (offset, old_bytes, new_bytes) in the order they were written.
+            old and new can differ in length (splices), offsets are valid at the time of the write.
+        relics: ga_handles whose state or entry was touched (model delta).
+        loadout: True if hero loadouts or presets were touched.
+    """
+    __slots__ = ("label", "patches", "relics", "loadout", "size")
+
+    def __init__(self, label: str):
+        self.label = label
+        self.patches: list[tuple[int, bytes, bytes]] = []
+        self.relics: set[int] = set()
+        self.loadout = False
+        self.size = 0
+
+    def add_patch(self, offset: int, old: bytes, new: bytes):
+        if old == new:
+            return
+        self.patches.append((offset, old, new))
+        self.size += len(old) + len(new) + PATCH_OVERHEAD
+
+    def __repr__(self):
+        return f"JournalEntry({self.label!r}, patches={len(self.patches)}, relics={len(self.relics)}, loadout={self.loadout})"
+
+
+class EditJournal:
+    """
+    Undo/redo history of byte-level patches on globals.data.
+        Mutations run inside transaction(); while one is open, every SaveBuffer write is
+        recorded. Undo/redo replay the patches and notify listeners with the entry,
+        so handlers only refresh what the edit touched.
+        Memory is bounded by max_bytes, the oldest entries are dropped first.
+    """
+    _instance = None
+    _lock = threading.RLock()
+    _initialized = False
+
+    def __new__(cls):
+        # Singleton Pattern
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super(EditJournal, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        with self._lock:
+            self._initialized = True
+            self.save_buffer = SaveBuffer()
+            self.max_bytes = 16 * 1024 * 1024
+            self._undo: deque[JournalEntry] = deque()
+            self._redo: list[JournalEntry] = []
+            self._size = 0
+            self._active: JournalEntry = None
+            self._depth = 0
+            self._listeners = []
+
+    def set_max_size_mb(self, size_mb):
+        with self._lock:
+            self.max_bytes = max(0, int(size_mb)) * 1024 * 1024
+            self._trim()
+
+    def add_listener(self, callback):
+        """
+        callback(entry: JournalEntry, is_undo: bool), called after a replay.
+        """
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def clear(self):
+        with self._lock:
+            self._undo.clear()
+            self._redo.clear()
+            self._size = 0
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    @property
+    def undo_label(self):
+        return self._undo[-1].label if self._undo else None
+
+    @property
+    def redo_label(self):
+        return self._redo[-1].label if self._redo else None
+
+    # ---------- Recording ----------
+    @contextmanager
+    def transaction(self, label: str, relics=(), loadout=False):
+        """
+        Record every SaveBuffer write made inside the block as one journal entry.
+            Nested transactions are merged into the outermost one.
+            If the outermost block raises, its writes are reverted and listeners are
+            notified as for an undo, so no half-applied edit is left behind.
+        """
+        with self._lock:
+            if self._depth == 0:
+                self._active = JournalEntry(label)
+                self.save_buffer.recorder = self._active.add_patch
+            entry = self._active
+            entry.relics.update(relics)
+            entry.loadout = entry.loadout or loadout
+            self._depth += 1
+            failed = False
+            try:
+                yield entry
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.save_buffer.recorder = None
+                    self._active = None
+                    if not failed:
+                        self._push(entry)
+                    elif entry.patches:
+                        logger.warning(f"Rolling back failed edit: {entry.label}")
+                        self._apply(entry, True)
+
+    def revert(self, entry: JournalEntry) -> bool:
+        """
+        Undo entry if it is still the latest one, and drop it from the history.
+
+        :return: True if reverted.
+        """
+        with self._lock:
+            if self._depth or not self._undo or self._undo[-1] is not entry:
+                return False
+            self._undo.pop()
+            self._size -= entry.size
+            self._apply(entry, True)
+            logger.info(f"Reverted: {entry.label}")
+            return True
+
+    def _push(self, entry: JournalEntry):
+        if not entry.patches:
+            return
+        self._undo.append(entry)
+        self._size += entry.size
+        for dropped in self._redo:
+            self._size -= dropped.size
+        self._redo.clear()
+        self._trim()
+        logger.debug(f"Journal recorded {entry}")
+
+    def _trim(self):
+        while self._undo and self._size > self.max_bytes:
+            self._size -= self._undo.popleft().size
+
+    # ---------- Replay ----------
+    def _apply(self, entry: JournalEntry, is_undo: bool):
+        patches = reversed(entry.patches) if is_undo else entry.patches
+        for offset, old, new in patches:
+            before, after = (new, old) if is_undo else (old, new)
+            if len(before) == len(after):
+                self.save_buffer.write(offset, after)
+            else:
+                self.save_buffer.splice(offset, offset + len(before), after)
+        for callback in self._listeners:
+            callback(entry, is_undo)
+
+    def undo(self) -> JournalEntry:
+        """
+        :return: The reverted entry, or None if there is nothing to undo.
+        """
+        with self._lock:
+            if self._depth or not self._undo:
+                return None
+            entry = self._undo.pop()
+            self._apply(entry, True)
+            self._redo.append(entry)
+            logger.info(f"Undo: {entry.label}")
+            return entry
+
+    def redo(self) -> JournalEntry:
+        """
+        :return: The re-applied entry, or None if there is nothing to redo.
+        """
+        with self._lock:
+            if self._depth or not self._redo:
+                return None
+            entry = self._redo.pop()
+            self._apply(entry, False)
+            self._undo.append(entry)
+            logger.info(f"Redo: {entry.label}")
+            return entry
+
+
+def journaled(label: str, loadout=False):
+    """
+    Decorator form of EditJournal.transaction for methods without their own with-block.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with EditJournal().transaction(label, loadout=loadout):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
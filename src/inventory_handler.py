@@ -1,32 +1,229 @@
 import struct
-from typing import Literal
+from array import array
+from bisect import bisect_left, insort
+from types import MappingProxyType
+from typing import Literal, Mapping, NamedTuple
 from relic_checker import RelicChecker, InvalidReason, is_curse_invalid
 from source_data_handler import SourceDataHandler
 from globals import ITEM_TYPE_RELIC, ITEM_TYPE_WEAPON, ITEM_TYPE_ARMOR, UNIQUENESS_IDS
 import globals
+from save_buffer import SaveBuffer
+from edit_journal import EditJournal
+from save_schema import RELIC_STATE, ITEM_STATE_HEADER, ITEM_ENTRY
 import logging
 import threading
+import numpy as np
 import pandas as pd
 
 
 logger = logging.getLogger(__name__)
 
 
-def remove_padding_area():
-    # Remove 72 bytes from the padding area at the end of the file.
+# Packed (no alignment padding) layout of one Item Entry record, see ItemEntry.
+ITEM_ENTRY_DTYPE = np.dtype([
+    ("ga_handle", "<u4"),
+    ("item_amount", "<u4"),
+    ("acquisition_id", "<u4"),
+    ("is_favorite", "u1"),
+    ("is_new", "u1"),
+])
+VESSEL_GOODS_RANGE = (9600, 9956)  # Goods IDs of vessels, inclusive
+# Goods IDs of the hero default vessels, owned without an Item Entry
+DEFAULT_VESSEL_GOODS = frozenset((9600, 9603, 9606, 9609, 9612, 9615, 9618, 9621, 9900, 9910))
+
+# Item State record size by type bits. Any other non-empty type uses the base 8 bytes.
+ITEM_STATE_SIZES = {ITEM_TYPE_WEAPON: 88, ITEM_TYPE_ARMOR: 16, ITEM_TYPE_RELIC: 80}
+_U32 = struct.Struct("<I")
+# RelicTable.equipped_mask -> hero types tuple
+_HERO_TYPES_BY_MASK = [tuple(h + 1 for h in range(10) if mask >> h & 1) for mask in range(1 << 10)]
+
+
+class StateScan(NamedTuple):
+    """
+    Layout of the Item State region found by scan_item_states.
+        indices/offsets/sizes describe the non-empty records only, in slot order.
+        end_offset is the first byte after the region.
+    """
+    indices: array
+    offsets: array
+    sizes: array
+    end_offset: int
+
+
+class SlotSummary(NamedTuple):
+    """Character overview read by InventoryHandler.probe_slot_summary."""
+    name: str
+    murks: int
+    sigs: int
+    relic_count: int
+
+
+class RelicTable:
+    """
+    Columnar copy of the owned relics, one row per relic in relic_gas order.
+        Columns are plain NumPy arrays, so batch code and pandas use them without conversion.
+        effects is an (n, 6) array: effect_1~3, curse_1~3.
+        equipped_mask has bit (hero_type - 1) set for every hero that equips the relic.
+        Built by InventoryHandler.parse and kept in sync on every relic change.
+    """
+    # u32 word offsets of the effects and curses inside an 80 bytes relic Item State
+    EFFECT_WORDS = np.array([4, 5, 6, 14, 15, 16])
+    EFFECT_COLUMNS = ('effect_1', 'effect_2', 'effect_3', 'curse_1', 'curse_2', 'curse_3')
+
+    def __init__(self, size=0):
+        self.ga_handle = np.zeros(size, dtype=np.uint32)
+        self.relic_id = np.zeros(size, dtype=np.uint32)
+        self.effects = np.zeros((size, 6), dtype=np.uint32)
+        self.acquisition_id = np.zeros(size, dtype=np.uint32)
+        self.is_favorite = np.zeros(size, dtype=np.bool_)
+        self.is_new = np.zeros(size, dtype=np.bool_)
+        self.equipped_mask = np.zeros(size, dtype=np.uint16)
+        self.row_of: dict[int, int] = {}
+
+    def __len__(self):
+        return len(self.ga_handle)
+
+    @classmethod
+    def from_buffer(cls, data, scan: StateScan, entries: np.ndarray) -> "RelicTable":
+        """
+        Decode the relic columns with vectorized gathers.
+
+        :param data: Userdata buffer. Item State records are 4 bytes aligned.
+        :param scan: Item State layout from scan_item_states.
+        :param entries: Relic rows of the entry table (ITEM_ENTRY_DTYPE).
+        """
+        table = cls(len(entries))
+        table.ga_handle[:] = entries["ga_handle"]
+        table.acquisition_id[:] = entries["acquisition_id"]
+        table.is_favorite[:] = entries["is_favorite"] != 0
+        table.is_new[:] = entries["is_new"] != 0
+        table.row_of = {ga: row for row, ga in enumerate(table.ga_handle.tolist())}
+
+        words = np.frombuffer(data, dtype="<u4", count=len(data) // 4)
+        state_words = np.frombuffer(scan.offsets, dtype=np.uint32) // 4
+        state_gas = words[state_words]
+        is_relic = (state_gas & 0xF0000000) == ITEM_TYPE_RELIC
+        state_words, state_gas = state_words[is_relic], state_gas[is_relic]
+        order = np.argsort(state_gas)
+        state_words, state_gas = state_words[order], state_gas[order]
+
+        pos = np.searchsorted(state_gas, table.ga_handle)
+        pos[pos >= len(state_gas)] = 0
+        found = state_gas[pos] == table.ga_handle if len(state_gas) else np.zeros(len(table), dtype=np.bool_)
+        base = state_words[pos[found]]
+        table.relic_id[found] = words[base + 1] & 0x00FFFFFF
+        table.effects[found] = words[base[:, None] + cls.EFFECT_WORDS]
+        return table
+
+    def update_row(self, entry: "ItemEntry"):
+        row = self.row_of.get(entry.ga_handle)
+        if row is None:
+            return
+        state = entry.state
+        if state is not None:
+            self.relic_id[row] = state.real_item_id
+            self.effects[row] = state.effects_and_curses
+        self.acquisition_id[row] = entry.acquisition_id
+        self.is_favorite[row] = bool(entry.is_favorite)
+        self.is_new[row] = bool(entry.is_new)
+        self.equipped_mask[row] = sum(1 << i for i, count in enumerate(entry.equipped_by) if count > 0)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        columns = {'ga_handle': self.ga_handle, 'relic_id': self.relic_id}
+        for i, name in enumerate(self.EFFECT_COLUMNS):
+            columns[name] = self.effects[:, i]
+        columns['acquisition_id'] = self.acquisition_id
+        columns['is_favorite'] = self.is_favorite
+        columns['is_new'] = self.is_new
+        columns['equipped_mask'] = self.equipped_mask
+        return pd.DataFrame(columns, copy=False)
+
+
+class RelicRecord(NamedTuple):
+    """Immutable copy of one owned relic, see InventorySnapshot."""
+    ga_handle: int
+    real_id: int
+    effects: tuple  # (effect_1, effect_2, effect_3, curse_1, curse_2, curse_3)
+    acquisition_id: int
+    is_favorite: bool
+    is_new: bool
+    equipped_by: tuple  # Hero types
+
+
+class InventorySnapshot(NamedTuple):
+    """
+    Read-only view of the relic inventory at one model version.
+        Safe to read from any thread without locks, it never changes after creation.
+        validated_version is the version the illegal sets were computed on.
+    """
+    version: int
+    relic_gas: tuple
+    relics: Mapping[int, RelicRecord]
+    illegal_gas: frozenset
+    curse_illegal_gas: frozenset
+    strict_invalid_gas: frozenset
+    validated_version: int
+
+
+class ValidationResult(NamedTuple):
+    """Output of InventoryHandler.validate_snapshot, tagged with its source snapshot."""
+    snapshot: InventorySnapshot
+    illegal_gas: list
+    curse_illegal_gas: list
+    strict_invalid_gas: list
+
+
+def scan_item_states(data, start_offset=0x14, slot_count=5120) -> StateScan:
+    """
+    Walk the variable-size Item State region without building ItemState objects.
+        Only the ga_handle of each record is decoded, its type bits give the record size.
+
+    :param data: Userdata buffer.
+    :param start_offset: Offset of the first Item State.
+    :param slot_count: Number of Item State slots.
+    :return: Offsets of the non-empty records and the end of the region.
+    :rtype: StateScan
+    """
+    data_len = len(data)
+    indices = array("H")
+    offsets = array("I")
+    sizes = array("B")
+    unpack_from = _U32.unpack_from
+    state_sizes = ITEM_STATE_SIZES
+    cursor = start_offset
+    for i in range(slot_count):
+        if cursor + 8 > data_len:
+            raise ValueError("Invalid data length. Save File may be corrupted.")
+        ga_handle = unpack_from(data, cursor)[0]
+        if ga_handle == 0:
+            cursor += 8
+            continue
+        size = state_sizes.get(ga_handle & 0xF0000000, 8)
+        if cursor + size > data_len:
+            raise ValueError("Invalid data length. Save File may be corrupted.")
+        indices.append(i)
+        offsets.append(cursor)
+        sizes.append(size)
+        cursor += size
+    return StateScan(indices, offsets, sizes, cursor)
+
+
+def remove_padding_area(count: int = 1):
+    # Remove 72 bytes per added relic from the padding area at the end of the file.
     # Note: Why 72 Bytes? Because empty Item State use 8 Bytes, And Relic Item State Use 80 Bytes.
     # The save file must maintain a constant size for the game to load it.
-    globals.data = globals.data[: -0x1C - 72] + globals.data[-0x1C:]
+    SaveBuffer().splice(len(globals.data) - 0x1C - 72 * count, len(globals.data) - 0x1C, b'')
 
 
-def insert_padding_area():
-    # Insert 72 bytes of padding at the end of the file.
+def insert_padding_area(count: int = 1):
+    # Insert 72 bytes of padding per removed relic at the end of the file.
     # The save file must maintain a constant size for the game to load it.
-    globals.data = globals.data[: -0x1C] + b'\x00' * 72 + globals.data[-0x1C:]
+    SaveBuffer().splice(len(globals.data) - 0x1C, len(globals.data) - 0x1C, b'\x00' * (72 * count))
 
 
 class ItemState:
     BASE_SIZE = 8
+    EMPTY_DATA = bytes.fromhex('00000000FFFFFFFF')  # Immutable, shared by all empty states
 
     def __init__(self):
         self.ga_handle = 0
@@ -34,7 +231,7 @@ class ItemState:
         self.item_id = 0xffffffff
         self.real_item_id = 0x00ffffff
         self.type_bits = 0
-        self.data: bytearray = bytes.fromhex('00000000FFFFFFFF')
+        self.data: bytearray = self.EMPTY_DATA
         self.size = 8
         self.index = -1
 
@@ -63,20 +260,20 @@ class ItemState:
             0xFF, 0xFF, 0xFF, 0xFF
         ])
 
-        _data: bytearray = bytearray(80)
-        struct.pack_into("<I", _data, 0, dummy_relic.ga_handle)  # ga_handle
-        struct.pack_into("<I", _data, 4, dummy_relic.item_id)  # item_id : real_id->100 Delicate Burning Scene/id->2003000 Deep Delicate Burning Scene
-        struct.pack_into("<I", _data, 8, dummy_relic.item_id)  # durability (same as item_id when item is a relic)
-        struct.pack_into("<I", _data, 12, int(0xffffffff))  # unk_1
-        struct.pack_into("<I", _data, 16, int(dummy_effect_id))  # effect_1:Normal-> Vigor + 1(id: 7000000) / Deep -> Poise +3(id:7001002)
-        struct.pack_into("<I", _data, 20, int(0xffffffff))  # effect_2
-        struct.pack_into("<I", _data, 24, int(0xffffffff))  # effect_3
-        _data = _data[:28] + _padding + _data[28+len(_padding):]  # add padding
-        struct.pack_into("<I", _data, 56, int(0xffffffff))  # curse_1
-        struct.pack_into("<I", _data, 60, int(0xffffffff))  # curse_2
-        struct.pack_into("<I", _data, 64, int(0xffffffff))  # curse_3
-        struct.pack_into("<I", _data, 68, int(0xffffffff))  # unk_2
-        struct.pack_into("<Q", _data, 72, int(0))  # 8 bytes end_padding
+        _data = bytearray(RELIC_STATE.pack(
+            ga_handle=dummy_relic.ga_handle,
+            item_id=dummy_relic.item_id,  # real_id->100 Delicate Burning Scene/id->2003000 Deep Delicate Burning Scene
+            durability=dummy_relic.item_id,  # same as item_id when item is a relic
+            unk_1=0xffffffff,
+            effect_1=dummy_effect_id,  # Normal-> Vigor + 1(id: 7000000) / Deep -> Poise +3(id:7001002)
+            effect_2=0xffffffff,
+            effect_3=0xffffffff,
+            curse_1=0xffffffff,
+            curse_2=0xffffffff,
+            curse_3=0xffffffff,
+            unk_2=0xffffffff,
+        ))  # 8 bytes end_padding stay zero
+        _data[28:28+len(_padding)] = _padding  # add padding
 
         dummy_relic.data = _data
         return dummy_relic
@@ -88,7 +285,7 @@ class ItemState:
         if offset + self.BASE_SIZE > data_len:
             raise ValueError("Invalid data length. Save File may be corrupted.")
 
-        self.ga_handle, self.item_id = struct.unpack_from("<II", user_data, offset)
+        self.ga_handle, self.item_id = ITEM_STATE_HEADER.struct.unpack_from(user_data, offset)
         self.type_bits = self.ga_handle & 0xF0000000
         self.instance_id = self.ga_handle & 0x00FFFFFF
         self.real_item_id = self.item_id & 0x00FFFFFF
@@ -116,127 +313,219 @@ class ItemState:
             raise TypeError("Real ID can only be set for relics")
         self.real_item_id = real_id
         self.item_id = self.real_item_id | 0x80000000
-        struct.pack_into("<I", self.data, 4, self.item_id)
+        RELIC_STATE.write(self.data, "item_id", self.item_id)
         self.durability = self.item_id
 
     @property
     def durability(self):
         if self.type_bits != ITEM_TYPE_RELIC:
             return None
-        return struct.unpack_from("<I", self.data, 8)[0]
+        return RELIC_STATE.read(self.data, "durability")
 
     @durability.setter
     def durability(self, value):
         if self.type_bits != ITEM_TYPE_RELIC:
             raise TypeError("Durability can only be set for relics")
-        struct.pack_into("<I", self.data, 8, value)
+        RELIC_STATE.write(self.data, "durability", value)
 
     @property
     def unk_1(self):
         if self.type_bits != ITEM_TYPE_RELIC:
             return None
-        return struct.unpack_from("<I", self.data, 12)[0]
+        return RELIC_STATE.read(self.data, "unk_1")
 
     @unk_1.setter
     def unk_1(self, value):
         if self.type_bits != ITEM_TYPE_RELIC:
             raise TypeError("Unk_1 can only be set for relics")
-        struct.pack_into("<I", self.data, 12, value)
+        RELIC_STATE.write(self.data, "unk_1", value)
 
     @property
     def effect_1(self):
         if self.type_bits != ITEM_TYPE_RELIC:
             return None
-        return struct.unpack_from("<I", self.data, 16)[0]
+        return RELIC_STATE.read(self.data, "effect_1")
 
     @effect_1.setter
     def effect_1(self, value):
         if self.type_bits != ITEM_TYPE_RELIC:
             raise TypeError("Effect_1 can only be set for relics")
-        struct.pack_into("<I", self.data, 16, value)
+        RELIC_STATE.write(self.data, "effect_1", value)
 
     @property
     def effect_2(self):
         if self.type_bits != ITEM_TYPE_RELIC:
             return None
-        return struct.unpack_from("<I", self.data, 20)[0]
+        return RELIC_STATE.read(self.data, "effect_2")
 
     @effect_2.setter
     def effect_2(self, value):
         if self.type_bits != ITEM_TYPE_RELIC:
             raise TypeError("Effect_2 can only be set for relics")
-        struct.pack_into("<I", self.data, 20, value)
+        RELIC_STATE.write(self.data, "effect_2", value)
 
     @property
     def effect_3(self):
         if self.type_bits != ITEM_TYPE_RELIC:
             return None
-        return struct.unpack_from("<I", self.data, 24)[0]
+        return RELIC_STATE.read(self.data, "effect_3")
 
     @effect_3.setter
     def effect_3(self, value):
         if self.type_bits != ITEM_TYPE_RELIC:
             raise TypeError("Effect_3 can only be set for relics")
-        struct.pack_into("<I", self.data, 24, value)
+        RELIC_STATE.write(self.data, "effect_3", value)
 
     @property
     def curse_1(self):
         if self.type_bits != ITEM_TYPE_RELIC:
             return None
-        return struct.unpack_from("<I", self.data, 56)[0]
+        return RELIC_STATE.read(self.data, "curse_1")
 
     @curse_1.setter
     def curse_1(self, value):
         if self.type_bits != ITEM_TYPE_RELIC:
             raise TypeError("Curse_1 can only be set for relics")
-        struct.pack_into("<I", self.data, 56, value)
+        RELIC_STATE.write(self.data, "curse_1", value)
 
     @property
     def curse_2(self):
         if self.type_bits != ITEM_TYPE_RELIC:
             return None
-        return struct.unpack_from("<I", self.data, 60)[0]
+        return RELIC_STATE.read(self.data, "curse_2")
 
     @curse_2.setter
     def curse_2(self, value):
         if self.type_bits != ITEM_TYPE_RELIC:
             raise TypeError("Curse_2 can only be set for relics")
-        struct.pack_into("<I", self.data, 60, value)
+        RELIC_STATE.write(self.data, "curse_2", value)
 
     @property
     def curse_3(self):
         if self.type_bits != ITEM_TYPE_RELIC:
             return None
-        return struct.unpack_from("<I", self.data, 64)[0]
+        return RELIC_STATE.read(self.data, "curse_3")
 
     @curse_3.setter
     def curse_3(self, value):
         if self.type_bits != ITEM_TYPE_RELIC:
             raise TypeError("Curse_3 can only be set for relics")
-        struct.pack_into("<I", self.data, 64, value)
+        RELIC_STATE.write(self.data, "curse_3", value)
 
     @property
     def unk_2(self):
         if self.type_bits != ITEM_TYPE_RELIC:
             return None
-        return struct.unpack_from("<I", self.data, 68)[0]
+        return RELIC_STATE.read(self.data, "unk_2")
 
     @unk_2.setter
     def unk_2(self, value):
         if self.type_bits != ITEM_TYPE_RELIC:
             raise TypeError("Unk_2 can only be set for relics")
-        struct.pack_into("<I", self.data, 68, value)
+        RELIC_STATE.write(self.data, "unk_2", value)
 
     @property
     def effects_and_curses(self):
         if self.type_bits != ITEM_TYPE_RELIC:
             return None
-        return [self.effect_1, self.effect_2, self.effect_3, self.curse_1, self.curse_2, self.curse_3]
+        state = RELIC_STATE.unpack_from(self.data)
+        return [state.effect_1, state.effect_2, state.effect_3, state.curse_1, state.curse_2, state.curse_3]
 
     def __repr__(self):
         return f"ItemState(ga_handle=0x{self.ga_handle:08X}, item_id=0x{self.item_id:08X}, instance_id={self.instance_id}, real_item_id={self.real_item_id}, type_bits=0x{self.type_bits:08X}, size={self.size})"
 
 
+class ItemStateTable:
+    """
+    Sparse storage of the Item State slots.
+        Only non-empty states are kept as objects. Empty slots are implied 8-byte
+        placeholders, so memory and build time scale with the owned items.
+        Indexing, iteration and len() behave like a list of all slots.
+    """
+    def __init__(self, start_offset: int, slot_count: int):
+        self.start_offset = start_offset
+        self.slot_count = slot_count
+        self._states: dict[int, ItemState] = {}
+        self._indices: list[int] = []  # Sorted slot indices of non-empty states
+        self._ga_to_index: dict[int, int] = {}
+        self._extra_prefix: list[int] = None  # Bytes beyond 8 used by the first k states
+
+    @classmethod
+    def from_scan(cls, data, scan: StateScan, start_offset: int, slot_count: int):
+        table = cls(start_offset, slot_count)
+        for i, state_offset in zip(scan.indices, scan.offsets):
+            state = ItemState()
+            state.from_bytes(data, state_offset)
+            state.index = i
+            table._states[i] = state
+            table._indices.append(i)
+            table._ga_to_index[state.ga_handle] = i
+        return table
+
+    def __len__(self):
+        return self.slot_count
+
+    def __getitem__(self, index: int) -> ItemState:
+        if index < 0:
+            index += self.slot_count
+        if not 0 <= index < self.slot_count:
+            raise IndexError("Item State index out of range")
+        state = self._states.get(index)
+        if state is None:
+            state = ItemState()
+            state.index = index
+        return state
+
+    def __setitem__(self, index: int, state: ItemState):
+        if not 0 <= index < self.slot_count:
+            raise IndexError("Item State index out of range")
+        old_state = self._states.pop(index, None)
+        if old_state is not None:
+            self._ga_to_index.pop(old_state.ga_handle, None)
+            self._indices.pop(bisect_left(self._indices, index))
+        if state.ga_handle != 0:
+            state.index = index
+            self._states[index] = state
+            self._ga_to_index[state.ga_handle] = index
+            insort(self._indices, index)
+        self._extra_prefix = None
+
+    def __iter__(self):
+        for i in range(self.slot_count):
+            yield self[i]
+
+    def items(self):
+        """Yield (index, state) of non-empty slots in slot order."""
+        for i in self._indices:
+            yield i, self._states[i]
+
+    @property
+    def non_empty_count(self):
+        return len(self._indices)
+
+    def index_of(self, ga_handle: int) -> int:
+        return self._ga_to_index.get(ga_handle, -1)
+
+    def find_empty_index(self, start: int = 0) -> int:
+        for i in range(start, self.slot_count):
+            if i not in self._states:
+                return i
+        return -1
+
+    def offset_of(self, index: int) -> int:
+        """Byte offset of slot `index` in the userdata buffer."""
+        if self._extra_prefix is None:
+            self._extra_prefix = [0]
+            for i in self._indices:
+                self._extra_prefix.append(self._extra_prefix[-1] + self._states[i].size - ItemState.BASE_SIZE)
+        k = bisect_left(self._indices, index)
+        return self.start_offset + index * ItemState.BASE_SIZE + self._extra_prefix[k]
+
+    @property
+    def end_offset(self):
+        return self.offset_of(self.slot_count)
+
+
 class ItemEntry:
     # Item Entries Section Structure In user_data
     # First 4 bytes: Item count
@@ -249,15 +538,17 @@ class ItemEntry:
     def __init__(self, data_bytes: bytearray):
         if len(data_bytes) != 14:
             raise ValueError("Invalid data length")
-        self.ga_handle = struct.unpack_from("<I", data_bytes, 0)[0]  # Combination of ItemType and Instance ID
+        record = ITEM_ENTRY.unpack_from(data_bytes)
+        self.ga_handle = record.ga_handle  # Combination of ItemType and Instance ID
         self.type_bits = self.ga_handle & 0xF0000000
         self.instance_id = self.ga_handle & 0x00FFFFFF  # Tpye 'Goods' instance id is equal to goodsId
-        self.item_amount = struct.unpack_from("<I", data_bytes, 4)[0]
-        self.acquisition_id = struct.unpack_from("<I", data_bytes, 8)[0]
-        self.is_favorite = bool(data_bytes[12])
-        self.is_new = bool(data_bytes[13])
+        self.item_amount = record.item_amount
+        self.acquisition_id = record.acquisition_id
+        self.is_favorite = bool(record.is_favorite)
+        self.is_new = bool(record.is_new)
         self.state: ItemState = None
         self.equipped_by: list[int] = [0] * 10
+        self.index = -1  # Slot index in the entry table
 
     @classmethod
     def create_from_state(cls, state: ItemState, acquisition_id: int):
@@ -272,13 +563,12 @@ class ItemEntry:
 
     @property
     def data_bytes(self):
-        _data = bytearray(14)
-        struct.pack_into("<I", _data, 0, self.ga_handle)
-        struct.pack_into("<I", _data, 4, self.item_amount)
-        struct.pack_into("<I", _data, 8, self.acquisition_id)
-        _data[12] = int(self.is_favorite)
-        _data[13] = int(self.is_new)
-        return _data
+        return bytearray(ITEM_ENTRY.struct.pack(*self.record))
+
+    @property
+    def record(self):
+        return (self.ga_handle, self.item_amount, self.acquisition_id,
+                int(self.is_favorite), int(self.is_new))
 
     @property
     def is_relic(self):
@@ -315,37 +605,63 @@ class ItemEntry:
 
 class UnlockStateManager:
     """
-    Placeholder class for game progress and unlock status.
-        The specific data structure for this section is still under investigation.
-        Established now for preliminary checks and to facilitate rapid implementation once
-        the parsing logic is finalized.
+    Game progress and unlock status, recomputed on every inventory parse (refresh).
+        The event flag region of the save is not mapped yet, so the unlockFlag of AntiqueStandParam
+        is resolved through its observable result: vessels with flag 0 are available from the start,
+        any other vessel is unlocked once its goods item is owned.
+        Lookups are O(1): a set of unlocked vessel IDs and a bitmap of hero types (bit hero_type - 1)
+        that have at least one unlocked vessel.
     """
+    _vessel_rows = None  # (vessel_id, hero_type, goods_id, unlock_flag), read once from the params
+
     def __init__(self):
         self.game_data = SourceDataHandler()
+        self.unlocked_vessels: frozenset[int] = frozenset()
+        self.hero_mask = 0
+
+    def _get_vessel_rows(self):
+        if UnlockStateManager._vessel_rows is None:
+            UnlockStateManager._vessel_rows = tuple(
+                (v.id, int(v.hero_type), int(v.goods_id), int(v.unlock_flag))
+                for v in self.game_data.vessels.values() if not v.is_unknown)
+        return UnlockStateManager._vessel_rows
+
+    def refresh(self, owned_goods_ids):
+        """
+        :param owned_goods_ids: Set of owned vessel goods IDs (InventoryHandler.vessels).
+        """
+        unlocked = set()
+        hero_mask = 0
+        for vessel_id, hero_type, goods_id, unlock_flag in self._get_vessel_rows():
+            if unlock_flag != 0 and goods_id not in owned_goods_ids:
+                continue
+            unlocked.add(vessel_id)
+            if 1 <= hero_type <= 10:
+                hero_mask |= 1 << (hero_type - 1)
+        self.unlocked_vessels = frozenset(unlocked)
+        self.hero_mask = hero_mask
 
     def is_vessel_unlocked(self, vessel_id) -> bool:
         """
-        Placeholder Checks if the vessel is unlocked based on game progress.
-        Currently, all vessels are considered unlocked by default.
+        Checks if the vessel is unlocked based on game progress.
 
         :param vessel_id: The vessel ID to check.
         :type vessel_id: int
         :return: True if the vessel is unlocked, False otherwise.
         :rtype: bool
         """
-        return True
+        return vessel_id in self.unlocked_vessels
 
     def is_character_unlocked(self, hero_type) -> bool:
         """
-        Placeholder Checks if the character is unlocked based on game progress.
-        Currently, all characters are considered unlocked by default.
+        Checks if the character is unlocked based on game progress.
 
         :param hero_type: The hero type ID to check.
         :type hero_type: int
         :return: True if the character is unlocked, False otherwise.
         :rtype: bool
         """
-        return True
+        return 1 <= hero_type <= 10 and bool(self.hero_mask >> (hero_type - 1) & 1)
 
 
 class InventoryHandler:
@@ -358,6 +674,12 @@ class InventoryHandler:
     STATE_SLOT_COUNT = 5120  # MAX slots count of Item States
     ENTRY_SLOT_COUNT = 3065  # MAX slots count of Item Entries
     STATE_SLOT_KEEP_COUNT = 84  # Item State slots are Empty from 0 to 83
+    # Parsed and validated state stored by model_cache. entry_table is re-bound instead.
+    MODEL_FIELDS = ("states", "entries", "relics", "relic_table", "relic_signature_index", "state_scan",
+                    "player_name_offset", "entry_count_offset", "entry_offset", "murks_offset", "sigs_offset",
+                    "entry_count", "vessels", "ga_to_acquisition_id", "_cur_last_instance_id",
+                    "_cur_last_acquisition_id", "_cur_last_state_index", "relic_gas",
+                    "illegal_gas", "curse_illegal_gas", "strict_invalid_gas")
 
     def __new__(cls):
         # Singleton Pattern
@@ -371,9 +693,17 @@ class InventoryHandler:
         if self._initialized:
             return
         with self._lock:
+            self.save_buffer = SaveBuffer()
+            self.journal = EditJournal()
+            self.journal.add_listener(self._on_journal_replay)
             self.illegal_gas = []  # Track relic changes to prevent redundant full-set validity checks.
             self.curse_illegal_gas = []  # Track relics illegal due to missing curses
             self.strict_invalid_gas = []
+            # Model version, bumped on every change visible in a snapshot
+            self._version = 0
+            self._validated_version = -1
+            self._snapshot: InventorySnapshot = None
+            self._changed_gas: set[int] = None  # None means every relic must be copied again
             self.initialize()
 
     def initialize(self):
@@ -386,11 +716,18 @@ class InventoryHandler:
         """
         self._initialized = True
         self.unlock_manager = UnlockStateManager()
-        self.states: list[ItemState] = []
-        self.entries: list[ItemEntry] = []
+        self.states: ItemStateTable = ItemStateTable(self.START_OFFEST, self.STATE_SLOT_COUNT)
+        # Only relic entries are materialized, keyed by entry slot index.
+        # Everything else is read from entry_table.
+        self.entries: dict[int, ItemEntry] = {}
+        self.entry_table: np.ndarray = None  # Zero-copy view over globals.data
         self.relics: dict[int, ItemEntry] = {}
+        self.relic_table: RelicTable = RelicTable()
+        # (real_id, effect_1~3, curse_1~3) -> ga_handles, for exact relic lookups
+        self.relic_signature_index: dict[tuple, list[int]] = {}
         self.relics_df: pd.DataFrame = None  # Load data only if required
 
+        self.state_scan: StateScan = None
         self.player_name_offset = 0
         self.entry_count_offset = 0
         self.entry_offset = 0
@@ -398,7 +735,7 @@ class InventoryHandler:
         self.sigs_offset = 0
 
         self.entry_count = 0
-        self.vessels = [9600, 9603, 9606, 9609, 9612, 9615, 9618, 9621, 9900, 9910]  # Hero Default
+        self.vessels: set[int] = set(DEFAULT_VESSEL_GOODS)  # Owned vessel goods IDs
         self.ga_to_acquisition_id = {}
         self._cur_last_instance_id = 0x800054  # start instance id
         self._cur_last_acquisition_id = 0
@@ -406,14 +743,49 @@ class InventoryHandler:
 
         self.relic_gas = []
 
+    def export_model(self) -> dict:
+        with self._lock:
+            return {name: getattr(self, name) for name in self.MODEL_FIELDS}
+
+    def restore_model(self, model: dict):
+        """
+        Install a model exported from the same userdata bytes, instead of parse() + set_illegal_relics().
+        """
+        with self._lock:
+            self.initialize()
+            for name in self.MODEL_FIELDS:
+                setattr(self, name, model[name])
+            self.bind_entry_table()
+            self.unlock_manager.refresh(self.vessels)
+            self._touch()
+            self._validated_version = self._version
+
     @classmethod
     def get_player_name_from_data(cls, data):
-        cur_offset = cls.START_OFFEST
-        for i in range(cls.STATE_SLOT_COUNT):
-            state = ItemState()
-            state.from_bytes(data, cur_offset)
-            cur_offset += state.size
-        cur_offset += 0x94
+        cur_offset = scan_item_states(data, cls.START_OFFEST, cls.STATE_SLOT_COUNT).end_offset
+        return cls._read_player_name(data, cur_offset + 0x94)
+
+    @classmethod
+    def probe_slot_summary(cls, data) -> SlotSummary:
+        """
+        Read the character overview of a userdata buffer without a full parse.
+            Uses the same offsets as parse(), but decodes no Item State or Item Entry objects.
+
+        :param data: Userdata buffer (bytes or bytearray).
+        :return: Player name (None if empty), murks, sigs and owned relic count.
+        :rtype: SlotSummary
+        """
+        name_offset = scan_item_states(data, cls.START_OFFEST, cls.STATE_SLOT_COUNT).end_offset + 0x94
+        entry_offset = name_offset + 0x5B8 + 0x4
+        murks = _U32.unpack_from(data, name_offset + 52)[0]
+        sigs = _U32.unpack_from(data, name_offset - 64)[0]
+        entry_table = np.frombuffer(data, dtype=ITEM_ENTRY_DTYPE,
+                                    count=cls.ENTRY_SLOT_COUNT, offset=entry_offset)
+        relic_count = int(np.count_nonzero((entry_table["ga_handle"] & 0xF0000000) == ITEM_TYPE_RELIC))
+        return SlotSummary(cls._read_player_name(data, name_offset), murks, sigs, relic_count)
+
+    @staticmethod
+    def _read_player_name(data, cur_offset):
         max_chars = 16
         for cur in range(cur_offset, cur_offset + max_chars * 2, 2):
             if data[cur:cur + 2] == b'\x00\x00':
@@ -423,18 +795,74 @@ class InventoryHandler:
         name = raw_name.decode("utf-16-le", errors="ignore").rstrip("\x00")
         return name if name else None
 
-    def set_illegal_relics(self):
+    # ---------- Snapshots ----------
+    def _touch(self, ga_handle=None):
+        """
+        Bump the model version. Pass the changed relic, or None after a full reparse.
+        """
+        self._version += 1
+        if ga_handle is None:
+            self._changed_gas = None
+            return
+        if ga_handle in self.relics:
+            self.relic_table.update_row(self.relics[ga_handle])
+        if self._changed_gas is not None:
+            self._changed_gas.add(ga_handle)
+
+    def _relic_record(self, ga_handle) -> RelicRecord:
+        entry = self.relics[ga_handle]
+        return RelicRecord(ga_handle, entry.state.real_item_id, tuple(entry.state.effects_and_curses),
+                           entry.acquisition_id, bool(entry.is_favorite), bool(entry.is_new),
+                           tuple(entry.equipped_hero_types))
+
+    def snapshot(self) -> InventorySnapshot:
+        """
+        Get the snapshot of the current model version.
+            Reuses the last one if nothing changed. Otherwise copies only the
+            relics changed since then, unchanged records are shared.
+        """
+        snap = self._snapshot
+        if snap is not None and snap.version == self._version:
+            return snap
+        with self._lock:
+            prev = self._snapshot
+            if prev is None or self._changed_gas is None:
+                table = self.relic_table
+                records = {ga: RelicRecord(ga, relic_id, tuple(effects), acq, fav, new, _HERO_TYPES_BY_MASK[mask])
+                           for ga, relic_id, effects, acq, fav, new, mask in zip(
+                               table.ga_handle.tolist(), table.relic_id.tolist(), table.effects.tolist(),
+                               table.acquisition_id.tolist(), table.is_favorite.tolist(),
+                               table.is_new.tolist(), table.equipped_mask.tolist())}
+            else:
+                records = dict(prev.relics)
+                for ga in self._changed_gas:
+                    if ga in self.relics:
+                        records[ga] = self._relic_record(ga)
+                    else:
+                        records.pop(ga, None)
+            snap = InventorySnapshot(self._version, tuple(self.relic_gas), MappingProxyType(records),
+                                     frozenset(self.illegal_gas), frozenset(self.curse_illegal_gas),
+                                     frozenset(self.strict_invalid_gas), self._validated_version)
+            self._changed_gas = set()
+            self._snapshot = snap
+            return snap
+
+    @staticmethod
+    def validate_snapshot(snapshot: InventorySnapshot) -> ValidationResult:
+        """
+        Compute illegal relics of a snapshot. Touches no handler state, so it can run in a worker thread.
+        """
         checker = RelicChecker()
         illegal_relics = []
         curse_illegal_relics = []
         strict_invalid_relics = []
         relic_group_by_id: dict[int, list] = {}
-        for ga in self.relic_gas:
-            real_id = self.relics[ga].state.real_item_id
+        for ga in snapshot.relic_gas:
+            real_id = snapshot.relics[ga].real_id
             if real_id not in relic_group_by_id.keys():
                 relic_group_by_id[real_id] = []
             relic_group_by_id[real_id].append(ga)
-            effects = self.relics[ga].state.effects_and_curses
+            effects = list(snapshot.relics[ga].effects)
             invalid_reason = checker.check_invalidity(real_id, effects)
             if invalid_reason != InvalidReason.NONE:
                 illegal_relics.append(ga)
@@ -456,21 +884,57 @@ class InventoryHandler:
                             legal_found = True
                             continue
                         illegal_relics.append(ga)
-        self.illegal_gas = illegal_relics
-        self.curse_illegal_gas = curse_illegal_relics
-        self.strict_invalid_gas = strict_invalid_relics
+        return ValidationResult(snapshot, illegal_relics, curse_illegal_relics, strict_invalid_relics)
+
+    def publish_validation(self, result: ValidationResult):
+        """
+        Install validation results.
+            If the model moved on since the snapshot was taken, the relics changed
+            in between are re-checked one by one.
+        """
+        with self._lock:
+            self.illegal_gas = list(result.illegal_gas)
+            self.curse_illegal_gas = list(result.curse_illegal_gas)
+            self.strict_invalid_gas = list(result.strict_invalid_gas)
+            if result.snapshot.version != self._version:
+                old_relics = result.snapshot.relics
+                for ga in old_relics.keys() - self.relics.keys():
+                    self.remove_illegal(ga)
+                for ga, entry in self.relics.items():
+                    old = old_relics.get(ga)
+                    effects = entry.state.effects_and_curses
+                    if old is None or old.real_id != entry.state.real_item_id or list(old.effects) != effects:
+                        self.update_illegal(ga, entry.state.real_item_id, effects)
+            # Only the illegal sets changed, relic records stay shared
+            self._version += 1
+            self._validated_version = self._version
+
+    def set_illegal_relics(self):
+        self.publish_validation(self.validate_snapshot(self.snapshot()))
 
     @property
     def illegal_count(self):
         return len(self.illegal_gas)
 
     def append_illegal(self, ga, is_curse_illegal=False):
+        self._touch(ga)
         if ga not in self.illegal_gas:
             self.illegal_gas.append(ga)
         if is_curse_illegal and ga not in self.curse_illegal_gas:
             self.curse_illegal_gas.append(ga)
 
+    def _on_journal_replay(self, entry, is_undo):
+        # Offsets may have shifted, rebuild the tables, then re-check only the touched relics
+        self.parse()
+        for ga in entry.relics:
+            if ga in self.relics:
+                state = self.relics[ga].state
+                self.update_illegal(ga, state.real_item_id, state.effects_and_curses)
+            else:
+                self.remove_illegal(ga)
+
     def remove_illegal(self, ga):
+        self._touch(ga)
         if ga in self.illegal_gas:
             self.illegal_gas.remove(ga)
         if ga in self.curse_illegal_gas:
@@ -480,6 +944,7 @@ class InventoryHandler:
 
     def update_illegal(self, ga_handle, item_id, source_effects):
         logger.info(f"Update Illegal gas: 0x{ga_handle:08X}, {item_id}")
+        self._touch(ga_handle)
         checker = RelicChecker()
         invalid_reason = checker.check_invalidity(item_id, source_effects)
         if invalid_reason and ga_handle not in self.illegal_gas:
@@ -503,24 +968,58 @@ class InventoryHandler:
             self._cur_last_acquisition_id += 1
             return self._cur_last_acquisition_id
 
+    def bind_entry_table(self):
+        """
+        Map the entry table of globals.data as a structured array.
+            The array is a view, writes to it go straight into the buffer.
+            It must be re-bound whenever globals.data is replaced.
+        """
+        self.entry_table = np.frombuffer(globals.data, dtype=ITEM_ENTRY_DTYPE,
+                                         count=self.ENTRY_SLOT_COUNT,
+                                         offset=self.entry_offset)
+        return self.entry_table
+
+    def count_entries(self) -> int:
+        return int(np.count_nonzero(self.entry_table["ga_handle"]))
+
+    def max_acquisition_id(self) -> int:
+        return int(self.entry_table["acquisition_id"].max())
+
+    def relic_entry_mask(self) -> np.ndarray:
+        return (self.entry_table["ga_handle"] & 0xF0000000) == ITEM_TYPE_RELIC
+
+    def favorite_entry_mask(self) -> np.ndarray:
+        return (self.entry_table["ga_handle"] != 0) & (self.entry_table["is_favorite"] != 0)
+
+    def vessel_goods_ids(self) -> list[int]:
+        instance_ids = self.entry_table["ga_handle"] & 0x00FFFFFF
+        mask = (instance_ids >= VESSEL_GOODS_RANGE[0]) & (instance_ids <= VESSEL_GOODS_RANGE[1])
+        return instance_ids[mask].tolist()
+
+    def find_empty_entry_index(self) -> int:
+        empty_indices = np.flatnonzero(self.entry_table["ga_handle"] == 0)
+        if empty_indices.size == 0:
+            return -1
+        return int(empty_indices[0])
+
+    def write_entry(self, entry_index, entry: ItemEntry):
+        # Same-size write into globals.data, the entry table view sees it directly
+        self.save_buffer.write(self.entry_offset + entry_index * ITEM_ENTRY_DTYPE.itemsize, entry.data_bytes)
+
     def parse(self):
         with self._lock:
             logger.info("Parsing inventory data")
             self.initialize()
-            cur_offset = self.START_OFFEST
-            state_ga_to_index = {}
-            logger.info("Parsing inventory states. Starting at offset: 0x%X", cur_offset)
-            for i in range(self.STATE_SLOT_COUNT):
-                state = ItemState()
-                state.from_bytes(globals.data, cur_offset)
-                state.index = i
-                self.states.append(state)
-                if state.ga_handle != 0:
-                    state_ga_to_index[state.ga_handle] = i
+            logger.info("Parsing inventory states. Starting at offset: 0x%X", self.START_OFFEST)
+            self.state_scan = scan_item_states(globals.data, self.START_OFFEST, self.STATE_SLOT_COUNT)
+            # Only non-empty records are decoded and stored
+            self.states = ItemStateTable.from_scan(globals.data, self.state_scan,
+                                                   self.START_OFFEST, self.STATE_SLOT_COUNT)
+            for i, state in self.states.items():
                 self._cur_last_instance_id = max(self._cur_last_instance_id, state.instance_id)
-                self._cur_last_state_index = i if state.ga_handle != 0 else self._cur_last_state_index
-                cur_offset += state.size
+                self._cur_last_state_index = i
 
+            cur_offset = self.state_scan.end_offset
             cur_offset += 0x94
             self.player_name_offset = cur_offset
             self.murks_offset = cur_offset + 52
@@ -534,124 +1033,210 @@ class InventoryHandler:
             logger.info("Assuming entry offset at: 0x%X", cur_offset)
 
             logger.info("Parsing inventory entries. Starting at offset: 0x%X", cur_offset)
-            for i in range(self.ENTRY_SLOT_COUNT):
-                entry = ItemEntry(globals.data[cur_offset:cur_offset+14])
-                self.entries.append(entry)
-                if entry.instance_id in range(9600, 9957):
-                    self.vessels.append(entry.instance_id)
-                cur_offset += 14
-                if entry.ga_handle != 0:
-                    self.entry_count += 1
-                self._cur_last_acquisition_id = max(self._cur_last_acquisition_id, entry.acquisition_id)
-                if entry.is_relic:
-                    entry.link_state(self.states[state_ga_to_index[entry.ga_handle]])
-                    self.ga_to_acquisition_id[entry.ga_handle] = entry.acquisition_id
-                    self.relics[entry.ga_handle] = entry
-                    self.relic_gas.append(entry.ga_handle)
+            self.bind_entry_table()
+            self.vessels.update(self.vessel_goods_ids())
+            self.unlock_manager.refresh(self.vessels)
+            self.entry_count = self.count_entries()
+            self._cur_last_acquisition_id = max(self._cur_last_acquisition_id, self.max_acquisition_id())
+            relic_entry_indices = np.flatnonzero(self.relic_entry_mask())
+            self.relic_table = RelicTable.from_buffer(globals.data, self.state_scan,
+                                                      self.entry_table[relic_entry_indices])
+            for i in relic_entry_indices.tolist():
+                entry_start = self.entry_offset + i * 14
+                entry = ItemEntry(globals.data[entry_start:entry_start+14])
+                entry.index = i
+                state_index = self.states.index_of(entry.ga_handle)
+                if state_index < 0:
+                    raise ValueError(f"Relic 0x{entry.ga_handle:08X} has no Item State. Save File may be corrupted.")
+                entry.link_state(self.states[state_index])
+                self.entries[i] = entry
+                self.ga_to_acquisition_id[entry.ga_handle] = entry.acquisition_id
+                self.relics[entry.ga_handle] = entry
+                self.relic_gas.append(entry.ga_handle)
+                self._index_relic_signature(entry.ga_handle)
 
             count_in_data = struct.unpack_from("<I", globals.data, self.entry_count_offset)[0]
             if self.entry_count != count_in_data:
                 logger.warning("Entry count mismatch: counted %d, data has %d", self.entry_count, count_in_data)
                 logger.warning("Trying to fix it...")
                 logger.info("Updating entry count in")
-                struct.pack_into("<I", globals.data, self.entry_count_offset, self.entry_count)
+                self.save_buffer.pack_into("<I", self.entry_count_offset, self.entry_count)
+            self._touch()
+
+    @staticmethod
+    def relic_signature(relic_id, effects) -> tuple:
+        """
+        Hash key of a relic: (real_id, effect_1, effect_2, effect_3, curse_1, curse_2, curse_3)
+        """
+        return (int(relic_id), *(int(e) for e in effects))
+
+    def _index_relic_signature(self, ga_handle):
+        state = self.relics[ga_handle].state
+        key = self.relic_signature(state.real_item_id, state.effects_and_curses)
+        self.relic_signature_index.setdefault(key, []).append(ga_handle)
+
+    def _unindex_relic_signature(self, ga_handle):
+        state = self.relics[ga_handle].state
+        key = self.relic_signature(state.real_item_id, state.effects_and_curses)
+        gas = self.relic_signature_index.get(key)
+        if gas and ga_handle in gas:
+            gas.remove(ga_handle)
+            if not gas:
+                del self.relic_signature_index[key]
+
+    def find_relics_by_signature(self, relic_id, effects) -> list[int]:
+        """
+        Get ga_handles of owned relics matching relic ID and all 6 effects exactly.
+
+        :param relic_id: Real relic ID.
+        :param effects: [effect_1, effect_2, effect_3, curse_1, curse_2, curse_3]
+        :return: Matching ga_handles in inventory order, empty if not owned.
+        :rtype: list[int]
+        """
+        return list(self.relic_signature_index.get(self.relic_signature(relic_id, effects), ()))
+
+    def is_relic_owned(self, relic_id, effects) -> bool:
+        return self.relic_signature(relic_id, effects) in self.relic_signature_index
 
     def update_entry_data(self, entry_index):
-        target_offset = self.entry_offset + entry_index * 14
-        globals.data = globals.data[:target_offset] + self.entries[entry_index].data_bytes + globals.data[target_offset + 14:]
-        self.parse()  # Just make sure everything is fine
+        # Fixed-size record, written in place through the entry table view
+        self.write_entry(entry_index, self.entries[entry_index])
 
     def add_relic_to_inventory(self, relic_type: str = "normal"):
-        with self._lock:
+        with self._lock, self.journal.transaction("Add relic") as change:
             logger.info("Adding relic to inventory")
             # Create dummy relic state first
             dummy_relic = ItemState.create_dummy_relic(self.request_new_instance_id(),
                                                        relic_type=relic_type)
             # Replace Item Entry at empty slot
-            empty_entry_index = -1
-            for i in range(self.ENTRY_SLOT_COUNT):
-                entry = self.entries[i]
-                if entry.ga_handle == 0:
-                    # Found an empty slot
-                    empty_entry_index = i
-                    break
-            else:
+            empty_entry_index = self.find_empty_entry_index()
+            if empty_entry_index < 0:
                 raise RuntimeError("No empty slot found in inventory entries to add relic.")
 
             # Replace Item State after current last item state
-            empty_state_index = -1
-            for i in range(self._cur_last_state_index, self.STATE_SLOT_COUNT):
-                if self.states[i].ga_handle == 0:
-                    empty_state_index = i
-                    break
-            else:
+            empty_state_index = self.states.find_empty_index(self._cur_last_state_index)
+            if empty_state_index < 0:
                 raise RuntimeError("No empty slot found in inventory states to add relic.")
 
             # Replace Item Entry
-            self.entries[empty_entry_index] = ItemEntry.create_from_state(dummy_relic, self.request_new_acquisition_id())
-            _new_enty_data = self.entries[empty_entry_index].data_bytes
-            # Replace entry data
+            new_entry = ItemEntry.create_from_state(dummy_relic, self.request_new_acquisition_id())
+            new_entry.index = empty_entry_index
             target_offset = self.entry_offset + empty_entry_index * 14
             logger.info("Adding relic at offset: 0x%X", target_offset)
-            globals.data = globals.data[:self.entry_offset+empty_entry_index*14] + _new_enty_data + globals.data[self.entry_offset+(empty_entry_index+1)*14:]
+            self.write_entry(empty_entry_index, new_entry)
             # Update entry count
             self.entry_count += 1
-            struct.pack_into("<I", globals.data, self.entry_count_offset, self.entry_count)
+            self.save_buffer.pack_into("<I", self.entry_count_offset, self.entry_count)
             logger.info("Added relic at entry index %d", empty_entry_index)
 
             # Replace Item State data
             old_size = self.states[empty_state_index].size
-            dummy_relic.index = empty_state_index
+            _cur_offset = self.states.offset_of(empty_state_index)
             self.states[empty_state_index] = dummy_relic
-            _new_state_data = self.states[empty_state_index].data
-            _cur_offset = self.START_OFFEST + sum(state.size for state in self.states[:empty_state_index])
-            globals.data = globals.data[:_cur_offset] + _new_state_data + globals.data[_cur_offset + old_size:]
+            _new_state_data = dummy_relic.data
+            self.save_buffer.splice(_cur_offset, _cur_offset + old_size, _new_state_data)
             remove_padding_area()
             logger.info("Added relic at state index %d", empty_state_index)
             logger.info(f"New Relic State Info:{repr(dummy_relic)}")
-            logger.info(f"New Relic Entry Info:{repr(self.entries[empty_entry_index])}")
+            logger.info(f"New Relic Entry Info:{repr(new_entry)}")
             self._cur_last_state_index = empty_state_index
             self.parse()  # Just make sure everything is fine
-            return True, self.entries[empty_entry_index].ga_handle
+            change.relics.add(new_entry.ga_handle)
+            return True, new_entry.ga_handle
+
+    def add_relics(self, relics: list[tuple]) -> list[int]:
+        """
+        Add several fully described relics with one reshaping of the Item State region and one reparse.
+
+        :param relics: (relic_type, relic_id, effects, curses) per relic.
+            relic_type is "normal" or "deep", effects and curses are 3 ids each.
+            None for relic_id or an effect keeps the dummy relic value.
+        :return: ga_handles of the new relics, in the given order.
+        :rtype: list[int]
+        """
+        if not relics:
+            return []
+        with self._lock, self.journal.transaction("Add relics") as change:
+            entry_indices = np.flatnonzero(self.entry_table["ga_handle"] == 0)[:len(relics)]
+            if len(entry_indices) < len(relics):
+                raise RuntimeError("Not enough empty slots in inventory entries to add relics.")
+            state_indices = []
+            start = self._cur_last_state_index
+            for _ in relics:
+                state_index = self.states.find_empty_index(start)
+                if state_index < 0:
+                    raise RuntimeError("Not enough empty slots in inventory states to add relics.")
+                state_indices.append(state_index)
+                start = state_index + 1
+
+            # Build complete states and write their entries, entries move along with the splice below
+            new_states = []
+            for (relic_type, relic_id, effects, curses), entry_index in zip(relics, entry_indices):
+                state = ItemState.create_dummy_relic(self.request_new_instance_id(), relic_type=relic_type)
+                if relic_id is not None:
+                    state.set_real_id(relic_id)
+                for name, value in zip(("effect_1", "effect_2", "effect_3", "curse_1", "curse_2", "curse_3"),
+                                       (*effects, *curses)):
+                    if value is not None:
+                        setattr(state, name, value)
+                new_entry = ItemEntry.create_from_state(state, self.request_new_acquisition_id())
+                self.write_entry(int(entry_index), new_entry)
+                new_states.append(state)
+            self.entry_count += len(relics)
+            self.save_buffer.pack_into("<I", self.entry_count_offset, self.entry_count)
+
+            # One splice from the first to the last replaced empty state
+            state_offsets = [self.states.offset_of(i) for i in state_indices]
+            first = state_offsets[0]
+            cursor = first
+            pieces = []
+            for offset, state in zip(state_offsets, new_states):
+                pieces.append(globals.data[cursor:offset])
+                pieces.append(state.data)
+                cursor = offset + ItemState.BASE_SIZE
+            self.save_buffer.splice(first, cursor, b"".join(pieces))
+            remove_padding_area(len(relics))
+            for state_index, state in zip(state_indices, new_states):
+                self.states[state_index] = state
+            self._cur_last_state_index = state_indices[-1]
+            logger.info(f"Added {len(relics)} relics at state indices {state_indices}")
+
+            self.parse()
+            ga_handles = [state.ga_handle for state in new_states]
+            for ga_handle in ga_handles:
+                state = self.relics[ga_handle].state
+                self.update_illegal(ga_handle, state.real_item_id, state.effects_and_curses)
+            change.relics.update(ga_handles)
+            return ga_handles
 
     def remove_relic_from_inventory(self, ga_handel):
-        with self._lock:
+        with self._lock, self.journal.transaction("Remove relic", relics=[ga_handel]):
             logger.info("Removing relic from inventory")
-            target_state_index = -1
-            for i in range(self.STATE_SLOT_COUNT):
-                if self.states[i].ga_handle == ga_handel:
-                    target_state_index = i
-                    logger.info("Found relic at state index %d", target_state_index)
-                    break
-            else:
+            target_state_index = self.states.index_of(ga_handel)
+            if target_state_index < 0:
                 raise ValueError("Relic not found in inventory")
-            target_entry_index = -1
-            for i in range(self.ENTRY_SLOT_COUNT):
-                if self.entries[i].ga_handle == ga_handel:
-                    target_entry_index = i
-                    logger.info("Found relic at entry index %d", target_entry_index)
-                    break
-            else:
+            logger.info("Found relic at state index %d", target_state_index)
+            if ga_handel not in self.relics:
                 raise ValueError("Relic not found in inventory")
+            target_entry_index = self.relics[ga_handel].index
+            logger.info("Found relic at entry index %d", target_entry_index)
 
             # Replace target entry by 0
             logger.info("Removing relic at entry index %d", target_entry_index)
-            self.entries[target_entry_index] = ItemEntry(bytearray(14))
-            _new_enty_data = self.entries[target_entry_index].data_bytes
-            globals.data = globals.data[:self.entry_offset+target_entry_index*14] + _new_enty_data + globals.data[self.entry_offset+(target_entry_index+1)*14:]
+            self.write_entry(target_entry_index, ItemEntry(bytearray(14)))
             # Update entry count
             logger.info(f"Updating entry count in inventory from {self.entry_count} to {self.entry_count - 1}")
             self.entry_count -= 1
-            struct.pack_into("<I", globals.data, self.entry_count_offset, self.entry_count)
+            self.save_buffer.pack_into("<I", self.entry_count_offset, self.entry_count)
             logger.info("Removed relic at entry index %d", target_entry_index)
 
             # Replace target state by 0
             logger.info("Removing relic at state index %d", target_state_index)
             old_size = self.states[target_state_index].size
+            _cur_offset = self.states.offset_of(target_state_index)
             self.states[target_state_index] = ItemState()
-            _new_state_data = self.states[target_state_index].data
-            _cur_offset = self.START_OFFEST + sum(state.size for state in self.states[:target_state_index])
-            globals.data = globals.data[:_cur_offset] + _new_state_data + globals.data[_cur_offset + old_size:]
+            _new_state_data = ItemState.EMPTY_DATA
+            self.save_buffer.splice(_cur_offset, _cur_offset + old_size, _new_state_data)
             logger.info("Fill padding area with 0x00")
             insert_padding_area()
             logger.info("Removed relic at state index %d", target_state_index)
@@ -667,21 +1252,22 @@ class InventoryHandler:
             if self.states[state_index].type_bits != globals.ITEM_TYPE_RELIC:
                 raise TypeError("Only relics can have their state updated")
 
-            # Assume item type wasn't change
-            target_offset = self.START_OFFEST + sum(state.size for state in self.states[:state_index])
-            globals.data = globals.data[:target_offset] + self.states[state_index].data + globals.data[target_offset + self.states[state_index].size:]
-            self.parse()  # Just make sure everything is fine
+            # Assume item type wasn't change, so the record keeps its size and is written in place.
+            # The state object is already up to date, no reparse needed.
+            target_offset = self.states.offset_of(state_index)
+            self.save_buffer.write(target_offset, self.states[state_index].data)
 
     def modify_relic(self, ga_handle, relic_id=None,
                      effect_1=None, effect_2=None, effect_3=None,
                      curse_1=None, curse_2=None, curse_3=None):
-        with self._lock:
+        with self._lock, self.journal.transaction("Modify relic", relics=[ga_handle]):
             type_bits = ga_handle & 0xF0000000
             if type_bits != globals.ITEM_TYPE_RELIC:
                 raise TypeError("Only relics can be modified")
 
             logger.info("Modifying relic in inventory")
             target_state_index = self.relics[ga_handle].state.index
+            self._unindex_relic_signature(ga_handle)
 
             if relic_id is not None:
                 self.states[target_state_index].set_real_id(relic_id)
@@ -719,6 +1305,8 @@ class InventoryHandler:
             # else:
             #     raise ValueError("Relic not found in inventory")
             self.update_relic_state(target_state_index)
+            self._index_relic_signature(ga_handle)
+            self._touch(ga_handle)
             self.update_illegal(ga_handle,
                                 self.states[target_state_index].real_item_id,
                                 self.states[target_state_index].effects_and_curses)
@@ -730,7 +1318,8 @@ class InventoryHandler:
 
     @murks.setter
     def murks(self, value):
-        struct.pack_into("<I", globals.data, self.murks_offset, value)
+        with self.journal.transaction("Modify murks"):
+            self.save_buffer.pack_into("<I", self.murks_offset, value)
 
     @property
     def sigs(self):
@@ -738,11 +1327,18 @@ class InventoryHandler:
 
     @sigs.setter
     def sigs(self, value):
-        struct.pack_into("<I", globals.data, self.sigs_offset, value)
+        with self.journal.transaction("Modify sigs"):
+            self.save_buffer.pack_into("<I", self.sigs_offset, value)
 
     def reset_equipped_records(self):
-        for entry in self.entries:
+        table = self.relic_table
+        # Only the relics equipped so far change, equip_relic touches the ones equipped again
+        equipped_gas = table.ga_handle[np.flatnonzero(table.equipped_mask)].tolist()
+        for entry in self.entries.values():
             entry.equipped_by = [0] * 10
+        table.equipped_mask[:] = 0
+        for ga in equipped_gas:
+            self._touch(ga)
 
     def get_relic_equipped_by(self, ga_handle):
         try:
@@ -755,59 +1351,47 @@ class InventoryHandler:
             # Record flag changes to determine whether to update entry data.
             old_new_flag = self.relics[ga_handle].is_new
             self.relics[ga_handle].equip(hero_type)
+            self._touch(ga_handle)
             new_new_flag = self.relics[ga_handle].is_new
             if old_new_flag == new_new_flag:
                 # If is_new flag didn't change, no need to update
                 return
-            for idx, entry in enumerate(self.entries):
-                if entry.ga_handle == ga_handle:
-                    self.update_entry_data(idx)
+            self.update_entry_data(self.relics[ga_handle].index)
         except KeyError:
             raise ValueError("Relic not found in inventory")
 
     def unequip_relic(self, ga_handle, hero_type):
         try:
             self.relics[ga_handle].unequip(hero_type)
+            self._touch(ga_handle)
         except KeyError:
             raise ValueError("Relic not found in inventory")
 
     def toggle_favorite_mark(self, ga_handle):
         try:
-            cur_favorite = self.relics[ga_handle].is_favorite
-            if cur_favorite:
-                self.relics[ga_handle].mark_unfavorite()
-            else:
-                self.relics[ga_handle].mark_favorite()
-            for idx, entry in enumerate(self.entries):
-                if entry.ga_handle == ga_handle:
-                    self.update_entry_data(idx)
-            return self.relics[ga_handle].is_favorite
+            with self.journal.transaction("Toggle favorite", relics=[ga_handle]):
+                cur_favorite = self.relics[ga_handle].is_favorite
+                if cur_favorite:
+                    self.relics[ga_handle].mark_unfavorite()
+                else:
+                    self.relics[ga_handle].mark_favorite()
+                self.update_entry_data(self.relics[ga_handle].index)
+                self._touch(ga_handle)
+                return self.relics[ga_handle].is_favorite
         except KeyError:
             raise ValueError("Relic not found in inventory")
 
     def refresh_relics_dataframe(self):
-        cols = ['ga_handle', 'relic_id', 'effect_1', 'effect_2', 'effect_3',
-                'curse_1', 'curse_2', 'curse_3']
-
-        rows = []
-        for ga_handle, entry in self.relics.items():
-            relic_id = entry.state.real_item_id
-            effects = entry.state.effects_and_curses
-
-            row = [ga_handle, relic_id] + effects
-            rows.append(row)
-
-        self.relics_df = pd.DataFrame(rows, columns=cols)
+        self.relics_df = self.relic_table.to_dataframe()
 
     def debug_print(self, non_zero_only=False):
-        for i, state in enumerate(self.states):
-            if state.ga_handle == 0 and non_zero_only:
-                continue
+        states = self.states.items() if non_zero_only else enumerate(self.states)
+        for i, state in states:
             logger.debug(f"State {i}: {state}")
-        for i, entry in enumerate(self.entries):
-            if entry.ga_handle == 0 and non_zero_only:
+        for i, record in enumerate(self.entry_table):
+            if record["ga_handle"] == 0 and non_zero_only:
                 continue
-            logger.debug(f"Entry {i}: {entry}")
+            logger.debug(f"Entry {i}: {record}")
         logger.debug(f"Player Name Offset: {self.player_name_offset}")
         logger.debug(f"Entry Offset: {self.entry_count_offset}")
         logger.debug(f"Entry Count: {self.entry_count}")
@@ -0,0 +1,268 @@
+import heapq
+import logging
+import time
+from typing import Mapping, NamedTuple
+
+import numpy as np
+
+from inventory_handler import InventorySnapshot
+from relic_checker import RelicChecker
+from source_data_handler import SourceDataHandler
+
+
+logger = logging.getLogger(__name__)
+
+WHITE_SLOT = 4  # Universal slot color, accepts every relic color
+NO_SLOT = -1  # Vessel has no relic slot here
+SLOT_COUNT = 6  # 3 normal + 3 deep
+
+
+class Candidate(NamedTuple):
+    """
+    One relic that can score in a slot.
+        bound: Best possible gain of the relic, used for ordering and pruning.
+        wished: (effect_id, weight) for every wished effect on the relic, duplicates kept.
+    """
+    bound: float
+    ga_handle: int
+    wished: tuple
+
+
+class LoadoutSuggestion(NamedTuple):
+    score: float
+    relics: tuple  # 6 ga_handles in slot order, 0 for empty
+    matched: tuple  # Wished effect IDs provided by the relics
+
+
+class OptimizeResult(NamedTuple):
+    """
+    Output of LoadoutOptimizer.optimize.
+        complete is False if the time budget ran out, the suggestions are then
+        the best ones found so far.
+    """
+    suggestions: list
+    complete: bool
+    nodes: int
+    elapsed: float
+
+
+class CandidateIndex:
+    """
+    Owned relics grouped by (is_deep, color_id), built once per inventory snapshot.
+        Each group keeps its ga_handles and an (n, 6) effects array, so scoring a
+        wish-list is a vectorized lookup over the groups a slot accepts.
+    """
+    def __init__(self, version: int):
+        self.version = version
+        self.groups: dict[tuple[bool, int], tuple[np.ndarray, np.ndarray]] = {}
+        self.illegal = frozenset()
+
+    @classmethod
+    def build(cls, snapshot: InventorySnapshot, relic_meta: Mapping[int, tuple[bool, int]]):
+        index = cls(snapshot.version)
+        index.illegal = snapshot.illegal_gas | snapshot.strict_invalid_gas
+        grouped: dict[tuple[bool, int], tuple[list, list]] = {}
+        for ga in snapshot.relic_gas:
+            record = snapshot.relics[ga]
+            meta = relic_meta.get(record.real_id)
+            if meta is None:
+                continue
+            gas, effects = grouped.setdefault(meta, ([], []))
+            gas.append(ga)
+            effects.append(record.effects)
+        for key, (gas, effects) in grouped.items():
+            index.groups[key] = (np.array(gas, dtype=np.uint32),
+                                 np.array(effects, dtype=np.uint32).reshape(-1, SLOT_COUNT))
+        return index
+
+    def groups_for_slot(self, is_deep: bool, color_id: int):
+        if color_id == NO_SLOT:
+            return []
+        return [group for (deep, color), group in self.groups.items()
+                if deep == is_deep and (color_id == WHITE_SLOT or color == color_id)]
+
+
+class LoadoutOptimizer:
+    """
+    Best relic assignment for one vessel from the current inventory.
+        The score of an assignment is the sum of the wish-list weights of the effects
+        (and curses) on its relics. Without stacking, each wished effect counts once.
+        Branch-and-bound over the slots: candidates are tried best first and a branch
+        is cut as soon as its optimistic bound can't beat the current k-th best.
+    """
+    TIME_CHECK_INTERVAL = 1024  # Nodes between time budget checks
+
+    def __init__(self):
+        self.game_data = SourceDataHandler()  # Singleton
+        self._relic_meta: dict[int, tuple[bool, int]] = {}  # real_id -> (is_deep, color_id)
+        self._index: CandidateIndex = None
+
+    def _meta_for(self, snapshot: InventorySnapshot) -> dict[int, tuple[bool, int]]:
+        for record in snapshot.relics.values():
+            real_id = record.real_id
+            if real_id in self._relic_meta:
+                continue
+            relic = self.game_data.relics.get(real_id)
+            if relic is None:
+                continue
+            self._relic_meta[real_id] = (bool(RelicChecker.is_deep_relic(real_id)), int(relic.color_id))
+        return self._relic_meta
+
+    def get_index(self, snapshot: InventorySnapshot) -> CandidateIndex:
+        index = self._index
+        if index is None or index.version != snapshot.version:
+            index = CandidateIndex.build(snapshot, self._meta_for(snapshot))
+            self._index = index
+        return index
+
+    @staticmethod
+    def _slot_candidates(groups, wish_ids: np.ndarray, weights: dict[int, float],
+                         excluded, stacking: bool) -> list[Candidate]:
+        candidates = []
+        for gas, effects in groups:
+            if not len(gas):
+                continue
+            pos = np.searchsorted(wish_ids, effects).clip(max=len(wish_ids) - 1)
+            hit = wish_ids[pos] == effects
+            rows = np.flatnonzero(hit.any(axis=1))
+            if not len(rows):
+                continue
+            for row, ga in zip(rows.tolist(), gas[rows].tolist()):
+                if ga in excluded:
+                    continue
+                wished = tuple((eff, weights[eff]) for eff in effects[row][hit[row]].tolist())
+                if stacking:
+                    bound = sum(w for _, w in wished)
+                else:
+                    # Repeated or negative effects may already be counted elsewhere, only positives are certain
+                    bound = sum(w for _, w in dict(wished).items() if w > 0)
+                if bound > 0:
+                    candidates.append(Candidate(bound, ga, wished))
+        candidates.sort(key=lambda c: (-c.bound, c.ga_handle))
+        return candidates
+
+    def optimize(self, snapshot: InventorySnapshot, relic_slots, wishes: Mapping[int, float],
+                 top_k: int = 5, stacking: bool = True, include_illegal: bool = False,
+                 exclude=(), time_budget: float = 0.25) -> OptimizeResult:
+        """
+        Search the top_k relic assignments for a vessel.
+
+        :param snapshot: Inventory snapshot to pick relics from.
+        :param relic_slots: Slot color ids of the vessel, see Vessel.relic_slots.
+        :param wishes: effect_id -> weight. Negative weights penalize effects or curses.
+        :param top_k: Number of distinct assignments to return.
+        :param stacking: If False, every wished effect scores once per assignment.
+        :param include_illegal: Also use illegal and strictly invalid relics.
+        :param exclude: ga_handles that must not be used.
+        :param time_budget: Seconds before the search stops with the best found so far.
+        :rtype: OptimizeResult
+        """
+        start = time.perf_counter()
+        weights = {int(eff): float(w) for eff, w in wishes.items() if w}
+        if not weights or top_k <= 0:
+            return OptimizeResult([], True, 0, 0.0)
+        index = self.get_index(snapshot)
+        excluded = set(exclude)
+        if not include_illegal:
+            excluded |= index.illegal
+        wish_ids = np.array(sorted(weights), dtype=np.uint32)
+
+        slot_candidates = []
+        for slot, color_id in enumerate(relic_slots):
+            groups = index.groups_for_slot(slot >= 3, int(color_id))
+            slot_candidates.append(self._slot_candidates(groups, wish_ids, weights, excluded, stacking))
+        # Most valuable slots first, so good solutions come early and the bound tightens fast
+        order = sorted((s for s in range(SLOT_COUNT) if slot_candidates[s]),
+                       key=lambda s: -slot_candidates[s][0].bound)
+        suffix_bound = [0.0] * (len(order) + 1)
+        for depth in range(len(order) - 1, -1, -1):
+            suffix_bound[depth] = suffix_bound[depth + 1] + slot_candidates[order[depth]][0].bound
+
+        best: list[tuple[float, int, tuple]] = []  # Min-heap of (score, tiebreak, relics)
+        best_keys: set[frozenset] = set()
+        assignment = [0] * SLOT_COUNT
+        used: set[int] = set()
+        effect_counts: dict[int, int] = {}
+        nodes = 0
+        tiebreak = 0
+        deadline = start + time_budget
+        timed_out = False
+
+        def threshold():
+            return best[0][0] if len(best) >= top_k else 0.0
+
+        def record(score):
+            nonlocal tiebreak
+            key = frozenset(ga for ga in assignment if ga)
+            if key in best_keys:
+                return
+            tiebreak += 1
+            entry = (score, -tiebreak, tuple(assignment))
+            best_keys.add(key)
+            if len(best) < top_k:
+                heapq.heappush(best, entry)
+            else:
+                _, _, dropped = heapq.heappushpop(best, entry)
+                best_keys.discard(frozenset(ga for ga in dropped if ga))
+
+        def gain_of(candidate: Candidate):
+            if stacking:
+                return candidate.bound
+            gain = 0.0
+            for eff, w in candidate.wished:
+                if effect_counts.get(eff, 0) == 0:
+                    gain += w
+                effect_counts[eff] = effect_counts.get(eff, 0) + 1
+            return gain
+
+        def release(candidate: Candidate):
+            if stacking:
+                return
+            for eff, _ in candidate.wished:
+                effect_counts[eff] -= 1
+
+        def search(depth, score):
+            nonlocal nodes, timed_out
+            nodes += 1
+            if nodes % self.TIME_CHECK_INTERVAL == 0 and time.perf_counter() > deadline:
+                timed_out = True
+            if timed_out:
+                return
+            if depth == len(order):
+                if score > threshold():
+                    record(score)
+                return
+            slot = order[depth]
+            rest = suffix_bound[depth + 1]
+            for candidate in slot_candidates[slot]:
+                if score + candidate.bound + rest <= threshold():
+                    break  # Sorted by bound, no later candidate can do better
+                if candidate.ga_handle in used:
+                    continue
+                gain = gain_of(candidate)
+                used.add(candidate.ga_handle)
+                assignment[slot] = candidate.ga_handle
+                search(depth + 1, score + gain)
+                assignment[slot] = 0
+                used.discard(candidate.ga_handle)
+                release(candidate)
+                if timed_out:
+                    return
+            # Leave the slot empty
+            if score + rest > threshold():
+                search(depth + 1, score)
+
+        search(0, 0.0)
+
+        by_ga = {c.ga_handle: c for candidates in slot_candidates for c in candidates}
+        suggestions = []
+        for score, _, relics in sorted(best, reverse=True):
+            matched = []
+            for ga in relics:
+                if ga:
+                    matched.extend(eff for eff, _ in by_ga[ga].wished if eff not in matched)
+            suggestions.append(LoadoutSuggestion(score, relics, tuple(matched)))
+        elapsed = time.perf_counter() - start
+        if timed_out:
+            logger.info(f"Loadout search hit the time budget after {nodes} nodes")
+        return OptimizeResult(suggestions, not timed_out, nodes, elapsed)
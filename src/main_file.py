@@ -4,12 +4,17 @@
 
 import os
 import sys
+import mmap
+import shutil
 import struct
 import hashlib
+import tempfile
 from tkinter import ttk, filedialog, messagebox, simpledialog, Scrollbar
 import tkinter as tk
 from typing import Optional, Dict
+from concurrent.futures import ThreadPoolExecutor
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from save_buffer import SaveBuffer
 from typing import Optional
 
 
@@ -35,6 +40,27 @@ def calculate_md5(data: bytes) -> bytes:
 
     return hashlib.md5(data).digest()
 
+# Threads for the per-entry AES / MD5 stages, 0 for one per core.
+# Both release the GIL on large buffers, so entries really run in parallel.
+crypto_workers = 0
+
+
+def set_crypto_workers(count) -> None:
+    global crypto_workers
+    crypto_workers = max(0, int(count))
+
+
+def crypto_map(func, items) -> list:
+    """
+    func over items on the crypto thread pool, results in input order.
+    """
+    items = list(items)
+    workers = min(len(items), crypto_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(func, items))
+
 IV_SIZE = 0x10
 PADDING_SIZE = 0xC
 START_OF_CHECKSUM_DATA = 4  # sizeof(int)
@@ -48,54 +74,100 @@ class BND4Entry:
         self.data_offset = data_offset
         self.footer_length = footer_length
         self._raw_data = raw_data
+        # Zero-copy slices if raw_data is a memoryview
         self._encrypted_data = raw_data[offset:offset + size]
         self._decrypted_slot_path = output_folder
         self._name = f"USERDATA_{index:02d}"
         self._clean_data = b''
+        self.decrypted = False
+        self.original_hash = b''  # content_hash right after decryption
         
         # Extract IV from beginning of encrypted data
         self._iv = self._encrypted_data[:IV_SIZE]
         self._encrypted_payload = self._encrypted_data[IV_SIZE:]
+
+    @property
+    def name(self) -> str:
+        return self._name
     
     def decrypt(self) -> None:
         try:
             decryptor = Cipher(algorithms.AES(DS2_KEY), modes.CBC(self._iv)).decryptor()
-            decrypted_raw = decryptor.update(self._encrypted_payload) + decryptor.finalize()
+            # Decrypt straight into the buffer SaveBuffer will patch, no intermediate copies
+            decrypted_raw = bytearray(len(self._encrypted_payload) + IV_SIZE - 1)
+            written = decryptor.update_into(self._encrypted_payload, decrypted_raw)
+            decryptor.finalize()
+            del decrypted_raw[written:]
             
             self._clean_data = decrypted_raw 
+            self.original_hash = self.content_hash()
 
             
             if self._decrypted_slot_path:
-                os.makedirs(self._decrypted_slot_path, exist_ok=True)
-                output_path = os.path.join(self._decrypted_slot_path, self._name)
-                with open(output_path, 'wb') as f:
-                    f.write(self._clean_data)
+                self.write_to(self._decrypted_slot_path)
             self.decrypted = True
             
         except Exception as e:
             print(f"Error decrypting entry {self._index}: {str(e)}")
             raise
+
+    def write_to(self, folder: str) -> str:
+        os.makedirs(folder, exist_ok=True)
+        output_path = os.path.join(folder, self._name)
+        with open(output_path, 'wb') as f:
+            f.write(self._clean_data)
+        return output_path
     
+    def content_hash(self) -> bytes:
+        """
+        Hash of the decrypted data without the MD5 field, which only depends on the rest.
+        """
+        checksum_end = len(self._clean_data) - END_OF_CHECKSUM_DATA
+        digest = hashlib.blake2b(digest_size=16)
+        with memoryview(self._clean_data) as view:
+            digest.update(view[:checksum_end])
+            digest.update(view[checksum_end + 16:])
+        return digest.digest()
+
+    @property
+    def is_changed(self) -> bool:
+        return self.content_hash() != self.original_hash
+
     def patch_checksum(self):
         checksum = self.calculate_checksum()
         checksum_end = len(self._clean_data) - END_OF_CHECKSUM_DATA
         
         # Replace checksum at the calculated position
-        self._clean_data = (
-            self._clean_data[:checksum_end] +
-            checksum +
-            self._clean_data[checksum_end + 16:]
-        )
+        if not isinstance(self._clean_data, bytearray):
+            self._clean_data = bytearray(self._clean_data)
+        self._clean_data[checksum_end:checksum_end + 16] = checksum
     
     def calculate_checksum(self) -> bytes:
         checksum_end = len(self._clean_data) - END_OF_CHECKSUM_DATA
-        data_for_hash = self._clean_data[START_OF_CHECKSUM_DATA:checksum_end]
-        return hashlib.md5(data_for_hash).digest()
+        with memoryview(self._clean_data) as view:
+            return hashlib.md5(view[START_OF_CHECKSUM_DATA:checksum_end]).digest()
     
-    def encrypt_sl2_data(self) -> bytes:
+    def encrypt_sl2_data(self) -> bytearray:
         encryptor = Cipher(algorithms.AES(DS2_KEY), modes.CBC(self._iv)).encryptor()
-        encrypted_payload = encryptor.update(self._clean_data) + encryptor.finalize()
-        return self._iv + encrypted_payload
+        encrypted = bytearray(IV_SIZE + len(self._clean_data) + IV_SIZE - 1)
+        encrypted[:IV_SIZE] = self._iv
+        with memoryview(encrypted) as view:
+            written = encryptor.update_into(self._clean_data, view[IV_SIZE:])
+        encryptor.finalize()
+        del encrypted[IV_SIZE + written:]
+        return encrypted
+
+    def release(self) -> None:
+        """
+        Drop the views into the raw file data so its mmap can be closed.
+            The IV is kept, encryption still needs it.
+        """
+        iv = bytes(self._iv)
+        for view in (self._iv, self._encrypted_payload, self._encrypted_data):
+            if isinstance(view, memoryview):
+                view.release()
+        self._iv = iv
+        self._encrypted_payload = self._encrypted_data = self._raw_data = b''
 
 import json
 
@@ -124,123 +196,267 @@ def get_input() -> Optional[str]:
     )
 
 
-def decrypt_ds2_sl2(input_file, log_callback=None) -> Dict[int, str]:
-    global original_sl2_path
-    global input_decrypted_path
-    global bnd4_entries
-    global raw 
-    
-    if not input_file:
-        input_file = get_input()
+BND4_HEADER_LEN = 64
+BND4_ENTRY_HEADER_LEN = 32
+BND4_ENTRY_MAGIC = b'\x40\x00\x00\x00\xff\xff\xff\xff'
+
+
+class Sl2Container:
+    """
+    Decrypted BND4 entries of a PC SL2 save, held in memory.
+        Entries are served by name (USERDATA_00, ...) like the files of a folder, so
+        SaveBuffer loads and flushes slots without a decrypted_output round-trip.
+        save re-encrypts the entries SaveBuffer flushed into and patches them into a
+        copy of the original file. Disk copies are only written by export.
+        open maps the file only while decrypting, entries decrypt from memoryview slices
+        of the map, so the decrypted entries are the only full copy in memory and the
+        file isn't held open afterwards.
+    """
+    def __init__(self, path: str, raw):
+        self.path = path
+        self.raw = raw  # Original encrypted file, None if it stays on disk at path
+        self.entries: list[BND4Entry] = []
+        self._by_name: dict[str, BND4Entry] = {}
+        self._source_stat = None  # (size, mtime) of path when it was read
+
+    @classmethod
+    def open(cls, path: str, log=debug) -> "Sl2Container":
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            raw = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        log(f"Mapped {len(raw)} bytes from {path}.")
+        try:
+            container = cls.parse(raw, path, log)
+        finally:
+            raw.close()
+        container.raw = None
+        container._source_stat = (stat.st_size, stat.st_mtime_ns)
+        return container
+
+    @classmethod
+    def parse(cls, raw: bytes, path: str = None, log=debug) -> "Sl2Container":
+        """
+        Decrypt every valid BND4 entry, in parallel. Broken entries are logged and skipped.
+        """
+        if raw[0:4] != b'BND4':
+            raise ValueError("'BND4' header not found! This doesn't appear to be a valid SL2 file.")
+        log("Found BND4 header.")
 
-    if not input_file:
-        return None
+        num_bnd4_entries = struct.unpack("<i", raw[12:16])[0]
+        log(f"Number of BND4 entries: {num_bnd4_entries}")
 
-    original_sl2_path = input_file
+        unicode_flag = (raw[48] == 1)
+        log(f"Unicode flag: {unicode_flag}")
+        log("")
 
-    def log(message):
-        if log_callback:
-            log_callback(message)
-        debug(message)
+        container = cls(path, raw)
+        raw_view = memoryview(raw)
+        pending: list[BND4Entry] = []
+        for i in range(num_bnd4_entries):
+            pos = BND4_HEADER_LEN + (BND4_ENTRY_HEADER_LEN * i)
 
-    try:
-        with open(input_file, 'rb') as f:
-            raw = f.read()
-    except Exception as e:
-        log(f"ERROR: Could not read input file: {e}")
-        return {}
-    
-    log(f"Read {len(raw)} bytes from {input_file}.")
-    if raw[0:4] != b'BND4':
-        log("ERROR: 'BND4' header not found! This doesn't appear to be a valid SL2 file.")
-        return {}
-    else:
-        log("Found BND4 header.")
+            if pos + BND4_ENTRY_HEADER_LEN > len(raw):
+                log(f"Warning: File too small to read entry #{i} header")
+                break
 
-    num_bnd4_entries = struct.unpack("<i", raw[12:16])[0]
-    log(f"Number of BND4 entries: {num_bnd4_entries}")
+            entry_header = raw[pos:pos + BND4_ENTRY_HEADER_LEN]
 
-    unicode_flag = (raw[48] == 1)
-    log(f"Unicode flag: {unicode_flag}")
-    log("")
-
-    BND4_HEADER_LEN = 64
-    BND4_ENTRY_HEADER_LEN = 32
-
-    slot_occupancy = {}
-    bnd4_entries = []
-    successful_decryptions = 0
+            if entry_header[0:8] != BND4_ENTRY_MAGIC:
+                log(f"Warning: Entry header #{i} does not match expected magic value - skipping")
+                continue
 
-    # Process all BND4 entries
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    output_folder = os.path.join(script_dir, "decrypted_output")
-    input_decrypted_path = output_folder
-    
-    for i in range(num_bnd4_entries):
-        pos = BND4_HEADER_LEN + (BND4_ENTRY_HEADER_LEN * i)
-        
-        if pos + BND4_ENTRY_HEADER_LEN > len(raw):
-            log(f"Warning: File too small to read entry #{i} header")
-            break
-            
-        entry_header = raw[pos:pos + BND4_ENTRY_HEADER_LEN]
+            entry_size, _, entry_data_offset, entry_name_offset, entry_footer_length = \
+                struct.unpack_from("<5i", entry_header, 8)
 
-        if entry_header[0:8] != b'\x40\x00\x00\x00\xff\xff\xff\xff':
-            log(f"Warning: Entry header #{i} does not match expected magic value - skipping")
-            continue
+            # Validity checks
+            if entry_size <= 0 or entry_size > 1000000000:  # Sanity check for size
+                log(f"Warning: Entry #{i} has invalid size: {entry_size} - skipping")
+                continue
 
-        entry_size = struct.unpack("<i", entry_header[8:12])[0]
-        entry_data_offset = struct.unpack("<i", entry_header[16:20])[0]
-        entry_name_offset = struct.unpack("<i", entry_header[20:24])[0]
-        entry_footer_length = struct.unpack("<i", entry_header[24:28])[0]
-        
-        # Validity checks
-        if entry_size <= 0 or entry_size > 1000000000:  # Sanity check for size
-            log(f"Warning: Entry #{i} has invalid size: {entry_size} - skipping")
-            continue
-            
-        if entry_data_offset <= 0 or entry_data_offset + entry_size > len(raw):
-            log(f"Warning: Entry #{i} has invalid data offset: {entry_data_offset} - skipping")
-            continue
-            
-        if entry_name_offset <= 0 or entry_name_offset >= len(raw):
-            log(f"Warning: Entry #{i} has invalid name offset: {entry_name_offset} - skipping")
-            continue
+            if entry_data_offset <= 0 or entry_data_offset + entry_size > len(raw):
+                log(f"Warning: Entry #{i} has invalid data offset: {entry_data_offset} - skipping")
+                continue
 
+            if entry_name_offset <= 0 or entry_name_offset >= len(raw):
+                log(f"Warning: Entry #{i} has invalid name offset: {entry_name_offset} - skipping")
+                continue
 
+            try:
+                pending.append(BND4Entry(
+                    raw_data=raw_view,
+                    index=i,
+                    output_folder=None,
+                    size=entry_size,
+                    offset=entry_data_offset,
+                    name_offset=entry_name_offset,
+                    footer_length=entry_footer_length,
+                    data_offset=entry_data_offset
+                ))
+            except Exception as e:
+                log(f"Error processing entry #{i}: {str(e)}")
 
-        try:
-            entry = BND4Entry(
-                raw_data=raw, 
-                index=i, 
-                output_folder=output_folder, 
-                size=entry_size, 
-                offset=entry_data_offset,
-                name_offset=entry_name_offset, 
-                footer_length=entry_footer_length, 
-                data_offset=entry_data_offset  
-            )
-            
+        def _decrypt(entry: BND4Entry):
             try:
                 entry.decrypt()
-                bnd4_entries.append(entry)
-                successful_decryptions += 1
             except Exception as e:
-                log(f"Error decrypting entry #{i}: {str(e)}")
+                return e
+            return None
+
+        for entry, error in zip(pending, crypto_map(_decrypt, pending)):
+            if error is not None:
+                log(f"Error decrypting entry #{entry.index}: {str(error)}")
+                entry.release()
                 continue
-                    
-        except Exception as e:
-            log(f"Error processing entry #{i}: {str(e)}")
-            continue
-        
+            container.entries.append(entry)
+            container._by_name[entry.name] = entry
+        if isinstance(raw, mmap.mmap):
+            for entry in container.entries:
+                entry.release()
+        raw_view.release()
+        return container
+
+    # ---------- Slot access ----------
+    @property
+    def names(self) -> list[str]:
+        return [entry.name for entry in self.entries]
+
+    def __contains__(self, name) -> bool:
+        return name in self._by_name
+
+    def __getitem__(self, name):
+        """
+        Decrypted entry data. Treat it as read-only, write through __setitem__ / SaveBuffer.
+        """
+        return self._by_name[name]._clean_data
+
+    def __setitem__(self, name, data):
+        # A size change is caught by save, which can't re-encrypt the entry then
+        self._by_name[name]._clean_data = data if isinstance(data, bytearray) else bytearray(data)
+
+    # ---------- Write back ----------
+    def _check_source(self):
+        stat = os.stat(self.path)
+        if (stat.st_size, stat.st_mtime_ns) != self._source_stat:
+            raise ValueError(f"{self.path} was changed by another program since it was opened. "
+                             "Reopen it before saving.")
+
+    def save(self, output_path: str) -> int:
+        """
+        Write the encrypted save. Entries keep their original encrypted bytes unless
+        their content hash changed, those are checksummed and encrypted in parallel.
+            The original file is copied to a temp file next to output_path, patched there
+            and then moved over output_path, so a failed save leaves the old file intact.
+
+        :return: Count of re-encrypted entries.
+        """
+        if self.raw is None:
+            # Unchanged entries are copied from the file, it must still hold what was decrypted
+            self._check_source()
+        save_buffer = SaveBuffer()
+        # Entries SaveBuffer never flushed into can't have changed, skip hashing them
+        flushed = [entry for entry in self.entries if save_buffer.is_modified(entry.name)]
+
+        def _encrypt(entry: BND4Entry) -> Optional[bytes]:
+            # Edited back to the original content (e.g. undone): the original bytes are still valid
+            if not entry.is_changed:
+                return None
+            # Checksum on the data
+            entry.patch_checksum()
+            return entry.encrypt_sl2_data()
+
+        patches = []
+        for entry, encrypted_entry_data in zip(flushed, crypto_map(_encrypt, flushed)):
+            # Unchanged slot: the original encrypted bytes are copied through
+            if encrypted_entry_data is None:
+                continue
+            if len(encrypted_entry_data) != entry.size:
+                print(f"  WARNING: Size mismatch! Expected {entry.size}, got {len(encrypted_entry_data)}")
+                continue
+            patches.append((entry, encrypted_entry_data))
+
+        overwrites_source = (self.raw is None and os.path.exists(output_path)
+                             and os.path.samefile(output_path, self.path))
+        fd, temp_path = tempfile.mkstemp(prefix=".sl2-", suffix=".tmp",
+                                         dir=os.path.dirname(os.path.abspath(output_path)))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if self.raw is not None:
+                    f.write(self.raw)
+            if self.raw is None:
+                shutil.copyfile(self.path, temp_path)
+            if os.path.exists(output_path):
+                shutil.copymode(output_path, temp_path)
+            with open(temp_path, 'r+b') as f:
+                for entry, encrypted_entry_data in patches:
+                    f.seek(entry.data_offset)
+                    f.write(encrypted_entry_data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, output_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        if overwrites_source:
+            # The file now holds the new ciphertext, make it the baseline of the hash check
+            for entry, _ in patches:
+                entry.original_hash = entry.content_hash()
+            stat = os.stat(self.path)
+            self._source_stat = (stat.st_size, stat.st_mtime_ns)
+        return len(patches)
+
+    def export(self, folder: str) -> list[str]:
+        """
+        Write the decrypted entries and index_mapping.json into folder.
+
+        :return: Paths of the written entries.
+        """
+        paths = [entry.write_to(folder) for entry in self.entries]
+        save_index_mapping(self.entries, folder)
+        return paths
+
+
+container: Optional[Sl2Container] = None
+
+
+def decrypt_ds2_sl2(input_file, log_callback=None, output_folder=None) -> Optional[Sl2Container]:
+    """
+    Decrypt a PC save into memory. The entries are only written to disk if output_folder is given.
+    """
+    global original_sl2_path
+    global bnd4_entries
+    global container
+    
+    if not input_file:
+        input_file = get_input()
 
-    save_index_mapping(bnd4_entries, input_decrypted_path)
+    if not input_file:
+        return None
 
-    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "decrypted_output")
+    original_sl2_path = input_file
 
+    def log(message):
+        if log_callback:
+            log_callback(message)
+        debug(message)
 
+    container = None
+    bnd4_entries = []
 
+    try:
+        container = Sl2Container.open(input_file, log)
+    except OSError as e:
+        log(f"ERROR: Could not read input file: {e}")
+        return None
+    except ValueError as e:
+        log(f"ERROR: {e}")
+        return None
 
+    bnd4_entries = container.entries
+    if output_folder:
+        container.export(output_folder)
+    return container
     
     
 def get_output() -> Optional[str]:
@@ -287,54 +503,10 @@ def read_input():
 
 slot_occupancy = {}
 bnd4_entries = []
-BND4_HEADER_LEN = 64
-BND4_ENTRY_HEADER_LEN = 32
 
 
 def encrypt_modified_files(output_sl2_file):
-    global raw, bnd4_entries, original_sl2_path
-    # Load original SL2 file
-    with open(original_sl2_path, 'rb') as f:
-        original_data = f.read()
-
-    
-    new_data = bytearray(original_data)
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    output_folder = os.path.join(script_dir, "decrypted_output")
-    
-    for entry in bnd4_entries:
-        filename = f"USERDATA_{entry.index:02d}"
-        file_path = os.path.join(output_folder, filename)
-        
-        if not os.path.exists(file_path):
-            continue
-        
-
-        
-        # Load the modified decrypted data
-        with open(file_path, 'rb') as f:
-            modified_data = f.read()
-
-        
-        # Update the entry's clean data with the modified data
-        entry._clean_data = bytearray(modified_data)
-        #Checksum on the data
-        entry.patch_checksum()
-        
-
-        encrypted_entry_data = entry.encrypt_sl2_data()
-
-        
-
-        if len(encrypted_entry_data) != entry.size:
-            print(f"  WARNING: Size mismatch! Expected {entry.size}, got {len(encrypted_entry_data)}")
-            continue
-        
-        data_start = entry.data_offset
-        new_data[data_start:data_start + len(encrypted_entry_data)] = encrypted_entry_data
-        
-
-    
-    with open(output_sl2_file, 'wb') as f:
-        f.write(new_data)
-    
+    if container is None:
+        print("ERROR: No SL2 file is open. Call decrypt_ds2_sl2() first.")
+        return
+    container.save(output_sl2_file)
@@ -0,0 +1,340 @@
+import os
+import hashlib
+import logging
+import threading
+import dataclasses
+from array import array
+
+import numpy as np
+import orjson
+
+import globals
+from config_manager import get_base_dir
+from save_buffer import SaveBuffer
+from source_data_handler import SourceDataHandler
+from inventory_handler import InventoryHandler, ItemStateTable, ItemEntry, RelicTable, StateScan, ITEM_ENTRY_DTYPE
+from vessel_handler import LoadoutHandler, HeroLoadout, VesselEntry, PresetEntry, RelicRefIndex
+
+
+logger = logging.getLogger(__name__)
+
+
+# ---------- Cache file layout ----------
+# One .npz per key, read with allow_pickle=False:
+#   Numeric columns and byte blobs as arrays, everything else as orjson bytes in the "meta" array.
+#   Item States and Item Entries are rebuilt from the userdata bytes, as parse() does.
+#   Derived lookups (preset positions, RelicRefIndex, all_presets, RelicTable.row_of) are rebuilt on load.
+CACHE_DIR = os.path.join(get_base_dir(), "model_cache")
+CACHE_SUFFIX = ".npz"
+MAX_CACHE_FILES = 10
+
+RELIC_TABLE_COLUMNS = ("ga_handle", "relic_id", "effects", "acquisition_id", "is_favorite", "is_new",
+                       "equipped_mask")
+INVENTORY_INT_FIELDS = ("player_name_offset", "entry_count_offset", "entry_offset", "murks_offset",
+                        "sigs_offset", "entry_count", "_cur_last_instance_id", "_cur_last_acquisition_id",
+                        "_cur_last_state_index")
+INVENTORY_GA_LISTS = ("relic_gas", "illegal_gas", "curse_illegal_gas", "strict_invalid_gas")
+
+_param_version = None
+_model_format = None
+_param_lock = threading.Lock()
+
+
+def model_format() -> str:
+    """
+    Hash of the stored model layout: the MODEL_FIELDS of both handlers, the stored columns and
+    their types. Any layout change gives new cache keys, no manual bump needed.
+    """
+    global _model_format
+    with _param_lock:
+        if _model_format is None:
+            layout = {
+                "InventoryHandler": InventoryHandler.MODEL_FIELDS,
+                "LoadoutHandler": LoadoutHandler.MODEL_FIELDS,
+                "RelicTable": [(column, getattr(RelicTable(), column).dtype.str) for column in RELIC_TABLE_COLUMNS],
+                "ItemEntry": ITEM_ENTRY_DTYPE.descr,
+                "StateScan": [(name, str(tp)) for name, tp in StateScan.__annotations__.items()],
+                "VesselEntry": [(f.name, str(f.type)) for f in dataclasses.fields(VesselEntry)],
+                "PresetEntry": [(f.name, str(f.type)) for f in dataclasses.fields(PresetEntry)],
+                "columns": (INVENTORY_INT_FIELDS, INVENTORY_GA_LISTS),
+            }
+            _model_format = hashlib.blake2b(orjson.dumps(layout), digest_size=16).hexdigest()
+        return _model_format
+
+
+def param_version() -> str:
+    """
+    Hash of the game param files and the model layout. Illegal relic results depend on the params,
+    so an updated param set invalidates every cached model.
+    """
+    global _param_version
+    fmt = model_format()
+    with _param_lock:
+        if _param_version is None:
+            h = hashlib.blake2b(fmt.encode(), digest_size=16)
+            param_dir = SourceDataHandler.PARAM_DIR
+            for name in sorted(os.listdir(param_dir)):
+                with open(param_dir / name, "rb") as f:
+                    h.update(name.encode())
+                    h.update(f.read())
+            _param_version = h.hexdigest()
+        return _param_version
+
+
+def cache_key(data) -> str:
+    h = hashlib.blake2b(data, digest_size=16)
+    h.update(param_version().encode())
+    return h.hexdigest()
+
+
+def _cache_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"{key}{CACHE_SUFFIX}")
+
+
+def _prune():
+    files = []
+    for name in os.listdir(CACHE_DIR):
+        if name.endswith(CACHE_SUFFIX):
+            files.append(os.path.join(CACHE_DIR, name))
+    if len(files) <= MAX_CACHE_FILES:
+        return
+    files.sort(key=os.path.getmtime)
+    for path in files[:-MAX_CACHE_FILES]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# ---------- Encoding helpers ----------
+def _pack_blobs(blobs) -> tuple[np.ndarray, np.ndarray]:
+    lengths = np.array([len(b) for b in blobs], dtype=np.int64)
+    return np.frombuffer(b"".join(blobs), dtype=np.uint8), lengths
+
+
+def _unpack_blobs(blob: np.ndarray, lengths: np.ndarray) -> list[bytearray]:
+    data = blob.tobytes()
+    result = []
+    pos = 0
+    for length in lengths.tolist():
+        result.append(bytearray(data[pos:pos + length]))
+        pos += length
+    return result
+
+
+def _int_array(values) -> np.ndarray:
+    return np.array([int(v) for v in values], dtype=np.int64)
+
+
+# ---------- Inventory ----------
+def _encode_inventory(model: dict, arrays: dict, meta: dict):
+    states: ItemStateTable = model["states"]
+    meta["states"] = {"start_offset": states.start_offset, "slot_count": states.slot_count}
+    # Entries are re-read from the bytes, only the equip counts come from the loadouts
+    entry_items = list(model["entries"].items())
+    arrays["entry.key"] = _int_array(k for k, _ in entry_items)
+    arrays["entry.equipped_by"] = np.array([entry.equipped_by for _, entry in entry_items],
+                                           dtype=np.int64).reshape(-1, 10)
+
+    key_of = {id(entry): key for key, entry in entry_items}
+    relic_items = list(model["relics"].items())
+    if any(id(entry) not in key_of for _, entry in relic_items):
+        raise ValueError("Relic entry missing from the entries")
+    arrays["relics.ga"] = _int_array(ga for ga, _ in relic_items)
+    arrays["relics.entry_key"] = _int_array(key_of[id(entry)] for _, entry in relic_items)
+
+    table: RelicTable = model["relic_table"]
+    for column in RELIC_TABLE_COLUMNS:
+        arrays[f"relic_table.{column}"] = getattr(table, column)
+
+    signature_items = list(model["relic_signature_index"].items())
+    arrays["signature.key"] = np.array([key for key, _ in signature_items], dtype=np.int64).reshape(-1, 7)
+    arrays["signature.count"] = _int_array(len(gas) for _, gas in signature_items)
+    arrays["signature.ga"] = _int_array(ga for _, gas in signature_items for ga in gas)
+
+    scan: StateScan = model["state_scan"]
+    meta["state_scan"] = {"end_offset": scan.end_offset}
+    for name in ("indices", "offsets", "sizes"):
+        column = getattr(scan, name)
+        meta["state_scan"][name] = column.typecode
+        arrays[f"state_scan.{name}"] = _int_array(column)
+
+    meta["inventory"] = {name: int(model[name]) for name in INVENTORY_INT_FIELDS}
+    meta["vessels"] = sorted(int(v) for v in model["vessels"])
+    acquisition_items = list(model["ga_to_acquisition_id"].items())
+    arrays["acquisition.ga"] = _int_array(ga for ga, _ in acquisition_items)
+    arrays["acquisition.id"] = _int_array(acq for _, acq in acquisition_items)
+    for name in INVENTORY_GA_LISTS:
+        arrays[name] = _int_array(model[name])
+
+
+def _decode_inventory(arrays, meta: dict) -> dict:
+    """
+    Rebuild the inventory model. globals.data must already hold the bytes as parsed.
+    """
+    model = dict(meta["inventory"])
+    scan_meta = meta["state_scan"]
+    scan = StateScan(*(array(scan_meta[name], arrays[f"state_scan.{name}"].tolist())
+                       for name in ("indices", "offsets", "sizes")),
+                     scan_meta["end_offset"])
+    model["state_scan"] = scan
+    states = ItemStateTable.from_scan(globals.data, scan, meta["states"]["start_offset"],
+                                      meta["states"]["slot_count"])
+    model["states"] = states
+
+    entries = {}
+    entry_offset = model["entry_offset"]
+    for key, equipped_by in zip(arrays["entry.key"].tolist(), arrays["entry.equipped_by"].tolist()):
+        entry_start = entry_offset + key * ITEM_ENTRY_DTYPE.itemsize
+        entry = ItemEntry(globals.data[entry_start:entry_start + ITEM_ENTRY_DTYPE.itemsize])
+        entry.index = key
+        entry.equipped_by = equipped_by
+        state_index = states.index_of(entry.ga_handle)
+        if state_index < 0:
+            raise ValueError(f"Relic 0x{entry.ga_handle:08X} has no Item State")
+        entry.link_state(states[state_index])
+        entries[key] = entry
+    model["entries"] = entries
+    model["relics"] = {ga: entries[key] for ga, key in zip(arrays["relics.ga"].tolist(),
+                                                           arrays["relics.entry_key"].tolist())}
+
+    table = RelicTable()
+    for column in RELIC_TABLE_COLUMNS:
+        setattr(table, column, arrays[f"relic_table.{column}"])
+    table.row_of = {ga: row for row, ga in enumerate(table.ga_handle.tolist())}
+    model["relic_table"] = table
+
+    signature_index = {}
+    flat_gas = arrays["signature.ga"].tolist()
+    pos = 0
+    for key, count in zip(arrays["signature.key"].tolist(), arrays["signature.count"].tolist()):
+        signature_index[tuple(key)] = flat_gas[pos:pos + count]
+        pos += count
+    model["relic_signature_index"] = signature_index
+
+    model["vessels"] = set(meta["vessels"])
+    model["ga_to_acquisition_id"] = dict(zip(arrays["acquisition.ga"].tolist(), arrays["acquisition.id"].tolist()))
+    for name in INVENTORY_GA_LISTS:
+        model[name] = arrays[name].tolist()
+    return model
+
+
+# ---------- Loadouts ----------
+def _dataclass_values(record) -> list:
+    return [getattr(record, f.name) for f in dataclasses.fields(record)]
+
+
+def _encode_loadout(model: dict, meta: dict):
+    heroes = []
+    for hero_type, hero in model["heroes"].items():
+        heroes.append({
+            "key": hero_type,
+            "hero_type": hero.hero_type,
+            "cur_preset_idx": hero.cur_preset_idx,
+            "cur_vessel_id": hero.cur_vessel_id,
+            "offset": hero.offset,
+            "vessels": [_dataclass_values(v) for v in hero.vessels],
+            "presets": [_dataclass_values(p) for p in hero.presets],
+            "dirty_fields": sorted(hero.dirty_fields),
+            "dirty_vessels": sorted(hero.dirty_vessels),
+            "dirty_presets": [[index, sorted(fields)] for index, fields in hero.dirty_presets.items()],
+        })
+    meta["loadout"] = {
+        "heroes": heroes,
+        "relic_ga_hero_map": [[ga, list(hero_types)] for ga, hero_types in model["relic_ga_hero_map"].items()],
+        "base_offset": model["base_offset"],
+    }
+
+
+def _decode_loadout(meta: dict) -> dict:
+    loadout = meta["loadout"]
+    heroes = {}
+    for data in loadout["heroes"]:
+        vessels = [VesselEntry(v[0], tuple(v[1]), *v[2:]) for v in data["vessels"]]
+        hero = HeroLoadout(data["hero_type"], data["cur_preset_idx"], data["cur_vessel_id"], vessels, data["offset"])
+        hero.presets = [PresetEntry(*p[:4], tuple(p[4]), *p[5:]) for p in data["presets"]]
+        hero.reindex_presets()
+        hero.dirty_fields = set(data["dirty_fields"])
+        hero.dirty_vessels = set(data["dirty_vessels"])
+        hero.dirty_presets = {index: set(fields) for index, fields in data["dirty_presets"]}
+        heroes[data["key"]] = hero
+    relic_refs = RelicRefIndex.build(heroes)
+    for hero in heroes.values():
+        hero.refs = relic_refs
+    all_presets = [p for h in heroes.values() for p in h.presets]
+    all_presets.sort(key=lambda x: x.index)
+    return {"heroes": heroes,
+            "relic_ga_hero_map": {ga: set(hero_types) for ga, hero_types in loadout["relic_ga_hero_map"]},
+            "relic_refs": relic_refs,
+            "base_offset": loadout["base_offset"],
+            "all_presets": all_presets}
+
+
+# ---------- Save / load ----------
+def save_model(key: str, inventory, loadout) -> bool:
+    """
+    Store the parsed and validated model of the userdata bytes hashed as key.
+        Only call it when illegal relic results are up to date and no user edit happened since loading.
+        Bytes changed by parsing itself (e.g. is_new flags of equipped relics) are stored as patches,
+        so restoring leaves globals.data exactly as parse() would.
+    """
+    if globals.data is None:
+        return False
+    try:
+        ranges = SaveBuffer().dirty_ranges
+        arrays = {"patch.offset": _int_array(start for start, _ in ranges)}
+        arrays["patch.data"], arrays["patch.data_len"] = _pack_blobs(
+            [bytes(globals.data[start:end]) for start, end in ranges])
+        meta = {}
+        _encode_inventory(inventory.export_model(), arrays, meta)
+        _encode_loadout(loadout.export_model(), meta)
+        arrays["meta"] = np.frombuffer(orjson.dumps(meta, option=orjson.OPT_SERIALIZE_NUMPY), dtype=np.uint8)
+
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = _cache_path(key) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, _cache_path(key))
+        _prune()
+        logger.info(f"Saved model cache {key}")
+        return True
+    except Exception as e:
+        logger.warning(f"Failed to save model cache: {e}")
+        return False
+
+
+def load_model(key: str, inventory, loadout) -> bool:
+    """
+    Restore both models for freshly loaded userdata bytes hashed as key.
+
+    :return: True if restored, False if the caller has to parse and validate.
+    :rtype: bool
+    """
+    if globals.data is None:
+        return False
+    path = _cache_path(key)
+    if not os.path.exists(path):
+        return False
+    try:
+        with np.load(path, allow_pickle=False) as npz:
+            arrays = {name: npz[name] for name in npz.files}
+        meta = orjson.loads(arrays["meta"].tobytes())
+        # Same bytes parse() writes itself, so they are harmless if decoding fails below
+        patches = _unpack_blobs(arrays["patch.data"], arrays["patch.data_len"])
+        save_buffer = SaveBuffer()
+        for offset, data in zip(arrays["patch.offset"].tolist(), patches):
+            save_buffer.write(offset, data)
+        inventory_model = _decode_inventory(arrays, meta)
+        loadout_model = _decode_loadout(meta)
+        inventory.restore_model(inventory_model)
+        loadout.restore_model(loadout_model)
+        os.utime(path)  # Keep recently used entries when pruning
+        logger.info(f"Restored model from cache {key}")
+        return True
+    except Exception as e:
+        logger.warning(f"Failed to load model cache, parsing instead: {e}")
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return False
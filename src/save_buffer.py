@@ -0,0 +1,226 @@
+import os
+import struct
+import threading
+import logging
+from bisect import bisect_left
+
+import globals
+
+
+logger = logging.getLogger(__name__)
+
+
+class SaveBuffer:
+    """
+    Write access to globals.data with dirty byte range tracking.
+        Every write into the userdata buffer should go through write / pack_into / splice,
+        so that flush only patches the changed ranges into the working copy on disk
+        instead of rewriting the whole file after each edit.
+        Files that never received a flush since they were unpacked are "unchanged" and
+        can be skipped by later stages (checksum, encryption).
+        With a store attached (e.g. main_file.Sl2Container), names found in it are
+        loaded from and flushed into memory instead of files.
+    """
+    _instance = None
+    _lock = threading.RLock()
+    _initialized = False
+
+    # Dirty ranges closer than this are written in one go
+    MERGE_GAP = 512
+
+    def __new__(cls):
+        # Singleton Pattern
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super(SaveBuffer, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        with self._lock:
+            self._initialized = True
+            self.path: str = None  # On-disk working copy of globals.data
+            self._starts: list[int] = []  # Sorted, non-overlapping [start, end) ranges
+            self._ends: list[int] = []
+            self.write_count = 0  # Writes into globals.data since it was loaded
+            self.modified_files: set[str] = set()
+            self.store = None  # name -> bytearray mapping of in-memory userdata, see attach
+            # Called as recorder(offset, old_bytes, new_bytes) for every write, see EditJournal
+            self.recorder = None
+
+    @staticmethod
+    def _norm(path) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    def _in_store(self, path) -> bool:
+        return self.store is not None and path in self.store
+
+    def _key(self, path) -> str:
+        return path if self._in_store(path) else self._norm(path)
+
+    # ---------- Loading ----------
+    def attach(self, store):
+        """
+        Serve userdata from store (or from files again if None). Everything starts unchanged.
+        """
+        with self._lock:
+            self.store = store
+            self.path = None
+            self.reset_modified()
+
+    def read(self, path) -> bytes:
+        """
+        Userdata content without loading it. Treat store buffers as read-only.
+        """
+        if self._in_store(path):
+            return self.store[path]
+        with open(path, "rb") as f:
+            return f.read()
+
+    def load(self, path) -> bytearray:
+        """
+        Read a userdata file (or store entry) into globals.data. The buffer starts clean.
+        """
+        with self._lock:
+            globals.data = bytearray(self.read(path))  # Use bytearray for in-place modifications
+            self.path = path
+            self.clear()
+            self.write_count = 0
+            return globals.data
+
+    def reset_modified(self):
+        """
+        Forget which files were changed. Call it after (re)unpacking a save.
+        """
+        with self._lock:
+            self.modified_files.clear()
+            self.clear()
+
+    def is_modified(self, path) -> bool:
+        return self._key(path) in self.modified_files
+
+    # ---------- Dirty ranges ----------
+    def clear(self):
+        self._starts.clear()
+        self._ends.clear()
+
+    @property
+    def dirty_ranges(self) -> list[tuple[int, int]]:
+        return list(zip(self._starts, self._ends))
+
+    @property
+    def is_dirty(self) -> bool:
+        return bool(self._starts)
+
+    def mark_dirty(self, start: int, end: int):
+        """
+        Add [start, end) to the dirty ranges, merging overlapping or touching ranges.
+        """
+        if end <= start:
+            return
+        with self._lock:
+            self.write_count += 1
+            i = bisect_left(self._ends, start)
+            j = i
+            while j < len(self._starts) and self._starts[j] <= end:
+                start = min(start, self._starts[j])
+                end = max(end, self._ends[j])
+                j += 1
+            self._starts[i:j] = [start]
+            self._ends[i:j] = [end]
+
+    def mark_all(self):
+        if globals.data is not None:
+            self.mark_dirty(0, len(globals.data))
+
+    # ---------- Write primitives ----------
+    def write(self, offset: int, data):
+        """
+        Overwrite bytes in place. The buffer size doesn't change.
+        """
+        end = offset + len(data)
+        if self.recorder is not None:
+            self.recorder(offset, bytes(globals.data[offset:end]), bytes(data))
+        globals.data[offset:end] = data
+        self.mark_dirty(offset, end)
+
+    def pack_into(self, fmt, offset: int, *values):
+        if not isinstance(fmt, struct.Struct):
+            fmt = struct.Struct(fmt)
+        end = offset + fmt.size
+        if self.recorder is not None:
+            self.recorder(offset, bytes(globals.data[offset:end]), fmt.pack(*values))
+        fmt.pack_into(globals.data, offset, *values)
+        self.mark_dirty(offset, end)
+
+    def splice(self, start: int, end: int, data):
+        """
+        Replace globals.data[start:end] with data, which may have a different length.
+            globals.data is rebound to a new bytearray, so views over the old one
+            (e.g. InventoryHandler.entry_table) must be re-bound afterwards.
+            A size change shifts every following byte, so everything after start becomes dirty.
+        """
+        if self.recorder is not None:
+            self.recorder(start, bytes(globals.data[start:end]), bytes(data))
+        globals.data = globals.data[:start] + data + globals.data[end:]
+        if len(data) == end - start:
+            self.mark_dirty(start, start + len(data))
+        else:
+            self.mark_dirty(start, len(globals.data))
+
+    # ---------- Write back ----------
+    def _coalesced_ranges(self):
+        ranges = []
+        for start, end in zip(self._starts, self._ends):
+            if ranges and start - ranges[-1][1] <= self.MERGE_GAP:
+                ranges[-1][1] = end
+            else:
+                ranges.append([start, end])
+        return ranges
+
+    def flush(self, path=None) -> int:
+        """
+        Patch the dirty ranges of globals.data into the file or store entry.
+            Falls back to a full write if the file is missing or its size differs.
+
+        :return: Count of bytes written.
+        :rtype: int
+        """
+        path = path or self.path
+        if globals.data is None or not path:
+            return 0
+        with self._lock:
+            if self.path is None or self._key(path) != self._key(self.path):
+                # Buffer came from somewhere else, ranges are meaningless for this file
+                self.path = path
+                self.mark_all()
+            if not self._starts:
+                return 0
+
+            written = 0
+            if self._in_store(path):
+                target = self.store[path]
+                if not isinstance(target, bytearray) or len(target) != len(globals.data):
+                    self.store[path] = bytearray(globals.data)
+                    written = len(globals.data)
+                else:
+                    for start, end in self._coalesced_ranges():
+                        target[start:end] = globals.data[start:end]
+                        written += end - start
+            elif not os.path.exists(path) or os.path.getsize(path) != len(globals.data):
+                with open(path, "wb") as f:
+                    f.write(globals.data)
+                written = len(globals.data)
+            else:
+                with memoryview(globals.data) as view, open(path, "r+b") as f:
+                    for start, end in self._coalesced_ranges():
+                        f.seek(start)
+                        f.write(view[start:end])
+                        written += end - start
+
+            logger.debug(f"Wrote {written} bytes in {len(self._starts)} ranges to {path}")
+            self.modified_files.add(self._key(path))
+            self.clear()
+            return written
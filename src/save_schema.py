@@ -0,0 +1,139 @@
+import struct
+from collections import namedtuple
+
+
+class Record:
+    """
+    Layout of one fixed-size save record.
+        Built once from (name, format) pairs. A None name marks padding or unknown bytes.
+        The whole record and every field get a precompiled struct.Struct, so hot loops
+        never re-parse format strings. Fields with several values (e.g. "6I") decode as tuples.
+    """
+    def __init__(self, name: str, fields: list[tuple[str, str]]):
+        self.name = name
+        self.struct = struct.Struct("<" + "".join(fmt for _, fmt in fields))
+        self.size = self.struct.size
+        self.offsets: dict[str, int] = {}  # Field byte offset inside the record
+        self.fields: dict[str, struct.Struct] = {}
+        self._groups: list[tuple[int, int]] = []  # (first value index, value count) per named field
+        names = []
+        pos = 0
+        value_index = 0
+        for field_name, fmt in fields:
+            field_struct = struct.Struct("<" + fmt)
+            value_count = len(field_struct.unpack(bytes(field_struct.size)))
+            if field_name is not None:
+                names.append(field_name)
+                self.offsets[field_name] = pos
+                self.fields[field_name] = field_struct
+                self._groups.append((value_index, value_count))
+            pos += field_struct.size
+            value_index += value_count
+        self.tuple_type = namedtuple(name, names)
+
+    def _decode(self, values):
+        return self.tuple_type._make(values[i] if n == 1 else values[i:i + n] for i, n in self._groups)
+
+    def unpack_from(self, buffer, offset=0):
+        return self._decode(self.struct.unpack_from(buffer, offset))
+
+    def pack(self, **fields) -> bytes:
+        """
+        Build a whole record from field values. Padding bytes are zero.
+        """
+        values = []
+        for field_name, (_, count) in zip(self.tuple_type._fields, self._groups):
+            value = fields[field_name]
+            if count == 1:
+                values.append(value)
+            else:
+                values.extend(value)
+        return self.struct.pack(*values)
+
+    def iter_unpack(self, buffer, offset=0, count=None):
+        """
+        Decode consecutive records starting at offset.
+            count=None decodes as many as fit, callers stop at their own terminator.
+        """
+        available = max(0, (len(buffer) - offset) // self.size)
+        if count is None:
+            count = available
+        elif count > available:
+            raise struct.error(f"{self.name}: {count} records requested, {available} available")
+        with memoryview(buffer) as view:
+            for values in self.struct.iter_unpack(view[offset:offset + count * self.size]):
+                yield self._decode(values)
+
+    def read(self, buffer, field: str, offset=0):
+        """
+        Read one field of the record at offset. Single values are returned unwrapped.
+        """
+        values = self.fields[field].unpack_from(buffer, offset + self.offsets[field])
+        return values[0] if len(values) == 1 else values
+
+    def write(self, buffer, field: str, value, offset=0):
+        field_struct = self.fields[field]
+        if isinstance(value, (tuple, list)):
+            field_struct.pack_into(buffer, offset + self.offsets[field], *value)
+        else:
+            field_struct.pack_into(buffer, offset + self.offsets[field], value)
+
+
+# ---------- Item States (start at 0x14) ----------
+ITEM_STATE_HEADER = Record("ItemStateHeader", [
+    ("ga_handle", "I"),
+    ("item_id", "I"),
+])
+
+RELIC_STATE = Record("RelicState", [
+    ("ga_handle", "I"),
+    ("item_id", "I"),
+    ("durability", "I"),  # Same as item_id for relics
+    ("unk_1", "I"),
+    ("effect_1", "I"),
+    ("effect_2", "I"),
+    ("effect_3", "I"),
+    (None, "28x"),
+    ("curse_1", "I"),
+    ("curse_2", "I"),
+    ("curse_3", "I"),
+    ("unk_2", "I"),
+    (None, "8x"),
+])
+
+# ---------- Item Entries (after the entry count) ----------
+ITEM_ENTRY = Record("ItemEntryRecord", [
+    ("ga_handle", "I"),
+    ("item_amount", "I"),
+    ("acquisition_id", "I"),
+    ("is_favorite", "B"),
+    ("is_new", "B"),
+])
+
+# ---------- Vessel block (after the magic + marker) ----------
+VESSEL = Record("VesselRecord", [
+    ("vessel_id", "I"),
+    ("relics", "6I"),
+])
+
+# 10 fixed hero records, each with 4 universal vessel slots
+HERO_LOADOUT = Record("HeroLoadoutRecord", [
+    ("hero_type", "B"),
+    ("cur_preset_idx", "B"),
+    (None, "2x"),
+    ("cur_vessel_id", "I"),
+    ("vessels", f"{4 * 7}I"),  # 4 x VESSEL
+])
+HERO_COUNT = 10
+HERO_VESSEL_SLOTS = 4
+
+PRESET = Record("PresetRecord", [
+    ("header", "B"),  # 0x01 for a used preset
+    ("hero_type", "H"),
+    ("counter", "B"),
+    ("name", "36s"),  # UTF-16, max 18 chars
+    (None, "4x"),
+    ("vessel_id", "I"),
+    ("relics", "6I"),
+    ("timestamp", "Q"),
+])
@@ -0,0 +1,255 @@
+import base64
+import binascii
+import zlib
+
+
+# ---------- Share code layout ----------
+# Binary: version (u8), kind (u8), payload, crc32 of everything before it (u32 LE).
+# All integers in the payload are LEB128 varints.
+#   Relic table: count, then per relic (sorted): relic_id delta, 6 x (effect + 1) mod 2^32,
+#       so empty effects (0xffffffff) take a single byte.
+#   Loadouts: relic table, hero count, then per hero: hero_type, cur_vessel_id,
+#       vessel count, per vessel: vessel_id + 6 slot refs,
+#       preset count, per preset: name length + UTF-8 name, vessel_id + 6 slot refs.
+#       A slot ref is the relic table index + 1, 0 for an empty slot.
+#   Relics: relic table only.
+# Text: prefix + base64url or base32 without padding.
+FORMAT_VERSION = 1
+KIND_LOADOUTS = 1
+KIND_RELICS = 2
+TEXT_PREFIXES = {"base64": "NR64-", "base32": "NR32-"}
+
+EMPTY_EFFECT = 0xFFFFFFFF
+EFFECT_KEYS = ("effect_1", "effect_2", "effect_3", "curse_1", "curse_2", "curse_3")
+SLOT_COUNT = 6
+EMPTY_RELIC_KEY = (0,) + (EMPTY_EFFECT,) * SLOT_COUNT  # Empty slot in the export format
+
+
+class ShareCodeError(ValueError):
+    pass
+
+
+def _write_varint(out: bytearray, value: int):
+    if value < 0:
+        raise ShareCodeError(f"Negative value can't be encoded: {value}")
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def varint(self) -> int:
+        result = 0
+        shift = 0
+        data = self.data
+        while True:
+            if self.pos >= len(data):
+                raise ShareCodeError("Share code is truncated")
+            byte = data[self.pos]
+            self.pos += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+            if shift > 63:
+                raise ShareCodeError("Share code has an invalid number")
+
+    def varints(self, count: int) -> bytes | list[int]:
+        # Fast path: slot refs are single bytes while the relic table has < 128 entries
+        chunk = self.data[self.pos:self.pos + count]
+        if len(chunk) == count and max(chunk, default=0) < 0x80:
+            self.pos += count
+            return chunk
+        return [self.varint() for _ in range(count)]
+
+    def raw(self, size: int) -> bytes:
+        if self.pos + size > len(self.data):
+            raise ShareCodeError("Share code is truncated")
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += size
+        return chunk
+
+
+def relic_key(relic: dict) -> tuple:
+    return (relic["relic_id"],) + tuple(relic[k] for k in EFFECT_KEYS)
+
+
+def _relic_dict(key: tuple) -> dict:
+    relic = {"relic_id": key[0]}
+    relic.update(zip(EFFECT_KEYS, key[1:]))
+    return relic
+
+
+# ---------- Relic table ----------
+def _write_relic_table(out: bytearray, keys: list[tuple]):
+    _write_varint(out, len(keys))
+    prev_id = 0
+    for key in keys:
+        _write_varint(out, key[0] - prev_id)
+        prev_id = key[0]
+        for effect in key[1:]:
+            _write_varint(out, (effect + 1) & 0xFFFFFFFF)
+
+
+def _read_relic_table(reader: _Reader) -> list[tuple]:
+    keys = []
+    relic_id = 0
+    for _ in range(reader.varint()):
+        relic_id += reader.varint()
+        keys.append((relic_id,) + tuple((reader.varint() - 1) & 0xFFFFFFFF for _ in range(SLOT_COUNT)))
+    return keys
+
+
+def _build_relic_table(relics) -> tuple[list[tuple], dict[tuple, int]]:
+    """
+    Sorted unique relic keys (sorting keeps relic_id deltas small) and key -> slot ref.
+    """
+    keys = sorted({relic_key(r) for r in relics} - {EMPTY_RELIC_KEY})
+    return keys, {key: i + 1 for i, key in enumerate(keys)}
+
+
+# ---------- Framing ----------
+def _frame(kind: int, payload: bytearray, alphabet: str) -> str:
+    if alphabet not in TEXT_PREFIXES:
+        raise ShareCodeError(f"Unknown alphabet: {alphabet}")
+    data = bytearray((FORMAT_VERSION, kind))
+    data += payload
+    data += zlib.crc32(data).to_bytes(4, "little")
+    if alphabet == "base32":
+        text = base64.b32encode(bytes(data)).decode("ascii")
+    else:
+        text = base64.urlsafe_b64encode(bytes(data)).decode("ascii")
+    return TEXT_PREFIXES[alphabet] + text.rstrip("=")
+
+
+def _unframe(code: str) -> tuple[int, _Reader]:
+    code = "".join(code.split())
+    for alphabet, prefix in TEXT_PREFIXES.items():
+        if code.upper().startswith(prefix):
+            text = code[len(prefix):]
+            break
+    else:
+        raise ShareCodeError("Not a share code")
+    try:
+        if alphabet == "base32":
+            data = base64.b32decode(text.upper() + "=" * (-len(text) % 8))
+        else:
+            data = base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+    except (binascii.Error, ValueError):
+        raise ShareCodeError("Share code is damaged")
+    if len(data) < 6:
+        raise ShareCodeError("Share code is truncated")
+    body, checksum = data[:-4], int.from_bytes(data[-4:], "little")
+    if zlib.crc32(body) != checksum:
+        raise ShareCodeError("Share code checksum mismatch, it was changed or cut off")
+    if body[0] != FORMAT_VERSION:
+        raise ShareCodeError(f"Unsupported share code version: {body[0]}")
+    reader = _Reader(body)
+    reader.pos = 2
+    return body[1], reader
+
+
+def code_kind(code: str) -> int:
+    """
+    :return: KIND_LOADOUTS or KIND_RELICS.
+    """
+    return _unframe(code)[0]
+
+
+# ---------- Loadouts ----------
+def _write_slots(out: bytearray, relics: list[dict], ref_of: dict[tuple, int]):
+    if len(relics) != SLOT_COUNT:
+        raise ShareCodeError(f"Expected {SLOT_COUNT} relic slots, got {len(relics)}")
+    for r in relics:
+        _write_varint(out, ref_of.get(relic_key(r), 0))
+
+
+def encode_loadouts(loadouts: list[dict], alphabet: str = "base64") -> str:
+    """
+    Encode hero loadouts in the HeroLoadout.get_export_data format.
+        Relics shared by several heroes are stored once.
+    """
+    all_relics = [r for data in loadouts
+                  for record in data["vessels"] + data["presets"] for r in record["relics"]]
+    keys, ref_of = _build_relic_table(all_relics)
+    out = bytearray()
+    _write_relic_table(out, keys)
+    _write_varint(out, len(loadouts))
+    for data in loadouts:
+        _write_varint(out, data["hero_type"])
+        _write_varint(out, data["cur_vessel_id"])
+        _write_varint(out, len(data["vessels"]))
+        for vessel in data["vessels"]:
+            _write_varint(out, vessel["vessel_id"])
+            _write_slots(out, vessel["relics"], ref_of)
+        _write_varint(out, len(data["presets"]))
+        for preset in data["presets"]:
+            name = preset["name"].encode("utf-8")
+            _write_varint(out, len(name))
+            out += name
+            _write_varint(out, preset["vessel_id"])
+            _write_slots(out, preset["relics"], ref_of)
+    return _frame(KIND_LOADOUTS, out, alphabet)
+
+
+def _read_slots(reader: _Reader, templates: list[dict], needed: dict[int, None]) -> list[dict]:
+    refs = reader.varints(SLOT_COUNT)
+    try:
+        relics = [templates[ref] for ref in refs]
+    except IndexError:
+        raise ShareCodeError("Share code references an unknown relic")
+    for ref in refs:
+        if ref:
+            needed.setdefault(ref, None)
+    return relics
+
+
+def decode_loadouts(code: str) -> list[dict]:
+    """
+    Decode a loadout share code into HeroLoadout.get_export_data dicts,
+    ready for LoadoutHandler.import_loadouts.
+        Slots holding the same relic share one dict, treat the result as read-only.
+    """
+    kind, reader = _unframe(code)
+    if kind != KIND_LOADOUTS:
+        raise ShareCodeError("Share code holds relics, not loadouts")
+    # Slot ref -> relic dict, copied per slot
+    templates = [_relic_dict(key) for key in [EMPTY_RELIC_KEY] + _read_relic_table(reader)]
+    loadouts = []
+    for _ in range(reader.varint()):
+        needed: dict[int, None] = {}  # Ordered set of refs, in order of first use like the JSON export
+        data = {"hero_type": reader.varint(), "cur_vessel_id": reader.varint(), "vessels": [], "presets": []}
+        for _ in range(reader.varint()):
+            vessel_id = reader.varint()
+            data["vessels"].append({"vessel_id": vessel_id, "relics": _read_slots(reader, templates, needed)})
+        for _ in range(reader.varint()):
+            name = reader.raw(reader.varint()).decode("utf-8", errors="replace")
+            vessel_id = reader.varint()
+            data["presets"].append({"name": name, "vessel_id": vessel_id,
+                                    "relics": _read_slots(reader, templates, needed)})
+        data["all_needed_relics"] = [templates[ref].copy() for ref in needed]
+        loadouts.append(data)
+    return loadouts
+
+
+# ---------- Relic bundles ----------
+def encode_relics(relics: list[dict], alphabet: str = "base64") -> str:
+    """
+    Encode relic infos ({"relic_id", "effect_1"...,"curse_3"}). Duplicates are stored once.
+    """
+    keys, _ = _build_relic_table(relics)
+    out = bytearray()
+    _write_relic_table(out, keys)
+    return _frame(KIND_RELICS, out, alphabet)
+
+
+def decode_relics(code: str) -> list[dict]:
+    kind, reader = _unframe(code)
+    if kind != KIND_RELICS:
+        raise ShareCodeError("Share code holds loadouts, not relics")
+    return [_relic_dict(key) for key in _read_relic_table(reader)]
@@ -1,13 +1,17 @@
 import datetime
 import os
-import struct
-import re
-from copy import deepcopy
+from dataclasses import dataclass, replace
 import orjson
 import logging
+from typing import NamedTuple
 from source_data_handler import SourceDataHandler
 from relic_checker import RelicChecker
 from inventory_handler import InventoryHandler, ItemEntry
+from save_buffer import SaveBuffer
+from edit_journal import EditJournal, journaled
+from save_schema import HERO_LOADOUT, HERO_COUNT, HERO_VESSEL_SLOTS, VESSEL, PRESET
+from loadout_optimizer import LoadoutOptimizer, OptimizeResult
+import share_code
 import globals
 from globals import ITEM_TYPE_RELIC, COLOR_MAP, get_now_timestamp, UNIQUENESS_IDS
 
@@ -16,59 +20,266 @@ logger = logging.getLogger(__name__)
 
 
 def is_vessel_available(vessel_id: int):
-    try:
-        game_data = SourceDataHandler()  # SourceDataHandler is a singleton Class
-        inventory = InventoryHandler()  # InventoryHandler is a singleton Class
-        _vessel_goods_id = game_data.vessels[vessel_id].goods_id
-        return _vessel_goods_id in inventory.vessels and inventory.unlock_manager.is_vessel_unlocked(vessel_id)
-    except KeyError:
-        return False
+    # Owned vessel goods are part of the unlock state, see UnlockStateManager
+    return InventoryHandler().unlock_manager.is_vessel_unlocked(vessel_id)
+
+
+@dataclass(slots=True, frozen=True)
+class VesselEntry:
+    """
+    One vessel of a hero loadout. Immutable, edits swap in a copy (see HeroLoadout.set_vessel).
+    """
+    vessel_id: int
+    relics: tuple[int, ...]  # 6 ga_handles, 0 for empty slots
+    offset: int = -1  # Record start in globals.data
+
+    @property
+    def vessel_id_offset(self):
+        return self.offset + VESSEL.offsets["vessel_id"]
+
+    @property
+    def relics_offset(self):
+        return self.offset + VESSEL.offsets["relics"]
+
+    def with_relic(self, relic_index: int, ga_handle: int) -> "VesselEntry":
+        relics = list(self.relics)
+        relics[relic_index] = ga_handle
+        return replace(self, relics=tuple(relics))
+
+
+@dataclass(slots=True, frozen=True)
+class PresetEntry:
+    """
+    One custom preset. Immutable, edits swap in a copy (see HeroLoadout.set_preset).
+        index is the position among all presets of the save, counter decreases to 0 for the newest one.
+    """
+    hero_type: int
+    index: int
+    name: str
+    vessel_id: int
+    relics: tuple[int, ...]
+    counter: int
+    timestamp: int
+    offset: int = -1  # Record start in globals.data
+
+    def field_offset(self, field_name: str) -> int:
+        return self.offset + PRESET.offsets[field_name]
+
+    def with_relic(self, relic_index: int, ga_handle: int) -> "PresetEntry":
+        relics = list(self.relics)
+        relics[relic_index] = ga_handle
+        return replace(self, relics=tuple(relics))
+
+
+class RelicRef(NamedTuple):
+    hero_type: int
+    kind: str  # RelicRefIndex.VESSEL or RelicRefIndex.PRESET
+    key: int  # vessel_id for vessels, preset index for presets
+    slot: int  # 0-5
+
+
+class RelicRefIndex:
+    """
+    Reverse index of relic ga_handle -> every vessel/preset slot that holds it.
+        Built on parse, then kept current by HeroLoadout.set_vessel / set_preset / add_preset,
+        so "used in" lookups and reference cleanup cost O(refs) instead of a scan of all loadouts.
+    """
+    VESSEL = "vessel"
+    PRESET = "preset"
+
+    def __init__(self):
+        self._refs: dict[int, list[RelicRef]] = {}
+
+    @classmethod
+    def build(cls, heroes: dict[int, "HeroLoadout"]):
+        index = cls()
+        for hero in heroes.values():
+            for v in hero.vessels:
+                index.update_record(hero.hero_type, cls.VESSEL, v.vessel_id, (), v.relics)
+            for p in hero.presets:
+                index.update_record(hero.hero_type, cls.PRESET, p.index, (), p.relics)
+        return index
+
+    def refs_of(self, ga_handle: int) -> list[RelicRef]:
+        return list(self._refs.get(ga_handle, ()))
+
+    def is_used(self, ga_handle: int) -> bool:
+        return ga_handle in self._refs
+
+    def update_record(self, hero_type: int, kind: str, key: int, old_relics, new_relics):
+        """
+        Apply the slot changes of one vessel or preset record.
+        """
+        for slot in range(max(len(old_relics), len(new_relics))):
+            old_ga = old_relics[slot] if slot < len(old_relics) else 0
+            new_ga = new_relics[slot] if slot < len(new_relics) else 0
+            if old_ga == new_ga:
+                continue
+            ref = RelicRef(hero_type, kind, key, slot)
+            if old_ga != 0:
+                refs = self._refs.get(old_ga)
+                if refs is not None and ref in refs:
+                    refs.remove(ref)
+                    if not refs:
+                        del self._refs[old_ga]
+            if new_ga != 0:
+                self._refs.setdefault(new_ga, []).append(ref)
 
 
 class HeroLoadout:
-    def __init__(self, hero_type, cur_preset_idx, cur_vessel_id, vessels, offsets):
+    # Preset fields written by VesselModifier, in record order
+    PRESET_FIELDS = ("header", "hero_type", "counter", "name", "vessel_id", "relics", "timestamp")
+
+    def __init__(self, hero_type, cur_preset_idx, cur_vessel_id, vessels: list[VesselEntry], offset: int):
         self.hero_type = hero_type
-        self.cur_preset_idx = cur_preset_idx
-        self.cur_vessel_id = cur_vessel_id
-        # vessel list[dict]， keys: vessel_id, relics, offsets:dict
-        #   offsets store offests for vessel_id and relics, keys: vessel_id, relics
+        self._cur_preset_idx = cur_preset_idx
+        self._cur_vessel_id = cur_vessel_id
         self.vessels = vessels
-        self.presets = []
-        # Stores offsets for hero-level fields
-        self.offsets = offsets
+        self.presets: list[PresetEntry] = []
+        # Record start of the hero-level fields, see HERO_LOADOUT
+        self.offset = offset
+        # vessel_id -> position in vessels, preset index -> position in presets
+        self._vessel_pos: dict[int, int] = {}
+        self._preset_pos: dict[int, int] = {}
+        # (vessel_id, relics) -> index of the first preset with that combination
+        self._preset_by_combo: dict[tuple[int, tuple[int, ...]], int] = {}
+        self.reindex_vessels()
+        # Shared reverse index of all heroes, attached by VesselParser after parsing
+        self.refs: RelicRefIndex = None
+        # Changes not yet written to globals.data, see VesselModifier
+        self.dirty_fields: set[str] = set()  # Hero-level field names
+        self.dirty_vessels: set[int] = set()  # vessel_id
+        self.dirty_presets: dict[int, set[str]] = {}  # preset index -> field names
+
+    @property
+    def cur_preset_idx(self):
+        return self._cur_preset_idx
+
+    @cur_preset_idx.setter
+    def cur_preset_idx(self, value):
+        if value != self._cur_preset_idx:
+            self._cur_preset_idx = value
+            self.dirty_fields.add("cur_preset_idx")
+
+    @property
+    def cur_vessel_id(self):
+        return self._cur_vessel_id
+
+    @cur_vessel_id.setter
+    def cur_vessel_id(self, value):
+        if value != self._cur_vessel_id:
+            self._cur_vessel_id = value
+            self.dirty_fields.add("cur_vessel_id")
+
+    @property
+    def is_dirty(self):
+        return bool(self.dirty_fields or self.dirty_vessels or self.dirty_presets)
+
+    def mark_vessel_dirty(self, vessel_id: int):
+        self.dirty_vessels.add(vessel_id)
+
+    def mark_preset_dirty(self, preset_index: int, *fields: str):
+        """
+        :param fields: Changed preset fields, all of PRESET_FIELDS if none given.
+        """
+        self.dirty_presets.setdefault(preset_index, set()).update(fields or self.PRESET_FIELDS)
+
+    def mark_all_dirty(self):
+        self.dirty_fields.update(("cur_preset_idx", "cur_vessel_id"))
+        self.dirty_vessels.update(v.vessel_id for v in self.vessels)
+        for p in self.presets:
+            self.mark_preset_dirty(p.index)
+
+    def clear_dirty(self):
+        self.dirty_fields.clear()
+        self.dirty_vessels.clear()
+        self.dirty_presets.clear()
+
+    def field_offset(self, field_name: str) -> int:
+        return self.offset + HERO_LOADOUT.offsets[field_name]
+
+    # ---------- Indexed access ----------
+    def reindex_vessels(self):
+        self._vessel_pos = {v.vessel_id: i for i, v in enumerate(self.vessels)}
+
+    def reindex_presets(self):
+        self._preset_pos = {p.index: i for i, p in enumerate(self.presets)}
+        self._preset_by_combo = {}
+        for p in self.presets:
+            self._preset_by_combo.setdefault((p.vessel_id, p.relics), p.index)
+
+    def get_vessel(self, vessel_id: int) -> VesselEntry:
+        pos = self._vessel_pos.get(vessel_id)
+        return None if pos is None else self.vessels[pos]
+
+    def vessel_index(self, vessel_id: int) -> int:
+        """
+        :return: Position of the vessel in this hero's vessel list, -1 if not owned by the hero.
+        """
+        return self._vessel_pos.get(vessel_id, -1)
+
+    def set_vessel(self, vessel: VesselEntry):
+        """
+        Replace the vessel with the same vessel_id and flag it for writing.
+        """
+        pos = self._vessel_pos[vessel.vessel_id]
+        if self.refs is not None:
+            self.refs.update_record(self.hero_type, RelicRefIndex.VESSEL, vessel.vessel_id,
+                                    self.vessels[pos].relics, vessel.relics)
+        self.vessels[pos] = vessel
+        self.mark_vessel_dirty(vessel.vessel_id)
+
+    def get_preset(self, preset_index: int) -> PresetEntry:
+        pos = self._preset_pos.get(preset_index)
+        return None if pos is None else self.presets[pos]
+
+    def find_preset(self, vessel_id: int, relics) -> int:
+        """
+        :return: Index of the first preset of this hero with exactly this vessel and relics, -1 if none.
+        """
+        return self._preset_by_combo.get((vessel_id, tuple(relics)), -1)
+
+    def set_preset(self, preset: PresetEntry, *fields: str):
+        """
+        Replace the preset with the same index and flag the changed fields for writing.
+        """
+        pos = self._preset_pos[preset.index]
+        old = self.presets[pos]
+        self.presets[pos] = preset
+        if self.refs is not None:
+            self.refs.update_record(self.hero_type, RelicRefIndex.PRESET, preset.index, old.relics, preset.relics)
+        old_key = (old.vessel_id, old.relics)
+        new_key = (preset.vessel_id, preset.relics)
+        if old_key != new_key:
+            if self._preset_by_combo.get(old_key) == old.index:
+                # Hand the combination over to a later duplicate, if any
+                del self._preset_by_combo[old_key]
+                for p in self.presets[pos + 1:]:
+                    if (p.vessel_id, p.relics) == old_key:
+                        self._preset_by_combo[old_key] = p.index
+                        break
+            if self._preset_by_combo.get(new_key, preset.index + 1) > preset.index:
+                self._preset_by_combo[new_key] = preset.index
+        self.mark_preset_dirty(preset.index, *fields)
 
-    def add_preset(self, hero_type, index, name, vessel_id, relics, offsets, counter, timestamp):
+    def add_preset(self, preset: PresetEntry):
         inventory = InventoryHandler()  # InventoryHandler is a singleton Class
-        self.presets.append({
-            "hero_type": hero_type,
-            "index": index,
-            "name": name,
-            "vessel_id": vessel_id,
-            "relics": relics,
-            "offsets": offsets,
-            "counter": counter,
-            "timestamp": timestamp
-        })
-        for r in relics:
+        self._preset_pos[preset.index] = len(self.presets)
+        self.presets.append(preset)
+        self._preset_by_combo.setdefault((preset.vessel_id, preset.relics), preset.index)
+        if self.refs is not None:
+            self.refs.update_record(self.hero_type, RelicRefIndex.PRESET, preset.index, (), preset.relics)
+        for r in preset.relics:
             if (r & 0xF0000000) == ITEM_TYPE_RELIC and r != 0:
-                inventory.equip_relic(r, hero_type)
+                inventory.equip_relic(r, preset.hero_type)
 
     def auto_adjust_cur_equipment(self):
         """
         Automatically adjust the current preset index based on the current vessel's relics.
         """
-        _new_preset_idx = 0xFF
-        _vessel_idx = 0
-        for idx, v in enumerate(self.vessels):
-            if v["vessel_id"] == self.cur_vessel_id:
-                _vessel_idx = idx
-                break
-
-        for preset in self.presets:
-            if preset["vessel_id"] == self.cur_vessel_id and preset['relics'] == self.vessels[_vessel_idx]["relics"]:
-                _new_preset_idx = preset["index"]
-                break
-        self.cur_preset_idx = _new_preset_idx
+        _vessel = self.get_vessel(self.cur_vessel_id) or self.vessels[0]
+        _new_preset_idx = self.find_preset(self.cur_vessel_id, _vessel.relics)
+        self.cur_preset_idx = 0xFF if _new_preset_idx < 0 else _new_preset_idx
 
     def get_export_data(self):
         """
@@ -92,7 +303,7 @@ class HeroLoadout:
         _all_needed_relics_ga = set()
         for v in self.vessels:
             _relics = []
-            for r in v["relics"]:
+            for r in v.relics:
                 if r != 0 and (r & 0xF0000000) == ITEM_TYPE_RELIC:
                     _relic = {
                         "relic_id": inventory.relics[r].state.real_item_id,
@@ -118,13 +329,13 @@ class HeroLoadout:
                         "curse_3": 0xffffffff
                     })
             _vessels.append({
-                "vessel_id": v["vessel_id"],
+                "vessel_id": v.vessel_id,
                 "relics": _relics
             })
 
         for p in self.presets:
             _relics = []
-            for r in p["relics"]:
+            for r in p.relics:
                 if r != 0 and (r & 0xF0000000) == ITEM_TYPE_RELIC:
                     _relic = {
                         "relic_id": inventory.relics[r].state.real_item_id,
@@ -150,8 +361,8 @@ class HeroLoadout:
                         "curse_3": 0xffffffff
                     })
             _presets.append({
-                "name": p["name"],
-                "vessel_id": p["vessel_id"],
+                "name": p.name,
+                "vessel_id": p.vessel_id,
                 "relics": _relics
             })
 
@@ -193,27 +404,32 @@ class HeroLoadout:
             if idx not in vessel_indices:
                 result_msgs.append(f"{game_data.vessels[im_v['vessel_id']].name} skipped.")
                 continue
-            for v in self.vessels:
-                if v["vessel_id"] == im_v["vessel_id"]:
-                    if not is_vessel_available(v["vessel_id"]):
-                        result_msgs.append(f"{game_data.vessels[v['vessel_id']].name} import failed. Vessel is not unlocked.")
-                        break
-                    for r in v["relics"]:
-                        if r != 0:
-                            inventory.unequip_relic(r, self.hero_type)
-                    v["relics"] = im_v["relics"]
-                    for r in v["relics"]:
-                        if r != 0:
-                            inventory.equip_relic(r, self.hero_type)
-                    result_msgs.append(f"{game_data.vessels[v['vessel_id']].name} imported successfully.")
-                    break
-            else:
+            v = self.get_vessel(im_v["vessel_id"])
+            if v is None:
                 result_msgs.append(f"Vessel {im_v['vessel_id']} not found in hero loadout.")
+                continue
+            if not is_vessel_available(v.vessel_id):
+                result_msgs.append(f"{game_data.vessels[v.vessel_id].name} import failed. Vessel is not unlocked.")
+                continue
+            for r in v.relics:
+                if r != 0:
+                    inventory.unequip_relic(r, self.hero_type)
+            v = replace(v, relics=tuple(im_v["relics"]))
+            self.set_vessel(v)
+            for r in v.relics:
+                if r != 0:
+                    inventory.equip_relic(r, self.hero_type)
+            result_msgs.append(f"{game_data.vessels[v.vessel_id].name} imported successfully.")
         self.auto_adjust_cur_equipment()
         return result_msgs
 
 
 class VesselParser:
+    # Vessel block header (magic + marker), base_offset points right after it
+    BLOCK_MAGIC = bytes.fromhex("C2000300002C000003000A0004004600") + bytes.fromhex("64000000")
+    # Bytes searched around the expected position before falling back to a full scan
+    SEARCH_WINDOW = 0x4000
+
     # Items type
     ITEM_TYPE_EMPTY = 0x00000000
     ITEM_TYPE_WEAPON = 0x80000000
@@ -225,81 +441,98 @@ class VesselParser:
         self.inventory = InventoryHandler()  # Singleton
         self.heroes: dict[int, HeroLoadout] = {}
         self.relic_ga_hero_map = {}
+        self.relic_refs = RelicRefIndex()
         self.base_offset = None
+        # (base_offset, Item State region end) of the last located block
+        self._anchor: tuple[int, int] = None
+
+    def _state_region_end(self):
+        scan = self.inventory.state_scan
+        return scan.end_offset if scan is not None else None
+
+    def locate_block(self):
+        """
+        Find base_offset of the vessel block.
+            The block sits after the variable-size Item State region, so the last known
+            offset is shifted by how much that region grew or shrank, then verified in O(1).
+            Falls back to a bounded window around it, then to a full search.
+
+        :return: base_offset, or None if the block wasn't found.
+        """
+        data = globals.data
+        magic = self.BLOCK_MAGIC
+        base_offset = None
+        state_end = self._state_region_end()
+        if self._anchor is not None:
+            expected, anchor_state_end = self._anchor
+            if state_end is not None and anchor_state_end is not None:
+                expected += state_end - anchor_state_end
+            magic_start = expected - len(magic)
+            if magic_start >= 0 and data[magic_start:expected] == magic:
+                base_offset = expected
+            else:
+                window_start = max(0, magic_start - self.SEARCH_WINDOW)
+                found = data.find(magic, window_start, expected + self.SEARCH_WINDOW)
+                if found >= 0:
+                    logger.info("Vessel block moved, found in search window.")
+                    base_offset = found + len(magic)
+        if base_offset is None:
+            found = data.find(magic)
+            if found < 0:
+                self._anchor = None
+                return None
+            base_offset = found + len(magic)
+        self._anchor = (base_offset, state_end)
+        return base_offset
 
     def parse(self):
         heroes = {}
         self.relic_ga_hero_map = {}
         self.inventory.reset_equipped_records()
         self.base_offset = None
-        magic_pattern = re.escape(bytes.fromhex("C2000300002C000003000A0004004600"))
-        marker = re.escape(bytes.fromhex("64000000"))
 
-        match = re.search(magic_pattern + marker, globals.data)
-        if not match:
+        cursor = self.locate_block()
+        if cursor is None:
             print("[Error] Magic pattern not found.")
             return
 
-        cursor = match.start()
-
         # Record the start of the entire block if needed
-        cursor = match.end()
         self.base_offset = cursor
 
         # 1. Hero ID Section (Fixed 10 heroes)
         last_hero_type = None
-        for _ in range(10):
+        for hero in HERO_LOADOUT.iter_unpack(globals.data, cursor, HERO_COUNT):
             # Record hero-level offsets
             h_start = cursor
-            hero_type, cur_idx = struct.unpack_from("<BB", globals.data, cursor)
-            hero_type = int(hero_type)
-            cur_idx = int(cur_idx)
-
-            hero_offsets = {
-                "base": h_start,
-                "cur_preset_idx": h_start + 1,
-                "cur_vessel_id": h_start + 4
-            }
-            cursor += 4  # Skip ID, Idx, Padding
-
-            cur_v_id = struct.unpack_from("<I", globals.data, cursor)[0]
-            cursor += 4
+            hero_type = int(hero.hero_type)
 
             universal_vessels = []
-            for _ in range(4):
-                v_start = cursor
-                v_id = struct.unpack_from("<I", globals.data, cursor)[0]
-                cursor += 4
-                relics = list(struct.unpack_from("<6I", globals.data, cursor))
+            for i in range(HERO_VESSEL_SLOTS):
+                v_start = h_start + HERO_LOADOUT.offsets["vessels"] + i * VESSEL.size
+                v_values = hero.vessels[i * 7:(i + 1) * 7]
+                relics = v_values[1:]
                 for r in relics:
                     if (r & 0xF0000000) == self.ITEM_TYPE_RELIC and r != 0:
                         if r not in self.relic_ga_hero_map:
                             self.relic_ga_hero_map[r] = set()
                         self.relic_ga_hero_map[r].add(hero_type)
                         self.inventory.equip_relic(r, hero_type)
-                universal_vessels.append({
-                    "vessel_id": v_id,
-                    "relics": relics,
-                    "offsets": {
-                        "vessel_id": v_start,
-                        "relics": v_start + 4
-                    }
-                })
-                cursor += 24
+                universal_vessels.append(VesselEntry(v_values[0], relics, v_start))
 
-            heroes[hero_type] = HeroLoadout(hero_type, cur_idx, cur_v_id, universal_vessels, hero_offsets)
+            heroes[hero_type] = HeroLoadout(hero_type, int(hero.cur_preset_idx), hero.cur_vessel_id,
+                                            universal_vessels, h_start)
             last_hero_type = hero_type
+            cursor += HERO_LOADOUT.size
 
-        # 2. Hero Vessels
-        while cursor < len(globals.data):
+        # 2. Hero Vessels, terminated by a zero vessel id (4 bytes)
+        for vessel in VESSEL.iter_unpack(globals.data, cursor):
             v_start = cursor
-            v_id = struct.unpack_from("<I", globals.data, cursor)[0]
+            v_id = vessel.vessel_id
             if v_id == 0:
                 cursor += 4
                 break
-
-            cursor += 4
-            relics = list(struct.unpack_from("<6I", globals.data, cursor))
+            cursor += VESSEL.size
+            relics = vessel.relics
 
             v_meta = self.game_data.vessels.get(v_id)
             target_hero = v_meta.hero_type if v_meta else None
@@ -313,52 +546,24 @@ class VesselParser:
                     self.inventory.equip_relic(r, assigned_id)
 
             if assigned_id in heroes:
-                heroes[assigned_id].vessels.append({
-                    "vessel_id": v_id,
-                    "relics": relics,
-                    "offsets": {
-                        "vessel_id": v_start,
-                        "relics": v_start + 4
-                    }
-                })
-            cursor += 24
+                heroes[assigned_id].vessels.append(VesselEntry(v_id, relics, v_start))
         # Sort hero loadout vessels by vessel id
         for h_type in heroes:
-            heroes[h_type].vessels.sort(key=lambda x: x["vessel_id"])
+            heroes[h_type].vessels.sort(key=lambda x: x.vessel_id)
+            heroes[h_type].reindex_vessels()
 
         # 3. Custom Presets Section
         preset_index = 0
-        while cursor < len(globals.data):
+        for preset in PRESET.iter_unpack(globals.data, cursor):
             p_start = cursor
-            header = struct.unpack_from("<B", globals.data, cursor)[0]
-            if header != 0x01:
+            if preset.header != 0x01:
                 break
+            cursor += PRESET.size
 
-            # Offsets for custom preset fields
-            p_offsets = {
-                "base": p_start,
-                "hero_type": p_start + 1,
-                "counter": p_start + 3,
-                "name": p_start + 4,
-                "vessel_id": p_start + 44,  # 4 + 36 + 4 padding
-                "relics": p_start + 48,
-                "timestamp": p_start + 72  # not sure
-            }
-
-            cursor += 1
-            h_id = int(struct.unpack_from("<H", globals.data, cursor)[0])
-            cursor += 2
-            counter_val = struct.unpack_from("<B", globals.data, cursor)[0]
-            cursor += 1
-
-            name = globals.data[cursor:cursor + 36].decode('utf-16', errors='ignore').strip('\x00')
-            cursor += 36 + 4  # Name + Padding
-
-            v_id = struct.unpack_from("<I", globals.data, cursor)[0]
-            cursor += 4
-
-            relics = list(struct.unpack_from("<6I", globals.data, cursor))
-            cursor += 24  # Relics
+            h_id = int(preset.hero_type)
+            counter_val = preset.counter
+            name = preset.name.decode('utf-16', errors='ignore').strip('\x00')
+            relics = preset.relics
             for r in relics:
                 if (r & 0xF0000000) == self.ITEM_TYPE_RELIC and r != 0:
                     if r not in self.relic_ga_hero_map:
@@ -366,16 +571,17 @@ class VesselParser:
                     self.relic_ga_hero_map[r].add(h_id)
                     self.inventory.equip_relic(r, h_id)
 
-            timestamp = struct.unpack_from("<Q", globals.data, cursor)[0]  # not sure
-            cursor += 8
-
             if h_id in heroes:
-                heroes[h_id].add_preset(h_id, preset_index, name, v_id, relics, p_offsets, counter_val, timestamp)
+                heroes[h_id].add_preset(PresetEntry(h_id, preset_index, name, preset.vessel_id, relics,
+                                                    counter_val, preset.timestamp, p_start))
 
             preset_index += 1
 
             if counter_val == 0:
                 break
+        self.relic_refs = RelicRefIndex.build(heroes)
+        for hero in heroes.values():
+            hero.refs = self.relic_refs
         self.heroes = heroes
 
     def display_results(self):
@@ -389,33 +595,30 @@ class VesselParser:
         # Sort by hero_type for a cleaner list
         for h_id in sorted(self.heroes.keys()):
             loadout = self.heroes[h_id]
-            h_off = loadout.offsets
 
             print(f"\n[Hero ID: {h_id}]")
-            print(f"  - Base Offset: 0x{h_off['base']:06X}")
-            print(f"  - Current Preset Index: {loadout.cur_preset_idx if loadout.cur_preset_idx != 255 else 'None'} (At: 0x{h_off['cur_preset_idx']:06X})")
-            print(f"  - Current Vessel ID: {loadout.cur_vessel_id} (At: 0x{h_off['cur_vessel_id']:06X})")
+            print(f"  - Base Offset: 0x{loadout.offset:06X}")
+            print(f"  - Current Preset Index: {loadout.cur_preset_idx if loadout.cur_preset_idx != 255 else 'None'} (At: 0x{loadout.field_offset('cur_preset_idx'):06X})")
+            print(f"  - Current Vessel ID: {loadout.cur_vessel_id} (At: 0x{loadout.field_offset('cur_vessel_id'):06X})")
 
             # Vessels Section
             print(f"  - Vessels ({len(loadout.vessels)} total):")
             for i, v in enumerate(loadout.vessels):
-                v_off = v['offsets']
-                relics_str = ", ".join([f"0x{r:08X}" for r in v['relics']])
-                print(f"    [{i:02d}] ID: {v['vessel_id']} (At: 0x{v_off['vessel_id']:06X})")
-                print(f"         Relics: [{relics_str}] (At: 0x{v_off['relics']:06X})")
+                relics_str = ", ".join([f"0x{r:08X}" for r in v.relics])
+                print(f"    [{i:02d}] ID: {v.vessel_id} (At: 0x{v.vessel_id_offset:06X})")
+                print(f"         Relics: [{relics_str}] (At: 0x{v.relics_offset:06X})")
 
             # Custom Presets Section
             if loadout.presets:
                 print(f"  - Custom Presets ({len(loadout.presets)} total):")
                 for p in loadout.presets:
-                    p_off = p['offsets']
-                    relics_str = ", ".join([f"0x{r:08X}" for r in p['relics']])
-                    print(f"    * Name: {p['name']:<18} (At: 0x{p_off['name']:06X})")
-                    print(f"      Index: {p['index']:<2}")
-                    print(f"      Counter: {p.get('counter', 'N/A'):>2}      (At: 0x{p_off['counter']:06X})")
-                    print(f"      Vessel ID: {p['vessel_id']:<8} (At: 0x{p_off['vessel_id']:06X})")
-                    print(f"      Relics: [{relics_str}] (At: 0x{p_off['relics']:06X})")
-                    print(f"      Timestamp: {p.get('timestamp', 'N/A')} (At: 0x{p_off['timestamp']:06X})")
+                    relics_str = ", ".join([f"0x{r:08X}" for r in p.relics])
+                    print(f"    * Name: {p.name:<18} (At: 0x{p.field_offset('name'):06X})")
+                    print(f"      Index: {p.index:<2}")
+                    print(f"      Counter: {p.counter:>2}      (At: 0x{p.field_offset('counter'):06X})")
+                    print(f"      Vessel ID: {p.vessel_id:<8} (At: 0x{p.field_offset('vessel_id'):06X})")
+                    print(f"      Relics: [{relics_str}] (At: 0x{p.field_offset('relics'):06X})")
+                    print(f"      Timestamp: {p.timestamp} (At: 0x{p.field_offset('timestamp'):06X})")
             else:
                 print("  - No Custom Presets found.")
 
@@ -434,47 +637,64 @@ class VesselParser:
 class VesselModifier:
     def __init__(self):
         """
-        Initialize the modifier with binary data.
-        :param data: The original binary data from the save file.
+        Initialize the modifier. Writes go to globals.data through SaveBuffer.
         """
-        pass
+        self.save_buffer = SaveBuffer()
 
     def update_hero_loadout(self, hero_loadout: HeroLoadout):
         """
-        Update all fields of a specific hero loadout based on its offsets.
+        Write the changed fields of a specific hero loadout based on its offsets.
+            Only fields flagged dirty on the HeroLoadout are packed, then the flags are cleared.
         """
+        if not hero_loadout.is_dirty:
+            return
         # 1. Update Hero-level fields
-        struct.pack_into("<B", globals.data, hero_loadout.offsets["cur_preset_idx"], hero_loadout.cur_preset_idx)
-        struct.pack_into("<I", globals.data, hero_loadout.offsets["cur_vessel_id"], hero_loadout.cur_vessel_id)
+        for field_name in hero_loadout.dirty_fields:
+            self.save_buffer.pack_into(HERO_LOADOUT.fields[field_name], hero_loadout.field_offset(field_name),
+                                       getattr(hero_loadout, field_name))
 
         # 2. Update Vessels (including Global sequences assigned to this hero)
-        for v in hero_loadout.vessels:
-            struct.pack_into("<I", globals.data, v["offsets"]["vessel_id"], v["vessel_id"])
-            struct.pack_into("<6I", globals.data, v["offsets"]["relics"], *v["relics"])
+        if hero_loadout.dirty_vessels:
+            for vessel_id in hero_loadout.dirty_vessels:
+                v = hero_loadout.get_vessel(vessel_id)
+                self.save_buffer.pack_into(VESSEL.fields["vessel_id"], v.vessel_id_offset, v.vessel_id)
+                self.save_buffer.pack_into(VESSEL.fields["relics"], v.relics_offset, *v.relics)
 
         # 3. Update Custom Presets
-        for p in hero_loadout.presets:
-            p_off = p["offsets"]
-            # Make sure header is 0x01 and hero_type is correct
-            struct.pack_into("<B", globals.data, p_off["base"], 0x01)
-            struct.pack_into("<H", globals.data, p_off["hero_type"], p["hero_type"])
-            # Update counter
-            struct.pack_into("<B", globals.data, p_off["counter"], p["counter"])
-
-            # Update Vessel ID and Relics in preset
-            struct.pack_into("<I", globals.data, p_off["vessel_id"], p["vessel_id"])
-            struct.pack_into("<6I", globals.data, p_off["relics"], *p["relics"])
-
-            # Update Name (if modified, ensuring it's 36 bytes UTF-16)
-            name_bytes = p["name"].encode('utf-16le').ljust(36, b'\x00')[:36]
-            globals.data[p_off["name"]:p_off["name"] + 36] = name_bytes
-
-            # Update Timestamp
-            struct.pack_into("<Q", globals.data, p_off["timestamp"], p["timestamp"])
+        if hero_loadout.dirty_presets:
+            for preset_index, fields in hero_loadout.dirty_presets.items():
+                self.update_preset(hero_loadout.get_preset(preset_index), fields)
+        hero_loadout.clear_dirty()
+
+    def update_preset(self, p: PresetEntry, fields=HeroLoadout.PRESET_FIELDS):
+        # Make sure header is 0x01 and hero_type is correct
+        if "header" in fields:
+            self.save_buffer.pack_into(PRESET.fields["header"], p.offset, 0x01)
+        if "hero_type" in fields:
+            self.save_buffer.pack_into(PRESET.fields["hero_type"], p.field_offset("hero_type"), p.hero_type)
+        # Update counter
+        if "counter" in fields:
+            self.save_buffer.pack_into(PRESET.fields["counter"], p.field_offset("counter"), p.counter)
+
+        # Update Name (ensuring it's 36 bytes UTF-16)
+        if "name" in fields:
+            name_size = PRESET.fields["name"].size
+            name_bytes = p.name.encode('utf-16le').ljust(name_size, b'\x00')[:name_size]
+            self.save_buffer.write(p.field_offset("name"), name_bytes)
+
+        # Update Vessel ID and Relics in preset
+        if "vessel_id" in fields:
+            self.save_buffer.pack_into(PRESET.fields["vessel_id"], p.field_offset("vessel_id"), p.vessel_id)
+        if "relics" in fields:
+            self.save_buffer.pack_into(PRESET.fields["relics"], p.field_offset("relics"), *p.relics)
+
+        # Update Timestamp
+        if "timestamp" in fields:
+            self.save_buffer.pack_into(PRESET.fields["timestamp"], p.field_offset("timestamp"), p.timestamp)
 
     def update_all_loadouts(self, heroes: dict):
         """
-        Update all hero loadouts.
+        Write the changes of all hero loadouts in one pass. Clean heroes are skipped.
         """
         for hero_loadout in heroes.values():
             self.update_hero_loadout(hero_loadout)
@@ -484,7 +704,7 @@ class VesselModifier:
         Generic method to set a value at a specific offset.
         :param fmt: struct format string (e.g., '<I', '<B')
         """
-        struct.pack_into(fmt, globals.data, offset, value)
+        self.save_buffer.pack_into(fmt, offset, value)
 
 
 class Validator:
@@ -508,18 +728,18 @@ class Validator:
             if _vessel_info.hero_type != 11 and _vessel_info.hero_type != hero_type:
                 raise ValueError("This vessel is not assigned to this hero")
             else:
-                if vessel_id not in [v["vessel_id"] for v in heroes[hero_type].vessels]:
+                if heroes[hero_type].get_vessel(vessel_id) is None:
                     raise BufferError("Vessel should be assigned to this hero but not found. The Hero Loadout Structure may be corrupted.")
 
             return True
         return False
 
-    def validate_vessel(self, heroes: dict[int, HeroLoadout], hero_type: int, vessel:dict):
+    def validate_vessel(self, heroes: dict[int, HeroLoadout], hero_type: int, vessel: VesselEntry | PresetEntry):
         # Check is vessel assigned to correct hero
-        if self.check_vessel_assignment(heroes, hero_type, vessel["vessel_id"]):
-            _vessel_info = self.game_data.vessels[vessel["vessel_id"]]
+        if self.check_vessel_assignment(heroes, hero_type, vessel.vessel_id):
+            _vessel_info = self.game_data.vessels[vessel.vessel_id]
             # Check whether the relic in each relic slot is valid.
-            for relic_index, relic in enumerate(vessel["relics"]):
+            for relic_index, relic in enumerate(vessel.relics):
                 if relic == 0:
                     # Empty always Valid
                     continue
@@ -545,12 +765,12 @@ class Validator:
                         raise ValueError(f"Color mismatch in relic slot {relic_index+1}.")
                     # Check duplicate relics in vessel
                     if 0 <= relic_index < 2:
-                        for idx, relic_after in enumerate(vessel["relics"][relic_index + 1:3]):
+                        for idx, relic_after in enumerate(vessel.relics[relic_index + 1:3]):
                             r_af_idx = relic_index + 1 + idx
                             if relic_after != 0 and relic == relic_after:
                                 raise ValueError(f"Relic is duplicated with slot: {r_af_idx+1}")
                     if 3 <= relic_index < 5:
-                        for idx, relic_after in enumerate(vessel["relics"][relic_index + 1:]):
+                        for idx, relic_after in enumerate(vessel.relics[relic_index + 1:]):
                             r_af_idx = relic_index + 1 + idx
                             if relic_after != 0 and relic == relic_after:
                                 raise ValueError(f"Relic is duplicated with slot: {r_af_idx+1}")  
@@ -561,18 +781,18 @@ class Validator:
     def heroes_structure_check(self, heroes: dict[int, HeroLoadout]):
         pass
 
-    def validate_preset(self, heroes: dict[int, HeroLoadout], hero_type: int, new_preset: dict):
-        _t_vessel = {"vessel_id": new_preset["vessel_id"], "relics": new_preset['relics']}
-        _relics_set = set(_t_vessel["relics"])
+    def validate_preset(self, heroes: dict[int, HeroLoadout], hero_type: int, new_preset: PresetEntry):
+        _relics_set = set(new_preset.relics)
         _relics_set.discard(0)
         if len(_relics_set) == 0:
             raise ValueError("Preset must contain at least one relic.")
-        self.validate_vessel(heroes, hero_type, _t_vessel)
-        for preset in heroes[hero_type].presets:
-            if preset["index"] == new_preset["index"]:
-                raise ValueError("Preset index duplicated. This shouldn't happen.")
-            if preset["vessel_id"] == new_preset["vessel_id"] and preset["relics"] == new_preset["relics"]:
-                raise ValueError(f"Preset relics combination exists. Preset Name: {preset['name']}")
+        self.validate_vessel(heroes, hero_type, new_preset)
+        hero = heroes[hero_type]
+        if hero.get_preset(new_preset.index) is not None:
+            raise ValueError("Preset index duplicated. This shouldn't happen.")
+        existing_index = hero.find_preset(new_preset.vessel_id, new_preset.relics)
+        if existing_index >= 0:
+            raise ValueError(f"Preset relics combination exists. Preset Name: {hero.get_preset(existing_index).name}")
 
 
 class LoadoutHandler:
@@ -585,6 +805,8 @@ class LoadoutHandler:
 
     _instance = None
     _initialized = False
+    # Parsed state stored by model_cache, see export_model
+    MODEL_FIELDS = ("heroes", "relic_ga_hero_map", "relic_refs", "base_offset", "all_presets")
 
     def __new__(cls, *args, **kwargs):
         if not cls._instance:
@@ -600,7 +822,13 @@ class LoadoutHandler:
         self.parser = VesselParser()
         self.modifier = VesselModifier()
         self.validator = Validator()
+        self.optimizer = LoadoutOptimizer()
         self.all_presets = []
+        # Registered after InventoryHandler, so equip records are rebuilt on top of the reparsed inventory
+        EditJournal().add_listener(self._on_journal_replay)
+
+    def _on_journal_replay(self, entry, is_undo):
+        self.parse()
 
     @property
     def heroes(self):
@@ -613,21 +841,56 @@ class LoadoutHandler:
         """
         return self.parser.relic_ga_hero_map
 
+    @property
+    def relic_refs(self) -> RelicRefIndex:
+        return self.parser.relic_refs
+
+    def get_relic_refs(self, ga_handle: int) -> list[RelicRef]:
+        """
+        Every vessel/preset slot holding the relic, see RelicRefIndex.
+        """
+        return self.relic_refs.refs_of(ga_handle)
+
     def get_vessel_index_in_hero(self, hero_type: int, vessel_id: int):
-        if self.check_vessel(hero_type, vessel_id):
-            for index, vessel in enumerate(self.heroes[hero_type].vessels):
-                if vessel["vessel_id"] == vessel_id:
-                    return index
-        return -1
+        self.check_hero(hero_type)
+        return self.heroes[hero_type].vessel_index(vessel_id)
 
     def parse(self):
         self.parser.parse()
         self.all_presets = [p for h in self.heroes.values() for p in h.presets]
-        self.all_presets.sort(key=lambda x: x["index"])
+        self.all_presets.sort(key=lambda x: x.index)
+
+    def export_model(self) -> dict:
+        return {"heroes": self.parser.heroes,
+                "relic_ga_hero_map": self.parser.relic_ga_hero_map,
+                "relic_refs": self.parser.relic_refs,
+                "base_offset": self.parser.base_offset,
+                "all_presets": self.all_presets}
+
+    def restore_model(self, model: dict):
+        self.parser.heroes = model["heroes"]
+        self.parser.relic_ga_hero_map = model["relic_ga_hero_map"]
+        self.parser.relic_refs = model["relic_refs"]
+        self.parser.base_offset = model["base_offset"]
+        if model["base_offset"] is not None:
+            self.parser._anchor = (model["base_offset"], self.parser._state_region_end())
+        self.all_presets = model["all_presets"]
 
     def display_results(self):
         self.parser.display_results()
 
+    def _replace_preset(self, preset: PresetEntry, *fields: str):
+        """
+        Swap in an edited copy of a preset, both in its hero and in all_presets.
+        """
+        hero = self.heroes[preset.hero_type]
+        old = hero.get_preset(preset.index)
+        hero.set_preset(preset, *fields)
+        if preset.index < len(self.all_presets) and self.all_presets[preset.index] is old:
+            self.all_presets[preset.index] = preset
+        else:
+            self.all_presets[self.all_presets.index(old)] = preset
+
     def update_hero_loadout(self, hero_index: int):
         self.modifier.update_hero_loadout(self.heroes[hero_index])
 
@@ -648,11 +911,11 @@ class LoadoutHandler:
 
     def check_vessel(self, hero_type: int, vessel_id: int):
         self.check_hero(hero_type)
-        return any(v["vessel_id"] == vessel_id for v in self.heroes[hero_type].vessels)
+        return self.heroes[hero_type].get_vessel(vessel_id) is not None
 
     def get_vessel_id(self, hero_type: int, vessel_index: int):
         if 0 <= vessel_index < len(self.heroes[hero_type].vessels):
-            return self.heroes[hero_type].vessels[vessel_index]["vessel_id"]
+            return self.heroes[hero_type].vessels[vessel_index].vessel_id
         else:
             raise ValueError("Invalid vessel index")
 
@@ -660,25 +923,26 @@ class LoadoutHandler:
         if not self.check_vessel(hero_type, vessel_id):
             raise ValueError("Vessel not found")
         if 0 <= relic_index <= 5:
-            for v in self.heroes[hero_type].vessels:
-                if v["vessel_id"] == vessel_id:
-                    return v["relics"][relic_index]
+            return self.heroes[hero_type].get_vessel(vessel_id).relics[relic_index]
         else:
             raise ValueError("Invalid relic index")
 
+    @journaled("Equip preset", loadout=True)
     def equip_preset(self, hero_type: int, preset_index: int):
         self.check_hero(hero_type)
         if preset_index < len(self.all_presets):
-            self.heroes[hero_type].cur_preset_idx = preset_index
-            self.heroes[hero_type].cur_vessel_id = self.all_presets[preset_index]["vessel_id"]
-            for vessel in self.heroes[hero_type].vessels:
-                if vessel["vessel_id"] == self.heroes[hero_type].cur_vessel_id:
-                    vessel["relics"] = deepcopy(self.all_presets[preset_index]["relics"])
-                    break
+            hero = self.heroes[hero_type]
+            preset = self.all_presets[preset_index]
+            hero.cur_preset_idx = preset_index
+            hero.cur_vessel_id = preset.vessel_id
+            vessel = hero.get_vessel(preset.vessel_id)
+            if vessel is not None:
+                hero.set_vessel(replace(vessel, relics=preset.relics))
             self.update_hero_loadout(hero_type)
         else:
             raise ValueError("Invalid preset index")
 
+    @journaled("Add preset", loadout=True)
     def push_preset(self, hero_type: int, vessel_id: int, relics: list[int], name: str):
         """
         Append a new preset to the specified hero's loadout.
@@ -707,67 +971,103 @@ class LoadoutHandler:
 
         # All Valid
         # Create a new preset
-        # new preset offsets are caculated by last preset
-        new_preset_offsets = {
-            "base": self.all_presets[-1]["offsets"]["base"] + 80 if self.all_presets else self.parser.base_offset + 120 * 10 + 28 * 70 + 4,  # Heuristic: 10 heroes * 120 bytes + 60 vessels * 28 bytes + 4 bytes padding
-            "hero_type": self.all_presets[-1]["offsets"]["base"] + 80 + 1 if self.all_presets else self.parser.base_offset + 120 * 10 + 28 * 70 + 4 + 1,
-            "counter": self.all_presets[-1]["offsets"]["base"] + 80 + 3 if self.all_presets else self.parser.base_offset + 120 * 10 + 28 * 70 + 4 + 3,
-            "name": self.all_presets[-1]["offsets"]["base"] + 80 + 4 if self.all_presets else self.parser.base_offset + 120 * 10 + 28 * 70 + 4 + 4,
-            "vessel_id": self.all_presets[-1]["offsets"]["base"] + 80 + 44 if self.all_presets else self.parser.base_offset + 120 * 10 + 28 * 70 + 4 + 44,
-            "relics": self.all_presets[-1]["offsets"]["base"] + 80 + 48 if self.all_presets else self.parser.base_offset + 120 * 10 + 28 * 70 + 4 + 48,
-            "timestamp": self.all_presets[-1]["offsets"]["base"] + 80 + 72 if self.all_presets else self.parser.base_offset + 120 * 10 + 28 * 70 + 4 + 72,
-        }
-
-        new_timestamp = get_now_timestamp()
-
-        new_preset = {
-            "hero_type": hero_type,
-            "index": len(self.all_presets),
-            "name": name,
-            "vessel_id": vessel_id,
-            "relics": relics,
-            "counter": 0,
-            "timestamp": new_timestamp,
-            "offsets": new_preset_offsets
-        }
+        # new preset offset is caculated by last preset
+        if self.all_presets:
+            new_preset_offset = self.all_presets[-1].offset + PRESET.size
+        else:
+            # Heuristic: 10 heroes * 120 bytes + 70 vessels * 28 bytes + 4 bytes padding
+            new_preset_offset = self.parser.base_offset + HERO_LOADOUT.size * HERO_COUNT + VESSEL.size * 70 + 4
+
+        new_preset = PresetEntry(
+            hero_type=hero_type,
+            index=len(self.all_presets),
+            name=name,
+            vessel_id=vessel_id,
+            relics=tuple(relics),
+            counter=0,
+            timestamp=get_now_timestamp(),
+            offset=new_preset_offset
+        )
         # Check preset, if invalid will raise Exception
         self.validator.validate_preset(self.heroes, hero_type, new_preset)
-        for hero in self.heroes.values():
-            for preset in hero.presets:
-                preset["counter"] += 1
-        self.heroes[hero_type].add_preset(**new_preset)
-        self.all_presets = [p for h in self.heroes.values() for p in h.presets]
-        self.all_presets.sort(key=lambda x: x["index"])
+        for i, preset in enumerate(self.all_presets):
+            preset = replace(preset, counter=preset.counter + 1)
+            self.all_presets[i] = preset
+            self.heroes[preset.hero_type].set_preset(preset, "counter")
+        self.heroes[hero_type].add_preset(new_preset)
+        self.heroes[hero_type].mark_preset_dirty(new_preset.index)
+        self.all_presets.append(new_preset)
         self.heroes[hero_type].auto_adjust_cur_equipment()
         self.update_all_loadouts()
 
+    @journaled("Replace vessel relic", loadout=True)
     def replace_vessel_relic(self, hero_type: int, vessel_id: int,
                              relic_index: int, new_relic_ga):
         self.check_hero(hero_type)
-        _new_vessel = None
-        vessel_index = 0
-        for idx, vessel in enumerate(self.heroes[hero_type].vessels):
-            if vessel["vessel_id"] == vessel_id:
-                _new_vessel = deepcopy(vessel)
-                vessel_index = idx
-                break
-        if not _new_vessel:
+        hero = self.heroes[hero_type]
+        vessel = hero.get_vessel(vessel_id)
+        if vessel is None:
             raise ValueError("Vessel not found")
-        old_relic_ga = _new_vessel["relics"][relic_index]
-        _new_vessel["relics"][relic_index] = new_relic_ga
+        old_relic_ga = vessel.relics[relic_index]
+        _new_vessel = vessel.with_relic(relic_index, new_relic_ga)
         if self.validator.validate_vessel(self.heroes, hero_type, _new_vessel):
-            self.heroes[hero_type].vessels[vessel_index] = _new_vessel
+            hero.set_vessel(_new_vessel)
             # Record relic equip/unequip
             if old_relic_ga != 0:
                 self.inventory.unequip_relic(old_relic_ga, hero_type)
             if new_relic_ga != 0:
                 self.inventory.equip_relic(new_relic_ga, hero_type)
 
-            if self.heroes[hero_type].cur_vessel_id == vessel_id:
-                self.heroes[hero_type].auto_adjust_cur_equipment()
+            if hero.cur_vessel_id == vessel_id:
+                hero.auto_adjust_cur_equipment()
             self.update_hero_loadout(hero_type)
             self.parse()
 
+    @journaled("Apply vessel relics", loadout=True)
+    def apply_vessel_relics(self, hero_type: int, vessel_id: int, relics):
+        """
+        Put a whole relic assignment (e.g. an optimizer suggestion) into a vessel at once.
+        """
+        self.check_hero(hero_type)
+        hero = self.heroes[hero_type]
+        vessel = hero.get_vessel(vessel_id)
+        if vessel is None:
+            raise ValueError("Vessel not found")
+        _new_vessel = replace(vessel, relics=tuple(relics))
+        if self.validator.validate_vessel(self.heroes, hero_type, _new_vessel):
+            hero.set_vessel(_new_vessel)
+            for old_relic_ga, new_relic_ga in zip(vessel.relics, _new_vessel.relics):
+                if old_relic_ga == new_relic_ga:
+                    continue
+                if old_relic_ga != 0:
+                    self.inventory.unequip_relic(old_relic_ga, hero_type)
+                if new_relic_ga != 0:
+                    self.inventory.equip_relic(new_relic_ga, hero_type)
+            if hero.cur_vessel_id == vessel_id:
+                hero.auto_adjust_cur_equipment()
+            self.update_hero_loadout(hero_type)
+            self.parse()
+
+    def suggest_vessel_relics(self, hero_type: int, vessel_id: int, wishes: dict[int, float],
+                              top_k: int = 5, **options) -> OptimizeResult:
+        """
+        Search the inventory for the best relic assignments of a vessel.
+            Options are passed to LoadoutOptimizer.optimize. Suggestions are checked
+            with Validator.validate_vessel, so every one can go to apply_vessel_relics.
+        """
+        self.validator.check_vessel_assignment(self.heroes, hero_type, vessel_id)
+        relic_slots = self.game_data.vessels[vessel_id].relic_slots
+        result = self.optimizer.optimize(self.inventory.snapshot(), relic_slots, wishes, top_k, **options)
+        suggestions = []
+        for suggestion in result.suggestions:
+            try:
+                self.validator.validate_vessel(self.heroes, hero_type, VesselEntry(vessel_id, suggestion.relics))
+                suggestions.append(suggestion)
+            except (ValueError, LookupError) as e:
+                logger.warning(f"Dropped invalid loadout suggestion {suggestion.relics}: {e}")
+        return result._replace(suggestions=suggestions)
+
+    @journaled("Replace preset relic", loadout=True)
     def replace_preset_relic(self, hero_type: int, relic_index: int, new_relic_ga,
                              hero_preset_index: int = -1, preset_index: int = -1):
         self.check_hero(hero_type)
@@ -782,19 +1082,14 @@ class LoadoutHandler:
         if relic_index < 0 or relic_index >= 6:
             raise ValueError("Invalid relic index")
 
-        _new_preset = None
         if preset_index >= 0:
-            _new_preset = deepcopy(self.all_presets[preset_index])
-        elif hero_preset_index >= 0:
-            _new_preset = deepcopy(self.heroes[hero_type].presets[hero_preset_index])
-        old_relic_ga = _new_preset["relics"][relic_index]
-        _new_preset["relics"][relic_index] = new_relic_ga
-        _t_vessel = {"vessel_id": _new_preset["vessel_id"], "relics": _new_preset['relics']}
-        self.validator.validate_vessel(self.heroes, hero_type, _t_vessel)
-        if preset_index >= 0:
-            self.all_presets[preset_index]['relics'][relic_index] = new_relic_ga
-        elif hero_preset_index >= 0:
-            self.heroes[hero_type].presets[hero_preset_index]['relics'][relic_index] = new_relic_ga
+            _preset = self.all_presets[preset_index]
+        else:
+            _preset = self.heroes[hero_type].presets[hero_preset_index]
+        old_relic_ga = _preset.relics[relic_index]
+        _new_preset = _preset.with_relic(relic_index, new_relic_ga)
+        self.validator.validate_vessel(self.heroes, hero_type, _new_preset)
+        self._replace_preset(_new_preset, "relics")
         # Record relic equip/unequip
         if old_relic_ga != 0:
             self.inventory.unequip_relic(old_relic_ga, hero_type)
@@ -802,7 +1097,62 @@ class LoadoutHandler:
             self.inventory.equip_relic(new_relic_ga, hero_type)
 
         self.heroes[hero_type].auto_adjust_cur_equipment()
-        self.update_hero_loadout(hero_type)
+        self.update_all_loadouts()
+
+    @journaled("Clear relic references", loadout=True)
+    def clear_relic_references(self, ga_handles) -> int:
+        """
+        Empty every vessel/preset slot that holds one of the relics.
+
+        :return: Count of cleared slots.
+        :rtype: int
+        """
+        # Group slots per record, so each record is copied and written once
+        records: dict[tuple[int, str, int], list[int]] = {}
+        for ga in set(ga_handles):
+            for ref in self.relic_refs.refs_of(ga):
+                records.setdefault((ref.hero_type, ref.kind, ref.key), []).append(ref.slot)
+        cleared = 0
+        for (hero_type, kind, key), slots in records.items():
+            hero = self.heroes[hero_type]
+            record = hero.get_vessel(key) if kind == RelicRefIndex.VESSEL else hero.get_preset(key)
+            relics = list(record.relics)
+            for slot in slots:
+                try:
+                    self.inventory.unequip_relic(relics[slot], hero_type)
+                except ValueError:
+                    pass  # Already gone from the inventory
+                relics[slot] = 0
+                cleared += 1
+            record = replace(record, relics=tuple(relics))
+            if kind == RelicRefIndex.VESSEL:
+                hero.set_vessel(record)
+            else:
+                self._replace_preset(record, "relics")
+            hero.auto_adjust_cur_equipment()
+        self.update_all_loadouts()
+        return cleared
+
+    def remove_relics(self, ga_handles) -> tuple[list[int], dict[int, Exception]]:
+        """
+        Delete relics from the inventory after clearing every loadout slot that references them.
+            Runs as one journal entry. Loadouts are reparsed once at the end, since removing
+            Item States shifts the vessel block.
+
+        :return: (removed ga_handles, {ga_handle: error} of failed ones)
+        """
+        removed = []
+        failed = {}
+        with EditJournal().transaction("Remove relics", relics=ga_handles, loadout=True):
+            self.clear_relic_references(ga_handles)
+            for ga in ga_handles:
+                try:
+                    self.inventory.remove_relic_from_inventory(ga)
+                    removed.append(ga)
+                except Exception as e:
+                    failed[ga] = e
+            self.parse()
+        return removed, failed
 
     def export_hero_loadout(self, hero_type: int, file_path: str):
         # Export Json File with orjson package
@@ -811,71 +1161,128 @@ class LoadoutHandler:
         with open(file_path, "wb") as f:
             f.write(json_bytes)
 
-    def import_hero_loadout(self, import_file_path: str,):
+    def export_all_loadouts(self, path: str) -> list[str]:
+        """
+        Export every hero loadout.
+            If path is a directory, one export_hero_loadout file is written per hero.
+            Otherwise one roster document {"heroes": [...]} is written to path.
 
-        with open(import_file_path, "rb") as f:
-            json_bytes = f.read()
-            import_data = orjson.loads(json_bytes)
-        hero_type = import_data["hero_type"]
+        :return: Written file paths.
+        """
+        if os.path.isdir(path):
+            written = []
+            for hero_type in sorted(self.heroes):
+                file_path = os.path.join(path, f"{self.game_data.character_names[hero_type-1]}_loadout.json")
+                self.export_hero_loadout(hero_type, file_path)
+                written.append(file_path)
+            return written
+        roster = {"heroes": [self.heroes[hero_type].get_export_data() for hero_type in sorted(self.heroes)]}
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(roster, option=orjson.OPT_INDENT_2))
+        return [path]
+
+    @staticmethod
+    def read_loadout_files(paths) -> list[dict]:
+        """
+        Load hero loadout documents from files and directories.
+            Accepts single hero exports and roster documents, directories are
+            searched for .json files (not recursive).
+        """
+        if isinstance(paths, (str, os.PathLike)):
+            paths = [paths]
+        file_paths = []
+        for path in paths:
+            if os.path.isdir(path):
+                file_paths += sorted(os.path.join(path, name) for name in os.listdir(path)
+                                     if name.lower().endswith(".json"))
+            else:
+                file_paths.append(path)
+        loadouts = []
+        for file_path in file_paths:
+            with open(file_path, "rb") as f:
+                data = orjson.loads(f.read())
+            loadouts += data["heroes"] if "heroes" in data else [data]
+        return loadouts
+
+    def _plan_cur_vessel(self, hero_type: int, im_cur_vessel_id: int, result_msgs: list[str]):
+        """
+        :return: Vessel id to set as current, None to keep the current one.
+            Assignment errors are logged and added to result_msgs instead of raised.
+        """
         try:
-            self.check_hero(hero_type)
-        except ValueError as ve:
-            return [str(ve)]
-
-        # Set current vessel id
-        im_cur_vessel_id = import_data["cur_vessel_id"]
-        if self.validator.check_vessel_assignment(self.heroes, hero_type, im_cur_vessel_id):
+            assigned = self.validator.check_vessel_assignment(self.heroes, hero_type, im_cur_vessel_id)
+        except (ValueError, ImportError, BufferError) as e:
+            logger.warning(f"Current vessel {im_cur_vessel_id} of hero {hero_type} can't be imported: {e}")
+            result_msgs.append(f"Current vessel {im_cur_vessel_id} import failed: {e}")
+            return None
+        if assigned:
             if is_vessel_available(im_cur_vessel_id):
-                self.heroes[hero_type].cur_vessel_id = im_cur_vessel_id
-            else:
-                logger.warning(f"Vessel {im_cur_vessel_id} is not unlocked")
+                return im_cur_vessel_id
+            logger.warning(f"Vessel {im_cur_vessel_id} is not unlocked")
         else:
             logger.warning(f"Vessel {im_cur_vessel_id} is not assigned to hero {hero_type}.")
             logger.warning("This Loadout file may be corrupted and not safe to use.")
+        return None
 
-        # Check if All Needed Relic in Inventory
-        all_needed_relics = import_data["all_needed_relics"]
+    def _plan_needed_relics(self, all_needed_relics):
+        """
+        Resolve exported relic infos against the inventory signature index.
+
+        :return: (relic info key -> ga_handle, 0 if missing), [(key, add_relics spec)] to add,
+            names of missing unique relics.
+        """
         relic_info_to_ga_map = {}
-        self.inventory.refresh_relics_dataframe()
-        relics_df = self.inventory.relics_df
+        relics_to_add = []
         miss_unique_names = []
         for needed_relic in all_needed_relics:
-            try:
-                ga_handle = relics_df[(relics_df['relic_id'] == needed_relic['relic_id']) &
-                                      (relics_df['effect_1'] == needed_relic['effect_1']) &
-                                      (relics_df['effect_2'] == needed_relic['effect_2']) &
-                                      (relics_df['effect_3'] == needed_relic['effect_3']) &
-                                      (relics_df['curse_1'] == needed_relic['curse_1']) &
-                                      (relics_df['curse_2'] == needed_relic['curse_2']) &
-                                      (relics_df['curse_3'] == needed_relic['curse_3'])]['ga_handle'].values[0]
-            except IndexError:
-                logger.info("Find needed relic not in inventory.")
-                ga_handle = 0
-                relic_id = needed_relic["relic_id"]
-                effects = [needed_relic["effect_1"], needed_relic["effect_2"], needed_relic["effect_3"]]
-                curses = [needed_relic["curse_1"], needed_relic["curse_2"], needed_relic["curse_3"]]
-                if self.game_data.relics.get(relic_id):
-                    if relic_id in UNIQUENESS_IDS:
-                        miss_unique_names.append(self.game_data.relics[relic_id].name + ":" + self.game_data.effects[effects[0]].name + "...")
-                        logger.warning(f"{self.game_data.relics[relic_id].name} is an unique relic and not in inventory.")
-                    else:
-                        logger.info("Found relic not in inventory, try to add it.")
-                        is_deep = self.game_data.relics[relic_id].is_deep()
-                        _, ga_handle = self.inventory.add_relic_to_inventory("Deep" if is_deep else "Normal")
-                        self.inventory.modify_relic(ga_handle, relic_id, *effects, *curses)
-            relic_info_to_ga_map[tuple(needed_relic.values())] = ga_handle
-
-        # Reparse to correct offsets.
-        self.inventory.parse()
+            relic_key = tuple(needed_relic.values())
+            if relic_key in relic_info_to_ga_map:
+                continue
+            owned_gas = self.inventory.find_relics_by_signature(
+                needed_relic['relic_id'],
+                [needed_relic['effect_1'], needed_relic['effect_2'], needed_relic['effect_3'],
+                 needed_relic['curse_1'], needed_relic['curse_2'], needed_relic['curse_3']])
+            if owned_gas:
+                relic_info_to_ga_map[relic_key] = owned_gas[0]
+                continue
+            logger.info("Find needed relic not in inventory.")
+            relic_info_to_ga_map[relic_key] = 0
+            relic_id = needed_relic["relic_id"]
+            effects = [needed_relic["effect_1"], needed_relic["effect_2"], needed_relic["effect_3"]]
+            curses = [needed_relic["curse_1"], needed_relic["curse_2"], needed_relic["curse_3"]]
+            if self.game_data.relics.get(relic_id):
+                if relic_id in UNIQUENESS_IDS:
+                    miss_unique_names.append(self.game_data.relics[relic_id].name + ":" + self.game_data.effects[effects[0]].name + "...")
+                    logger.warning(f"{self.game_data.relics[relic_id].name} is an unique relic and not in inventory.")
+                else:
+                    is_deep = self.game_data.relics[relic_id].is_deep()
+                    relics_to_add.append((relic_key, ("Deep" if is_deep else "Normal", relic_id, effects, curses)))
+        return relic_info_to_ga_map, relics_to_add, miss_unique_names
+
+    def _add_planned_relics(self, relics_to_add, relic_info_to_ga_map):
+        """
+        Add all missing relics with one reshaping of the buffer and map them to their new ga_handles.
+        """
+        logger.info(f"Adding {len(relics_to_add)} missing relics to inventory.")
+        new_gas = self.inventory.add_relics([spec for _, spec in relics_to_add])
+        for (relic_key, _), ga_handle in zip(relics_to_add, new_gas):
+            relic_info_to_ga_map[relic_key] = ga_handle
+        # The Item State region grew, reparse to correct offsets.
         self.parse()
 
-        # Transform imported relic metadata to current session ga_handles
+    @staticmethod
+    def _transform_loadout(import_data: dict, relic_info_to_ga_map: dict):
+        """
+        Transform imported relic metadata to current session ga_handles.
+            Relics map to their relic_info_to_ga_map value, 0 if not in it.
+        """
         result_msgs = []
         transfored_data = {"presets": [],
                            "vessels": []}
         for preset in import_data["presets"]:
             try:
-                relic_gas = [relic_info_to_ga_map[tuple(r.values())] for r in preset["relics"]]
+                # Empty slots are not part of all_needed_relics
+                relic_gas = [relic_info_to_ga_map.get(tuple(r.values()), 0) for r in preset["relics"]]
                 transfored_data["presets"].append({
                     "name": preset["name"],
                     "vessel_id": preset["vessel_id"],
@@ -893,15 +1300,19 @@ class LoadoutHandler:
                 })
             except Exception as e:
                 result_msgs.append(f"Vessel {vessel['vessel_id']} import failed: {e}")
+        return transfored_data, result_msgs
 
-        # Pause And Get selected indices
-        vessel_indices, preset_indices = yield transfored_data
-        if vessel_indices is None:
-            vessel_indices = []
-        if preset_indices is None:
-            preset_indices = []
+    def _apply_loadout(self, hero_type: int, transfored_data: dict, new_cur_vessel_id,
+                       vessel_indices, preset_indices) -> list[str]:
+        """
+        Apply transformed presets, vessels and the current vessel of one hero.
+            Must run inside a journal transaction, the caller writes and reparses once at the end.
+        """
+        result_msgs = []
+        if new_cur_vessel_id is not None:
+            self.heroes[hero_type].cur_vessel_id = new_cur_vessel_id
 
-        # Import Presets
+        # Import Presets, offsets of new presets are computed, no reparse needed in between
         for idx, preset in enumerate(transfored_data["presets"]):
             if idx not in preset_indices:
                 result_msgs.append(f"Preset {preset['name']} import skipped.")
@@ -915,15 +1326,177 @@ class LoadoutHandler:
             except Exception as e:
                 result_msgs.append(f"Preset {preset['name']} import failed: {e}")
 
-        # Reparse to correct offsets.
-        self.parse()
-
         # Import Vessels
         result_msgs += self.heroes[hero_type].import_vessels(transfored_data["vessels"], vessel_indices)
-        if miss_unique_names:
-            result_msgs.append("="*40)
-            result_msgs.append("Followed Relics are unique and cannot be added to the inventory:")
-            result_msgs += miss_unique_names
+        return result_msgs
 
-        self.update_all_loadouts()
-        yield result_msgs
+    @staticmethod
+    def _missing_unique_msgs(miss_unique_names):
+        if not miss_unique_names:
+            return []
+        return ["="*40, "Followed Relics are unique and cannot be added to the inventory:"] + miss_unique_names
+
+    def import_hero_loadout(self, import_file_path: str,):
+        """
+        Import a file written by export_hero_loadout. Generator driven in two steps:
+            next() plans the import without writing anything and yields the transformed
+            presets/vessels for selection. Relics still to be added are given as their exported
+            relic info instead of a ga_handle.
+            send((vessel_indices, preset_indices)) adds the missing relics the selection uses in one
+            batch, then applies the selected presets, vessels and current vessel. All of it is one
+            journal entry with a single final parse, a failure rolls everything back.
+        """
+        with open(import_file_path, "rb") as f:
+            json_bytes = f.read()
+            import_data = orjson.loads(json_bytes)
+        hero_type = import_data["hero_type"]
+        try:
+            self.check_hero(hero_type)
+        except ValueError as ve:
+            return [str(ve)]
+
+        cur_vessel_msgs = []
+        new_cur_vessel_id = self._plan_cur_vessel(hero_type, import_data["cur_vessel_id"], cur_vessel_msgs)
+
+        # Check if All Needed Relic in Inventory
+        relic_info_to_ga_map, relics_to_add, miss_unique_names = \
+            self._plan_needed_relics(import_data["all_needed_relics"])
+        relic_infos = {tuple(r.values()): r for r in import_data["all_needed_relics"]}
+        preview_map = dict(relic_info_to_ga_map)
+        preview_map.update((relic_key, relic_infos[relic_key]) for relic_key, _ in relics_to_add)
+
+        transfored_data, result_msgs = self._transform_loadout(import_data, preview_map)
+        result_msgs = cur_vessel_msgs + result_msgs
+
+        # Pause And Get selected indices
+        vessel_indices, preset_indices = yield transfored_data
+        if vessel_indices is None:
+            vessel_indices = []
+        if preset_indices is None:
+            preset_indices = []
+
+        selected = ([transfored_data["vessels"][i] for i in vessel_indices] +
+                    [transfored_data["presets"][i] for i in preset_indices])
+        selected_keys = {tuple(r.values()) for item in selected for r in item["relics"] if isinstance(r, dict)}
+        try:
+            with EditJournal().transaction("Import loadout", loadout=True):
+                selected_to_add = [plan for plan in relics_to_add if plan[0] in selected_keys]
+                if selected_to_add:
+                    self._add_planned_relics(selected_to_add, relic_info_to_ga_map)
+                for item in selected:
+                    item["relics"] = [relic_info_to_ga_map[tuple(r.values())] if isinstance(r, dict) else r
+                                      for r in item["relics"]]
+                result_msgs += self._apply_loadout(hero_type, transfored_data, new_cur_vessel_id,
+                                                   vessel_indices, preset_indices)
+                self.update_all_loadouts()
+                # Final consistency check against the written bytes
+                self.parse()
+        except Exception as e:
+            logger.exception("Loadout import failed, rolling back.")
+            yield [f"Loadout import failed, all changes were rolled back: {e}"]
+            return
+
+        yield result_msgs + self._missing_unique_msgs(miss_unique_names)
+
+    def import_all_loadouts(self, paths) -> list[str]:
+        """
+        Import every preset and vessel of many loadout files in one go (roster migration).
+            paths: file(s) or directories, see read_loadout_files.
+
+        :return: Result messages.
+        """
+        return self.import_loadouts(self.read_loadout_files(paths))
+
+    def import_loadouts(self, loadouts: list[dict]) -> list[str]:
+        """
+        Import loadouts in the HeroLoadout.get_export_data format, all presets and vessels selected.
+            Needed relics of all loadouts are merged and resolved once, missing ones are added in
+            one batch. Everything is applied as a single journal entry with one final parse,
+            a failure rolls the whole import back.
+
+        :return: Result messages.
+        """
+        result_msgs = []
+        plans = []
+        for import_data in loadouts:
+            hero_type = import_data["hero_type"]
+            try:
+                self.check_hero(hero_type)
+            except ValueError as ve:
+                result_msgs.append(str(ve))
+                continue
+            hero_name = self.game_data.character_names[hero_type-1]
+            cur_vessel_msgs = []
+            new_cur_vessel_id = self._plan_cur_vessel(hero_type, import_data["cur_vessel_id"], cur_vessel_msgs)
+            result_msgs += [f"{hero_name}: {msg}" for msg in cur_vessel_msgs]
+            plans.append((hero_type, import_data, new_cur_vessel_id))
+        if not plans:
+            return result_msgs
+
+        relic_info_to_ga_map, relics_to_add, miss_unique_names = self._plan_needed_relics(
+            needed_relic for _, import_data, _ in plans for needed_relic in import_data["all_needed_relics"])
+        try:
+            with EditJournal().transaction("Import all loadouts", loadout=True):
+                if relics_to_add:
+                    self._add_planned_relics(relics_to_add, relic_info_to_ga_map)
+                for hero_type, import_data, new_cur_vessel_id in plans:
+                    hero_name = self.game_data.character_names[hero_type-1]
+                    transfored_data, hero_msgs = self._transform_loadout(import_data, relic_info_to_ga_map)
+                    hero_msgs += self._apply_loadout(hero_type, transfored_data, new_cur_vessel_id,
+                                                     range(len(transfored_data["vessels"])),
+                                                     range(len(transfored_data["presets"])))
+                    result_msgs += [f"{hero_name}: {msg}" for msg in hero_msgs]
+                self.update_all_loadouts()
+                # Final consistency check against the written bytes
+                self.parse()
+        except Exception as e:
+            logger.exception("Loadout import failed, rolling back.")
+            return [f"Loadout import failed, all changes were rolled back: {e}"]
+
+        return result_msgs + self._missing_unique_msgs(miss_unique_names)
+
+    # ---------- Share codes ----------
+    def _relic_export_info(self, ga_handle: int) -> dict:
+        state = self.inventory.relics[ga_handle].state
+        return {
+            "relic_id": state.real_item_id,
+            "effect_1": state.effect_1,
+            "effect_2": state.effect_2,
+            "effect_3": state.effect_3,
+            "curse_1": state.curse_1,
+            "curse_2": state.curse_2,
+            "curse_3": state.curse_3
+        }
+
+    def loadout_share_code(self, hero_types=None, alphabet: str = "base64") -> str:
+        """
+        Share code of the given heroes' loadouts (all heroes if None), see share_code.
+        """
+        if hero_types is None:
+            hero_types = sorted(self.heroes)
+        return share_code.encode_loadouts([self.heroes[h].get_export_data() for h in hero_types], alphabet)
+
+    def relic_share_code(self, ga_handles, alphabet: str = "base64") -> str:
+        return share_code.encode_relics([self._relic_export_info(ga) for ga in ga_handles], alphabet)
+
+    def import_relics(self, relics: list[dict]) -> list[str]:
+        """
+        Add the relics (export format) that are not owned yet, as one batch and one journal entry.
+        """
+        relic_info_to_ga_map, relics_to_add, miss_unique_names = self._plan_needed_relics(relics)
+        owned = sum(1 for ga in relic_info_to_ga_map.values() if ga)
+        if relics_to_add:
+            with EditJournal().transaction("Import relics", loadout=True):
+                self._add_planned_relics(relics_to_add, relic_info_to_ga_map)
+        result_msgs = [f"{len(relics_to_add)} relic(s) added, {owned} already owned."]
+        return result_msgs + self._missing_unique_msgs(miss_unique_names)
+
+    def import_share_code(self, code: str) -> list[str]:
+        """
+        Import a loadout or relic share code.
+
+        :raises share_code.ShareCodeError: The code is malformed or damaged.
+        """
+        if share_code.code_kind(code) == share_code.KIND_RELICS:
+            return self.import_relics(share_code.decode_relics(code))
+        return self.import_loadouts(share_code.decode_loadouts(code))